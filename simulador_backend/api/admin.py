@@ -1,4 +1,5 @@
 from django.contrib import admin
-from .models import Tree
+from .models import Tree, TreeOperation
 # Register your models here.
-admin.site.register(Tree)
\ No newline at end of file
+admin.site.register(Tree)
+admin.site.register(TreeOperation)
\ No newline at end of file
@@ -0,0 +1,69 @@
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+
+class TreeCache:
+    """
+    Caché LRU en memoria (por proceso) de árboles ya reconstruidos.
+    La clave es el pk del árbol y cada entrada guarda el 'updated_at' con el
+    que se generó: si el árbol cambió en la BBDD (otro proceso, un PUT...),
+    la entrada deja de ser válida y se cuenta como fallo.
+
+    Los árboles se modifican en el sitio, así que 'take' saca la entrada de la
+    caché: mientras una petición trabaja con la raíz nadie más la ve, y si la
+    operación falla a medias la raíz simplemente no vuelve a la caché.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict() # pk -> (updated_at, raíz)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def take(self, pk, updated_at):
+        """Devuelve la raíz cacheada (y la retira) o None si no hay una válida."""
+        with self._lock:
+            entry = self._entries.pop(pk, None)
+            if entry is not None and entry[0] == updated_at:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def put(self, pk, updated_at, root):
+        """Guarda la raíz como la más recientemente usada, expulsando la más antigua si no cabe."""
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[pk] = (updated_at, root)
+            self._entries.move_to_end(pk)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def discard(self, pk):
+        with self._lock:
+            self._entries.pop(pk, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+# Instancia única por proceso de trabajo
+tree_cache = TreeCache(getattr(settings, 'TREE_CACHE_SIZE', 64))
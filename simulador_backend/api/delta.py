@@ -0,0 +1,66 @@
+"""
+Respuestas "delta": en lugar de devolver la estructura completa del árbol,
+se devuelve solo lo que cambió entre dos versiones del diccionario D3.
+
+Cada nodo se identifica por su clave ('original_name' o 'name'; en el Árbol B,
+por su grupo de claves "[1, 2]"; en los nodos internos de los árboles B y B+,
+por el grupo seguido de " (interno)", porque en el B+ un grupo de separadores
+puede tener las mismas claves que una hoja) y se describe con su padre y su posición
+entre los hijos del padre. Así una rotación aparece como nodos re-enganchados,
+una división o fusión de nodos B como grupos eliminados y añadidos, y un
+cambio de altura en el AVL como un nodo cuyo 'name' cambió.
+"""
+
+
+def _node_id(node_dict):
+    name = node_dict.get('original_name', node_dict['name'])
+    if node_dict.get('children') and str(name).startswith('['):
+        return f"{name} (interno)"
+    return name
+
+
+def flatten(structure):
+    """Devuelve {id: registro} con un registro plano por nodo del diccionario D3."""
+    records = {}
+    if not structure:
+        return records
+    # Cada entrada es (diccionario del nodo, id del padre, posición entre sus hermanos)
+    stack = [(structure, None, 0)]
+    while stack:
+        node_dict, parent_id, index = stack.pop()
+        node_id = _node_id(node_dict)
+        record = {"id": node_id, "name": node_dict['name'], "parent": parent_id, "index": index}
+        if node_dict.get('highlighted'):
+            record["highlighted"] = True
+        records[node_id] = record
+        for child_index, child in enumerate(node_dict.get('children', [])):
+            stack.append((child, node_id, child_index))
+    return records
+
+
+def diff(old_structure, new_structure):
+    """
+    Compara dos estructuras y devuelve:
+    - added: registros de nodos nuevos
+    - removed: ids de nodos que ya no existen
+    - changed: registros de nodos que cambiaron de padre, posición, nombre o resaltado
+    - root: id de la nueva raíz (None si el árbol quedó vacío)
+    """
+    old_records = flatten(old_structure)
+    new_records = flatten(new_structure)
+
+    added, changed = [], []
+    for node_id, record in new_records.items():
+        previous = old_records.get(node_id)
+        if previous is None:
+            added.append(record)
+        elif previous != record:
+            changed.append(record)
+    removed = [node_id for node_id in old_records if node_id not in new_records]
+
+    return {
+        "added": added,
+        "removed": removed,
+        "changed": changed,
+        "root": _node_id(new_structure) if new_structure else None,
+    }
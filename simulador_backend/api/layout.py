@@ -0,0 +1,196 @@
+"""
+Disposición "tidy tree" calculada en el servidor (?layout=tidy).
+
+Con árboles grandes, que D3 recalcule en el navegador la disposición de toda
+la jerarquía en cada respuesta es lo que más tarda. Aquí se calcula una vez
+por versión del árbol y cada nodo del diccionario D3 recibe:
+
+- "x": el centro del nodo, en unidades de nodo (el borde izquierdo del
+  dibujo está en 0);
+- "y": la profundidad (la raíz es 0);
+- "width": en los nodos de los árboles B y B+, el número de claves del grupo
+  (los demás nodos miden 1 y no lo llevan).
+
+Es el algoritmo de Reingold–Tilford en tiempo lineal (Buchheim, Jünger y
+Leipert), con anchos variables para los grupos de claves y sin recursión,
+como el resto de recorridos del proyecto (un BST degenerado puede tener
+cientos de miles de niveles). El cliente solo tiene que escalar las coordenadas.
+
+El resultado se guarda en una caché LRU por proceso, con el 'updated_at' del
+árbol como versión: mientras el árbol no cambie, las respuestas reutilizan
+el mismo diccionario ya anotado sin volver a generarlo.
+"""
+from django.conf import settings
+
+from . import storage
+from .cache import TreeCache
+
+# Separación mínima entre los bordes de dos nodos vecinos del mismo nivel
+GAP = 1.0
+
+
+class _Node:
+    __slots__ = ('data', 'parent', 'children', 'number', 'width', 'prelim', 'mod',
+                 'shift', 'change', 'thread', 'ancestor', 'default_ancestor')
+
+    def __init__(self, data, parent, number):
+        self.data = data
+        self.parent = parent
+        self.children = []
+        self.number = number # posición entre sus hermanos
+        self.width = node_width(data)
+        self.prelim = self.mod = self.shift = self.change = 0.0
+        self.thread = None
+        self.ancestor = self
+        self.default_ancestor = None
+
+
+def node_width(node_dict):
+    """Ancho del nodo: 1, o el número de claves si es un grupo de un árbol B/B+ ("[1, 2, 3]")."""
+    name = node_dict.get('name', '')
+    if isinstance(name, str) and name.startswith('['):
+        return max(1, name.count(',') + 1)
+    return 1
+
+
+def _distance(left, right):
+    return (left.width + right.width) / 2 + GAP
+
+
+def _next_left(v):
+    return v.children[0] if v.children else v.thread
+
+
+def _next_right(v):
+    return v.children[-1] if v.children else v.thread
+
+
+def _left_sibling(v):
+    return v.parent.children[v.number - 1] if v.parent is not None and v.number > 0 else None
+
+
+def _move_subtree(wl, wr, shift):
+    subtrees = wr.number - wl.number
+    wr.change -= shift / subtrees
+    wr.shift += shift
+    wl.change += shift / subtrees
+    wr.prelim += shift
+    wr.mod += shift
+
+
+def _execute_shifts(v):
+    shift = change = 0.0
+    for w in reversed(v.children):
+        w.prelim += shift
+        w.mod += shift
+        change += w.change
+        shift += w.shift + change
+
+
+def _apportion(v, default_ancestor):
+    """Separa el subárbol de 'v' de los de sus hermanos izquierdos recorriendo los contornos."""
+    w = _left_sibling(v)
+    if w is None:
+        return default_ancestor
+    vir = vor = v
+    vil = w
+    vol = v.parent.children[0]
+    sir, sor, sil, sol = vir.mod, vor.mod, vil.mod, vol.mod
+    while True:
+        next_right, next_left = _next_right(vil), _next_left(vir)
+        if next_right is None or next_left is None:
+            break
+        vil, vir = next_right, next_left
+        vol, vor = _next_left(vol), _next_right(vor)
+        vor.ancestor = v
+        shift = (vil.prelim + sil) - (vir.prelim + sir) + _distance(vil, vir)
+        if shift > 0:
+            ancestor = vil.ancestor if vil.ancestor.parent is v.parent else default_ancestor
+            _move_subtree(ancestor, v, shift)
+            sir += shift
+            sor += shift
+        sil += vil.mod
+        sir += vir.mod
+        sol += vol.mod
+        sor += vor.mod
+    if _next_right(vil) is not None and _next_right(vor) is None:
+        vor.thread = _next_right(vil)
+        vor.mod += sil - sor
+    if _next_left(vir) is not None and _next_left(vol) is None:
+        vol.thread = _next_left(vir)
+        vol.mod += sir - sol
+        default_ancestor = v
+    return default_ancestor
+
+
+def annotate(structure):
+    """
+    Añade "x", "y" (y "width" en los grupos de claves) a cada nodo del
+    diccionario D3, en el sitio, y lo devuelve. Un árbol vacío ({}) no cambia.
+    """
+    if not structure:
+        return structure
+
+    # Preorden visitando los hijos de derecha a izquierda: recorrido al revés
+    # es un postorden normal (cada nodo después de sus hijos y de sus hermanos izquierdos)
+    root = _Node(structure, None, 0)
+    order = []
+    stack = [root]
+    while stack:
+        v = stack.pop()
+        order.append(v)
+        for number, child in enumerate(v.data.get('children', ())):
+            v.children.append(_Node(child, v, number))
+        if v.children:
+            v.default_ancestor = v.children[0]
+        stack.extend(v.children)
+
+    # Primer recorrido: posición preliminar de cada nodo respecto a sus hermanos
+    for v in reversed(order):
+        w = _left_sibling(v)
+        if v.children:
+            _execute_shifts(v)
+            midpoint = (v.children[0].prelim + v.children[-1].prelim) / 2
+            if w is not None:
+                v.prelim = w.prelim + _distance(w, v)
+                v.mod = v.prelim - midpoint
+            else:
+                v.prelim = midpoint
+        elif w is not None:
+            v.prelim = w.prelim + _distance(w, v)
+        if v.parent is not None:
+            v.parent.default_ancestor = _apportion(v, v.parent.default_ancestor)
+
+    # Segundo recorrido: posición final sumando los desplazamientos de los ancestros
+    positions = []
+    stack = [(root, 0.0, 0)]
+    while stack:
+        v, offset, depth = stack.pop()
+        positions.append((v, v.prelim + offset, depth))
+        for child in v.children:
+            stack.append((child, offset + v.mod, depth + 1))
+
+    left_edge = min(x - v.width / 2 for v, x, _ in positions)
+    for v, x, depth in positions:
+        v.data["x"] = round(x - left_edge, 3)
+        v.data["y"] = depth
+        if str(v.data.get('name', '')).startswith('['):
+            v.data["width"] = v.width
+    return structure
+
+
+def tree_layout(tree, logic):
+    """
+    La estructura D3 del árbol con la disposición ya calculada, desde la
+    caché si la versión coincide. El diccionario devuelto es compartido:
+    no se debe modificar.
+    """
+    structure = layout_cache.take(tree.pk, tree.updated_at)
+    if structure is None:
+        structure = annotate(storage.d3_structure(tree, logic))
+    layout_cache.put(tree.pk, tree.updated_at, structure)
+    return structure
+
+
+# Instancia única por proceso de trabajo
+layout_cache = TreeCache(getattr(settings, 'TREE_LAYOUT_CACHE_SIZE', 16))
@@ -1,33 +1,99 @@
+from . import compact
+from .order import minimum, maximum, predecessor, successor, rank, select, range_keys # Consultas de orden comunes
+
 class Node:
+    __slots__ = ('key', 'left', 'right', 'height', 'size') # Sin __dict__ por nodo
+
     def __init__(self, key):
         self.key = int(key)
         self.left = None
         self.right = None
         self.height = 1 # Un nuevo nodo siempre tiene altura 1
+        self.size = 1 # Número de nodos del subárbol (para rank/select)
 
 # Las funciones tree_to_dict y dict_to_tree son casi idénticas a las del BST.
-# dict_to_tree reconstruirá el árbol usando nuestra lógica de inserción de AVL.
-def tree_to_dict(node, highlight_key=None):
+# dict_to_tree reconstruye los nodos directamente desde el JSON, conservando
+# la forma y las alturas guardadas (sin re-insertar ni re-balancear).
+# Ambas usan pilas explícitas en lugar de recursión.
+def tree_to_dict(node, highlight_key=None, highlight_keys=None, max_depth=None):
     if not node: return None
-    node_dict = {"name": f"{node.key} (h:{node.height})", "original_name": str(node.key)}
-    if highlight_key is not None and node.key == highlight_key:
-        node_dict["highlighted"] = True
-    children = []
-    if node.left: children.append(tree_to_dict(node.left, highlight_key))
-    if node.right: children.append(tree_to_dict(node.right, highlight_key))
-    if children: node_dict["children"] = children
-    return node_dict
+    root_children = []
+    stack = [(node, root_children, 0)] # (nodo, lista de hijos del diccionario padre, profundidad)
+    while stack:
+        current, siblings, depth = stack.pop()
+        node_dict = {"name": f"{current.key} (h:{current.height})", "original_name": str(current.key)}
+        if (highlight_key is not None and current.key == highlight_key) or (highlight_keys and current.key in highlight_keys):
+            node_dict["highlighted"] = True
+        if current.left or current.right:
+            if depth == max_depth: # Plegado (ver bst.tree_to_dict)
+                node_dict["collapsed"] = True
+                node_dict["child_count"] = (current.left is not None) + (current.right is not None)
+                node_dict["descendants"] = current.size - 1
+            else:
+                node_dict["children"] = []
+                if current.right: stack.append((current.right, node_dict["children"], depth + 1))
+                if current.left: stack.append((current.left, node_dict["children"], depth + 1))
+        siblings.append(node_dict)
+    return root_children[0]
+
+def _node_from_dict(node_dict):
+    name = node_dict['name']
+    node = Node(node_dict.get('original_name', name.split(' ')[0]))
+    # La altura viene guardada en el nombre "clave (h:altura)"
+    node.height = int(name.split('(h:')[1].rstrip(')')) if '(h:' in name else None
+    return node
 
 def dict_to_tree(data):
-    def get_values(node_dict):
-        if not node_dict: return []
-        values = [int(node_dict.get('original_name', node_dict['name'].split(' ')[0]))]
-        if 'children' in node_dict:
-            for child in node_dict['children']: values.extend(get_values(child))
-        return values
-    values = get_values(data)
+    if not data: return None
+    root = _node_from_dict(data)
+    created = [root]
+    stack = [(data, root)]
+    while stack:
+        node_dict, node = stack.pop()
+        for child_dict in node_dict.get('children', []):
+            child = _node_from_dict(child_dict)
+            if child.key < node.key: node.left = child
+            else: node.right = child
+            created.append(child)
+            stack.append((child_dict, child))
+    # Estructuras antiguas sin altura: la calculamos de abajo hacia arriba
+    # (en orden inverso al de creación, cada hijo va antes que su padre).
+    # Los tamaños de los subárboles no se guardan, así que siempre se calculan.
+    for node in reversed(created):
+        if node.height is None:
+            node.height = 1 + max(get_height(node.left), get_height(node.right))
+        node.size = 1 + get_size(node.left) + get_size(node.right)
+    return root
+
+# Formato compacto (ver logic/compact.py): solo las claves en preorden. Las
+# alturas no se guardan porque salen de la forma del árbol.
+def tree_to_compact(node, highlight_keys=None):
+    return compact.pack([current.key for current in compact.preorder(node)], highlight_keys)
+
+def compact_to_tree(data):
+    nodes = compact.from_preorder(data['keys'], Node)
+    for node in reversed(nodes):
+        _update(node)
+    return nodes[0] if nodes else None
+
+def build_from_sorted(keys):
+    # Carga masiva en O(n) desde claves ordenadas y sin repetir: la mediana de
+    # cada rango es la raíz. Un rango de m claves queda con altura m.bit_length()
+    # (= ceil(log2(m + 1))), así que no hace falta re-balancear nada.
+    if not keys: return None
     root = None
-    for value in values: root = insert(root, value)
+    stack = [(0, len(keys) - 1, None, False)] # (inicio, fin, padre, es_hijo_izquierdo)
+    while stack:
+        lo, hi, parent, is_left = stack.pop()
+        mid = (lo + hi) // 2
+        node = Node(keys[mid])
+        node.height = (hi - lo + 1).bit_length()
+        node.size = hi - lo + 1
+        if parent is None: root = node
+        elif is_left: parent.left = node
+        else: parent.right = node
+        if lo < mid: stack.append((lo, mid - 1, node, True))
+        if mid < hi: stack.append((mid + 1, hi, node, False))
     return root
 
 # --- Funciones Auxiliares del AVL ---
@@ -35,6 +101,14 @@ def dict_to_tree(data):
 def get_height(root):
     return root.height if root else 0
 
+def get_size(root):
+    return root.size if root else 0
+
+def _update(node):
+    # Recalcula altura y tamaño a partir de los hijos
+    node.height = 1 + max(get_height(node.left), get_height(node.right))
+    node.size = 1 + get_size(node.left) + get_size(node.right)
+
 def get_balance(root):
     return get_height(root.left) - get_height(root.right) if root else 0
 
@@ -43,8 +117,8 @@ def right_rotate(y):
     T2 = x.right
     x.right = y
     y.left = T2
-    y.height = 1 + max(get_height(y.left), get_height(y.right))
-    x.height = 1 + max(get_height(x.left), get_height(x.right))
+    _update(y)
+    _update(x)
     return x
 
 def left_rotate(x):
@@ -52,81 +126,184 @@ def left_rotate(x):
     T2 = y.left
     y.left = x
     x.right = T2
-    x.height = 1 + max(get_height(x.left), get_height(x.right))
-    y.height = 1 + max(get_height(y.left), get_height(y.right))
+    _update(x)
+    _update(y)
     return y
 
-# --- Algoritmos Principales del AVL ---
-
-def insert(root, key):
-    # 1. Inserción estándar de BST
-    if not root: return Node(key)
-    if key < root.key:
-        root.left = insert(root.left, key)
-    elif key > root.key:
-        root.right = insert(root.right, key)
-    else:
-        return root # Claves duplicadas no se permiten
-
-    # 2. Actualizar altura y obtener factor de equilibrio
-    root.height = 1 + max(get_height(root.left), get_height(root.right))
+def rebalance(root, trace=None):
+    """Re-balancea un nodo con su altura ya actualizada. Devuelve la raíz del subárbol."""
     balance = get_balance(root)
-
-    # 3. Re-balancear si es necesario (4 casos)
-    # Caso Izquierda-Izquierda
-    if balance > 1 and key < root.left.key:
-        return right_rotate(root)
-    # Caso Derecha-Derecha
-    if balance < -1 and key > root.right.key:
-        return left_rotate(root)
-    # Caso Izquierda-Derecha
-    if balance > 1 and key > root.left.key:
-        root.left = left_rotate(root.left)
+    if balance > 1: # Desbalanceado a la izquierda
+        case = "LL" if get_balance(root.left) >= 0 else "LR"
+        if trace is not None: trace.append({"type": "rotation", "case": case, "key": root.key})
+        if case == "LL": return right_rotate(root) # Caso Izq-Izq
+        root.left = left_rotate(root.left) # Caso Izq-Der
         return right_rotate(root)
-    # Caso Derecha-Izquierda
-    if balance < -1 and key < root.right.key:
-        root.right = right_rotate(root.right)
+    if balance < -1: # Desbalanceado a la derecha
+        case = "RR" if get_balance(root.right) <= 0 else "RL"
+        if trace is not None: trace.append({"type": "rotation", "case": case, "key": root.key})
+        if case == "RR": return left_rotate(root) # Caso Der-Der
+        root.right = right_rotate(root.right) # Caso Der-Izq
         return left_rotate(root)
-        
     return root
 
-def delete(root, key):
-    # (La lógica de borrado de AVL sigue un patrón similar: borrado de BST y luego re-balanceo)
-    # Es bastante largo, así que lo dejaremos aquí como una implementación completa.
-    if not root: return root
-    # Lógica de búsqueda del nodo
-    if key < root.key: root.left = delete(root.left, key)
-    elif key > root.key: root.right = delete(root.right, key)
-    else: # Nodo encontrado
-        if not root.left: return root.right
-        elif not root.right: return root.left
-        temp = root.right
-        while temp.left: temp = temp.left
-        root.key = temp.key
-        root.right = delete(root.right, temp.key)
-    
-    if not root: return root # El árbol puede quedar vacío
-
-    # Actualizar altura y re-balancear
-    root.height = 1 + max(get_height(root.left), get_height(root.right))
-    balance = get_balance(root)
+def _retrace(path, trace=None):
+    """
+    Recorre el camino guardado desde abajo hacia la raíz actualizando alturas
+    y tamaños, y re-balanceando. Cada rotación se engancha en el padre (el nodo anterior
+    del camino). Devuelve la nueva raíz del árbol.
+    """
+    for i in range(len(path) - 1, -1, -1):
+        node = path[i]
+        _update(node)
+        new_node = rebalance(node, trace)
+        if new_node is not node:
+            path[i] = new_node
+            if i > 0:
+                parent = path[i - 1]
+                if parent.left is node: parent.left = new_node
+                else: parent.right = new_node
+    return path[0]
 
-    # Re-balanceo
-    if balance > 1: # Desbalanceado a la izquierda
-        if get_balance(root.left) >= 0: return right_rotate(root) # Caso Izq-Izq
-        else: # Caso Izq-Der
-            root.left = left_rotate(root.left)
-            return right_rotate(root)
-    if balance < -1: # Desbalanceado a la derecha
-        if get_balance(root.right) <= 0: return left_rotate(root) # Caso Der-Der
-        else: # Caso Der-Izq
-            root.right = right_rotate(root.right)
-            return left_rotate(root)
+def _visit(trace, node, key):
+    cmp = "<" if key < node.key else ">" if key > node.key else "="
+    trace.append({"type": "visit", "key": node.key, "cmp": cmp})
 
-    return root
+# --- Algoritmos Principales del AVL ---
+# Iterativos: el camino desde la raíz se guarda en una lista y se recorre
+# al revés para re-balancear, en lugar de usar la pila de llamadas.
+# Con una lista en 'trace' se registran las visitas, la inserción o el borrado
+# y cada rotación con su caso (LL, LR, RR, RL); con None no cuesta nada.
+
+def insert(root, key, trace=None):
+    # 1. Inserción estándar de BST, guardando el camino recorrido
+    if not root:
+        if trace is not None: trace.append({"type": "insert", "key": key})
+        return Node(key)
+    path = []
+    node = root
+    while node:
+        if trace is not None: _visit(trace, node, key)
+        if key == node.key: return root # Claves duplicadas no se permiten
+        path.append(node)
+        node = node.left if key < node.key else node.right
+    parent = path[-1]
+    if key < parent.key: parent.left = Node(key)
+    else: parent.right = Node(key)
+    if trace is not None: trace.append({"type": "insert", "key": key, "parent": parent.key})
+
+    # 2. Actualizar alturas y re-balancear (4 casos) subiendo por el camino
+    return _retrace(path, trace)
+
+def delete(root, key, trace=None):
+    # Borrado de BST guardando el camino y luego re-balanceo hacia la raíz
+    path = []
+    node = root
+    while node:
+        if trace is not None: _visit(trace, node, key)
+        if node.key == key: break
+        path.append(node)
+        node = node.left if key < node.key else node.right
+    if not node: return root # La clave no estaba en el árbol
+    if trace is not None: trace.append({"type": "delete", "key": key})
 
-def search(root, key):
+    # Dos hijos: copiamos el sucesor in-order y pasamos a borrar el sucesor
+    if node.left and node.right:
+        path.append(node)
+        successor = node.right
+        while successor.left:
+            path.append(successor)
+            successor = successor.left
+        if trace is not None: trace.append({"type": "successor", "key": successor.key, "replaces": key})
+        node.key = successor.key
+        node = successor
+
+    # Ahora el nodo tiene un hijo o ninguno
+    replacement = node.left if node.left else node.right
+    if not path: return replacement # Borramos la raíz (el árbol puede quedar vacío)
+    parent = path[-1]
+    if parent.left is node: parent.left = replacement
+    else: parent.right = replacement
+
+    return _retrace(path, trace)
+
+def search(root, key, trace=None):
     # La búsqueda es idéntica a la del BST
-    if root is None or root.key == key: return root
-    if key < root.key: return search(root.left, key)
-    return search(root.right, key)
\ No newline at end of file
+    while root is not None:
+        if trace is not None: _visit(trace, root, key)
+        if root.key == key: break
+        root = root.left if key < root.key else root.right
+    return root
+
+
+# --- DIVIDIR Y UNIR ---
+# Base de las operaciones de conjuntos entre árboles (ver setops.py).
+
+def join(left, key, right):
+    """
+    Une dos AVL y una clave intermedia (las claves de 'left' < key < las de
+    'right') en O(|altura(left) - altura(right)| + 1): se baja por el borde
+    del más alto hasta un subárbol con la altura del otro, se cuelga ahí el
+    nodo nuevo y se re-balancea el camino como en la inserción.
+    """
+    middle = Node(key)
+    if get_height(left) > get_height(right) + 1:
+        path = []
+        node = left
+        while get_height(node) > get_height(right) + 1:
+            path.append(node)
+            node = node.right
+        middle.left, middle.right = node, right
+        _update(middle)
+        path[-1].right = middle
+        return _retrace(path)
+    if get_height(right) > get_height(left) + 1:
+        path = []
+        node = right
+        while get_height(node) > get_height(left) + 1:
+            path.append(node)
+            node = node.left
+        middle.left, middle.right = left, node
+        _update(middle)
+        path[-1].left = middle
+        return _retrace(path)
+    middle.left, middle.right = left, right
+    _update(middle)
+    return middle
+
+def join2(left, right):
+    """Une dos AVL sin clave intermedia: la mayor de 'left' pasa a hacer de clave de unión."""
+    if left is None: return right
+    if right is None: return left
+    key = maximum(left)
+    return join(delete(left, key), key, right)
+
+def split(root, key):
+    """
+    Divide el árbol en (claves < key, si 'key' estaba, claves > key) en
+    O(log n). Se baja buscando la clave y, al volver por el camino, cada
+    nodo se une con su subárbol del lado contrario. Consume 'root'.
+    """
+    path = []
+    node = root
+    while node is not None and node.key != key:
+        path.append(node)
+        node = node.left if key < node.key else node.right
+    found = node is not None
+    left, right = (node.left, node.right) if found else (None, None)
+    for node in reversed(path):
+        if key < node.key:
+            right = join(right, node.key, node.right)
+        else:
+            left = join(node.left, node.key, left)
+    return left, found, right
+
+
+# --- RESUMEN ---
+
+def summary(root):
+    """Número de claves, niveles, menor y mayor clave (las columnas de resumen de Tree)."""
+    return {"node_count": get_size(root), "height": get_height(root), "min_key": minimum(root), "max_key": maximum(root)}
+
+# Los nodos guardan tamaño y altura: el resumen completo ya cuesta O(h)
+quick_summary = summary
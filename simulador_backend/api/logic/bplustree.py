@@ -0,0 +1,402 @@
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+
+from . import compact
+
+# --- Estructura del Árbol B+ ---
+# Las claves viven solo en las hojas; los nodos internos guardan copias de
+# claves como separadores (todo lo del hijo i es < keys[i] <= todo lo del
+# hijo i+1). Las hojas están enlazadas en orden con 'next', así que un
+# recorrido por rango baja una vez y después solo avanza por la cadena.
+# Cada nodo tiene como mucho 2t-1 claves y, salvo la raíz, al menos t-1.
+
+class BPlusNode:
+    __slots__ = ('leaf', 'keys', 'children', 'next') # Sin __dict__ por nodo
+
+    def __init__(self, leaf=False):
+        self.leaf = leaf
+        self.keys = []
+        self.children = []
+        self.next = None # Siguiente hoja (solo en hojas)
+
+
+def _visit(trace, node):
+    trace.append({"type": "visit", "keys": list(node.keys)})
+
+def _find_leaf(root, key, path=None, trace=None):
+    """Baja hasta la hoja donde está (o estaría) 'key'. Guarda (nodo, índice) en 'path'."""
+    node = root
+    while not node.leaf:
+        if trace is not None: _visit(trace, node)
+        i = bisect_right(node.keys, key)
+        if path is not None: path.append((node, i))
+        node = node.children[i]
+    if trace is not None: _visit(trace, node)
+    return node
+
+
+# --- TRADUCTORES: JSON <-> ÁRBOL DE NODOS ---
+
+def tree_to_dict(root, highlight_key=None, highlight_keys=None, max_depth=None):
+    """
+    Mismo formato que el Árbol B: {"name": "[1, 2]", "children": [...]}.
+    Un nodo se resalta si contiene 'highlight_key' o alguna de 'highlight_keys'.
+    Los separadores de los nodos internos no se resaltan: solo las hojas
+    tienen las claves de verdad.
+    """
+    if not root: return None
+    root_children = []
+    stack = [(root, root_children, 0)] # (nodo, lista de hijos del diccionario padre, profundidad)
+    while stack:
+        node, siblings, depth = stack.pop()
+        key_str = ", ".join(map(str, node.keys))
+        node_dict = {"name": f"[{key_str}]"}
+        if node.leaf and (
+            (highlight_key is not None and highlight_key in node.keys)
+            or (highlight_keys and any(k in highlight_keys for k in node.keys))
+        ):
+            node_dict["highlighted"] = True
+        if not node.leaf:
+            if depth == max_depth: # Plegado (ver btree.tree_to_dict)
+                node_dict["collapsed"] = True
+                node_dict["child_count"] = len(node.children)
+            else:
+                node_dict["children"] = []
+                for child in reversed(node.children):
+                    stack.append((child, node_dict["children"], depth + 1))
+        siblings.append(node_dict)
+    return root_children[0]
+
+def dict_to_tree(data):
+    """
+    Reconstruye los nodos tal como estaban guardados y vuelve a enlazar las
+    hojas: el recorrido en preorden las encuentra de izquierda a derecha.
+    """
+    def node_from_dict(node_dict):
+        keys_str = node_dict['name'].strip('[]').replace(' ', '')
+        node = BPlusNode(leaf=not node_dict.get('children'))
+        node.keys = [int(k) for k in keys_str.split(',')] if keys_str else []
+        return node
+
+    if not data: return BPlusNode(leaf=True)
+    root = node_from_dict(data)
+    previous_leaf = None
+    stack = [(data, root)]
+    while stack:
+        node_dict, node = stack.pop()
+        if node.leaf:
+            if previous_leaf is not None: previous_leaf.next = node
+            previous_leaf = node
+            continue
+        node.children = [node_from_dict(child) for child in node_dict['children']]
+        for child_dict, child in zip(reversed(node_dict['children']), reversed(node.children)):
+            stack.append((child_dict, child))
+    return root
+
+def tree_to_compact(root, highlight_keys=None):
+    """
+    Formato compacto (ver logic/compact.py), igual que el del Árbol B: claves
+    de los nodos en preorden, 'counts' y 'height'. Las claves resaltadas se
+    guardan tal cual; al pasar a D3 solo se marcan las hojas.
+    """
+    keys, counts = [], []
+    stack = [root] if root else []
+    while stack:
+        node = stack.pop()
+        keys.extend(node.keys)
+        counts.append(len(node.keys))
+        if not node.leaf: stack.extend(reversed(node.children))
+    height = 0
+    node = root
+    while node and not node.leaf:
+        height += 1
+        node = node.children[0]
+    return compact.pack(keys, highlight_keys, counts=counts, height=height)
+
+def compact_to_tree(data):
+    """Reconstruye los nodos en preorden y enlaza las hojas en el orden en que aparecen."""
+    keys, height = data['keys'], data.get('height', 0)
+    root = previous_leaf = None
+    pos = 0
+    stack = [] # (nodo interno al que aún le faltan hijos, profundidad)
+    for count in data.get('counts') or [0]:
+        depth = stack[-1][1] + 1 if stack else 0
+        node = BPlusNode(leaf=depth == height)
+        node.keys = keys[pos:pos + count]
+        pos += count
+        if stack:
+            parent = stack[-1][0]
+            parent.children.append(node)
+            if len(parent.children) == len(parent.keys) + 1: stack.pop()
+        else:
+            root = node
+        if node.leaf:
+            if previous_leaf is not None: previous_leaf.next = node
+            previous_leaf = node
+        else:
+            stack.append((node, depth))
+    return root
+
+
+# --- CARGA MASIVA ---
+
+def _spread(total, parts):
+    # Reparte 'total' elementos en 'parts' grupos lo más parejos posible
+    base, extra = divmod(total, parts)
+    return [base + 1] * extra + [base] * (parts - extra)
+
+def build_from_sorted(keys, t=2, fill=1.0):
+    """
+    Carga masiva de abajo hacia arriba en O(n) desde claves ordenadas y sin
+    repetir: se llenan y enlazan las hojas, y cada nivel interno usa como
+    separador la menor clave de cada hijo (salvo el primero).
+    """
+    max_keys = 2 * t - 1
+    per_node = max(t - 1, min(max_keys, int(fill * max_keys)))
+    n = len(keys)
+    if n == 0: return BPlusNode(leaf=True)
+
+    count = -(-n // per_node)
+    while count > 1 and n // count < t - 1: count -= 1
+    nodes, minimums = [], []
+    pos = 0
+    for size in _spread(n, count):
+        leaf = BPlusNode(leaf=True)
+        leaf.keys = list(keys[pos:pos + size])
+        if nodes: nodes[-1].next = leaf
+        nodes.append(leaf)
+        minimums.append(leaf.keys[0])
+        pos += size
+
+    while len(nodes) > 1:
+        total = len(nodes)
+        count = -(-total // (per_node + 1))
+        while count > 1 and total // count < t: count -= 1
+        parents, parent_minimums = [], []
+        pos = 0
+        for size in _spread(total, count):
+            parent = BPlusNode(leaf=False)
+            parent.children = nodes[pos:pos + size]
+            parent.keys = minimums[pos + 1:pos + size]
+            parents.append(parent)
+            parent_minimums.append(minimums[pos])
+            pos += size
+        nodes, minimums = parents, parent_minimums
+    return nodes[0]
+
+
+# --- ALGORITMOS PRINCIPALES DEL ÁRBOL B+ ---
+# Inserción y borrado bajan guardando el camino y arreglan los nodos llenos
+# o con pocas claves de abajo hacia arriba. Todo es iterativo.
+
+def search(root, key, trace=None):
+    """Devuelve (hoja, índice) si la clave existe, si no None."""
+    if not root or not root.keys: return None
+    leaf = _find_leaf(root, key, trace=trace)
+    i = bisect_left(leaf.keys, key)
+    if i < len(leaf.keys) and leaf.keys[i] == key: return (leaf, i)
+    return None
+
+def range_keys(root, low, high, trace=None):
+    """
+    Devuelve todas las claves en [low, high] en orden, en O(log n + k):
+    baja una vez hasta la hoja de 'low' y sigue la cadena de hojas.
+    """
+    result = []
+    if not root or not root.keys or low > high: return result
+    leaf = _find_leaf(root, low, trace=trace)
+    i = bisect_left(leaf.keys, low)
+    while leaf is not None:
+        keys = leaf.keys
+        while i < len(keys):
+            if keys[i] > high: return result
+            result.append(keys[i])
+            i += 1
+        leaf, i = leaf.next, 0
+        if leaf is not None and trace is not None: trace.append({"type": "next_leaf", "keys": list(leaf.keys)})
+    return result
+
+def insert(root, key, t=2, trace=None):
+    if not root: root = BPlusNode(leaf=True)
+    path = []
+    node = _find_leaf(root, key, path, trace)
+    i = bisect_left(node.keys, key)
+    if i < len(node.keys) and node.keys[i] == key: return root # Claves duplicadas no se permiten
+    node.keys.insert(i, key)
+    if trace is not None: trace.append({"type": "insert", "key": key, "keys": list(node.keys)})
+
+    # Subimos dividiendo mientras el nodo tenga más de 2t-1 claves
+    while len(node.keys) > 2 * t - 1:
+        mid = len(node.keys) // 2
+        right = BPlusNode(leaf=node.leaf)
+        if node.leaf:
+            # En una hoja el separador es una copia: la clave se queda en la hoja derecha
+            right.keys = node.keys[mid:]
+            node.keys = node.keys[:mid]
+            right.next = node.next
+            node.next = right
+            separator = right.keys[0]
+        else:
+            # En un nodo interno el separador sube y deja de estar en el nodo
+            separator = node.keys[mid]
+            right.keys = node.keys[mid + 1:]
+            right.children = node.children[mid + 1:]
+            node.keys = node.keys[:mid]
+            node.children = node.children[:mid + 1]
+        if trace is not None:
+            trace.append({"type": "split", "keys": node.keys + right.keys, "separator": separator})
+
+        if not path:
+            new_root = BPlusNode(leaf=False)
+            new_root.keys = [separator]
+            new_root.children = [node, right]
+            return new_root
+        parent, i = path.pop()
+        parent.keys.insert(i, separator)
+        parent.children.insert(i + 1, right)
+        node = parent
+    return root
+
+def delete(root, key, t=2, trace=None):
+    if not root or not root.keys: return root
+    path = []
+    node = _find_leaf(root, key, path, trace)
+    i = bisect_left(node.keys, key)
+    if i == len(node.keys) or node.keys[i] != key: return root # La clave no estaba
+    node.keys.pop(i)
+    if trace is not None: trace.append({"type": "delete", "key": key})
+
+    # Subimos arreglando los nodos que quedaron con menos de t-1 claves
+    while path and len(node.keys) < t - 1:
+        parent, i = path.pop()
+        left = parent.children[i - 1] if i > 0 else None
+        right = parent.children[i + 1] if i + 1 < len(parent.children) else None
+
+        if left is not None and len(left.keys) > t - 1:
+            # Tomar prestado del hermano izquierdo
+            if node.leaf:
+                node.keys.insert(0, left.keys.pop())
+                parent.keys[i - 1] = node.keys[0]
+            else:
+                node.keys.insert(0, parent.keys[i - 1])
+                parent.keys[i - 1] = left.keys.pop()
+                node.children.insert(0, left.children.pop())
+            if trace is not None: trace.append({"type": "borrow", "from": "left", "keys": list(node.keys)})
+        elif right is not None and len(right.keys) > t - 1:
+            # Tomar prestado del hermano derecho
+            if node.leaf:
+                node.keys.append(right.keys.pop(0))
+                parent.keys[i] = right.keys[0]
+            else:
+                node.keys.append(parent.keys[i])
+                parent.keys[i] = right.keys.pop(0)
+                node.children.append(right.children.pop(0))
+            if trace is not None: trace.append({"type": "borrow", "from": "right", "keys": list(node.keys)})
+        else:
+            # Fusionar con un hermano (el izquierdo si existe)
+            k = i - 1 if left is not None else i
+            first, second = parent.children[k], parent.children[k + 1]
+            if first.leaf:
+                first.keys.extend(second.keys)
+                first.next = second.next
+                parent.keys.pop(k)
+            else:
+                first.keys.append(parent.keys.pop(k))
+                first.keys.extend(second.keys)
+                first.children.extend(second.children)
+            parent.children.pop(k + 1)
+            if trace is not None: trace.append({"type": "merge", "keys": list(first.keys)})
+        node = parent
+
+    # Si la raíz interna se quedó sin claves, su único hijo pasa a ser la raíz
+    if not root.leaf and not root.keys: root = root.children[0]
+    return root
+
+
+# --- RESUMEN ---
+
+def summary(root):
+    """
+    Columnas de resumen de Tree. Solo cuentan las claves de las hojas (los
+    separadores son copias), recorriendo la cadena de hojas.
+    """
+    if not root or not root.keys:
+        return {"node_count": 0, "height": 0, "min_key": None, "max_key": None}
+    height = 1
+    leaf = root
+    while not leaf.leaf:
+        height += 1
+        leaf = leaf.children[0]
+    first, count = leaf, 0
+    while leaf is not None:
+        count += len(leaf.keys)
+        last, leaf = leaf, leaf.next
+    return {"node_count": count, "height": height, "min_key": first.keys[0], "max_key": last.keys[-1]}
+
+def quick_summary(root):
+    """
+    Niveles y extremos bajando por los dos bordes, O(h), sin recorrer la
+    cadena de hojas: el número de claves lo actualiza storage con lo que
+    hizo cada operación (como en btree.quick_summary).
+    """
+    if not root or not root.keys:
+        return {"node_count": 0, "height": 0, "min_key": None, "max_key": None}
+    height = 1
+    first = last = root
+    while not first.leaf:
+        height += 1
+        first, last = first.children[0], last.children[-1]
+    return {"height": height, "min_key": first.keys[0], "max_key": last.keys[-1]}
+
+
+# --- Árboles B+ con grado 't' propio ---
+
+class BPlusTreeLogic:
+    """Interfaz del módulo con el grado mínimo 't' ya fijado (igual que btree.BTreeLogic)."""
+    def __init__(self, t):
+        self.t = t
+
+    @staticmethod
+    def tree_to_dict(root, highlight_key=None, highlight_keys=None, max_depth=None):
+        return tree_to_dict(root, highlight_key, highlight_keys, max_depth)
+
+    @staticmethod
+    def dict_to_tree(data):
+        return dict_to_tree(data)
+
+    @staticmethod
+    def tree_to_compact(root, highlight_keys=None):
+        return tree_to_compact(root, highlight_keys)
+
+    @staticmethod
+    def compact_to_tree(data):
+        return compact_to_tree(data)
+
+    @staticmethod
+    def summary(root):
+        return summary(root)
+
+    @staticmethod
+    def quick_summary(root):
+        return quick_summary(root)
+
+    def build_from_sorted(self, keys, fill=1.0):
+        return build_from_sorted(keys, self.t, fill)
+
+    def insert(self, root, key, trace=None):
+        return insert(root, key, self.t, trace)
+
+    @staticmethod
+    def search(root, key, trace=None):
+        return search(root, key, trace)
+
+    def delete(self, root, key, trace=None):
+        return delete(root, key, self.t, trace)
+
+    @staticmethod
+    def range_keys(root, low, high, trace=None):
+        return range_keys(root, low, high, trace)
+
+@lru_cache(maxsize=None)
+def for_degree(t):
+    return BPlusTreeLogic(t)
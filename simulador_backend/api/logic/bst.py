@@ -1,116 +1,268 @@
+from . import compact
+from .order import minimum, maximum, predecessor, successor, rank, select, range_keys # Consultas de orden comunes
+
 # Objeto simple para representar un nodo en el árbol.
 class Node:
+    # __slots__ evita un __dict__ por nodo: menos memoria en árboles grandes
+    __slots__ = ('key', 'left', 'right', 'size')
+
     def __init__(self, key):
         self.key = int(key) # Nos aseguramos de que la clave sea un entero
         self.left = None
         self.right = None
+        self.size = 1 # Número de nodos del subárbol (para rank/select)
+
+def get_size(node):
+    return node.size if node else 0
 
 # --- TRADUCTORES: JSON <-> ÁRBOL DE NODOS ---
 
-def tree_to_dict(node, highlight_key=None):
+def tree_to_dict(node, highlight_key=None, highlight_keys=None, max_depth=None):
     """
-    Convierte recursivamente un árbol de nodos a un diccionario D3.js/n3.js-friendly.
+    Convierte un árbol de nodos a un diccionario D3.js/n3.js-friendly.
     Formato: {"name": "valor", "children": [...]}
-    Añade una bandera 'highlighted' si la clave coincide con highlight_key.
+    Añade una bandera 'highlighted' si la clave coincide con highlight_key
+    o está en el conjunto highlight_keys (por ejemplo, el resultado de un rango).
+    Con 'max_depth' solo baja hasta esa profundidad (la raíz es 0); los nodos
+    de ese nivel con hijos quedan plegados ("collapsed").
+    Recorre el árbol con una pila explícita, así que no depende del límite
+    de recursión de Python aunque el árbol esté degenerado.
     """
     if node is None:
         return None
 
-    node_dict = {"name": str(node.key)}
-    
-    # Si esta es la clave que estamos buscando, la marcamos para el frontend.
-    if highlight_key is not None and node.key == highlight_key:
-        node_dict["highlighted"] = True
-
-    children = []
-    if node.left:
-        children.append(tree_to_dict(node.left, highlight_key))
-    if node.right:
-        children.append(tree_to_dict(node.right, highlight_key))
-        
-    if children:
-        node_dict["children"] = children
-        
-    return node_dict
+    root_children = []
+    # Cada entrada es (nodo, lista de hijos del diccionario padre).
+    # Apilamos el derecho antes que el izquierdo para conservar el orden.
+    stack = [(node, root_children, 0)]
+    while stack:
+        current, siblings, depth = stack.pop()
+        node_dict = {"name": str(current.key)}
+
+        # Si esta es la clave que estamos buscando, la marcamos para el frontend.
+        if (highlight_key is not None and current.key == highlight_key) or (highlight_keys and current.key in highlight_keys):
+            node_dict["highlighted"] = True
+
+        if current.left or current.right:
+            if depth == max_depth:
+                # Nodo plegado: se indica cuántos hijos y descendientes oculta
+                node_dict["collapsed"] = True
+                node_dict["child_count"] = (current.left is not None) + (current.right is not None)
+                node_dict["descendants"] = current.size - 1
+            else:
+                node_dict["children"] = []
+                if current.right:
+                    stack.append((current.right, node_dict["children"], depth + 1))
+                if current.left:
+                    stack.append((current.left, node_dict["children"], depth + 1))
+
+        siblings.append(node_dict)
+
+    return root_children[0]
 
 def dict_to_tree(data):
     """
     Convierte un diccionario (proveniente de JSON) a un árbol de nodos.
-    Esta función es más simple: solo inserta los valores uno por uno
-    para reconstruir el árbol BST y asegurar su integridad.
-    """
-    
-    def get_values(node_dict):
-        """Extrae todos los valores de la estructura de diccionario."""
-        if not node_dict:
-            return []
-        values = [int(node_dict['name'])]
-        if 'children' in node_dict:
-            for child in node_dict['children']:
-                values.extend(get_values(child))
-        return values
-
-    values = get_values(data)
+    Reconstruye los nodos directamente desde la estructura guardada, en una
+    sola pasada lineal y conservando la forma exacta del árbol.
+    Como el formato D3 no distingue hijo izquierdo de derecho, se decide
+    comparando la clave del hijo con la de su padre.
+    Los tamaños de los subárboles no se guardan: se recalculan al final.
+    """
+    if not data:
+        return None
+
+    root = Node(data['name'])
+    created = [root]
+    stack = [(data, root)]
+    while stack:
+        node_dict, node = stack.pop()
+        for child_dict in node_dict.get('children', []):
+            child = Node(child_dict['name'])
+            if child.key < node.key:
+                node.left = child
+            else:
+                node.right = child
+            created.append(child)
+            stack.append((child_dict, child))
+    # En orden inverso al de creación cada hijo va antes que su padre
+    for node in reversed(created):
+        node.size = 1 + get_size(node.left) + get_size(node.right)
+    return root
+
+def tree_to_compact(node, highlight_keys=None):
+    """
+    Formato compacto (ver logic/compact.py): las claves en preorden.
+    Ocupa y cuesta de leer mucho menos que el diccionario D3.
+    """
+    return compact.pack([current.key for current in compact.preorder(node)], highlight_keys)
+
+def compact_to_tree(data):
+    """Reconstruye el árbol desde el preorden y recalcula los tamaños, hijos antes que padres."""
+    nodes = compact.from_preorder(data['keys'], Node)
+    for node in reversed(nodes):
+        node.size = 1 + get_size(node.left) + get_size(node.right)
+    return nodes[0] if nodes else None
+
+
+# --- CARGA MASIVA ---
+
+def build_from_sorted(keys):
+    """
+    Construye un BST perfectamente balanceado a partir de claves ordenadas
+    y sin repetir, en O(n): la mediana de cada rango es la raíz del subárbol.
+    Devuelve la raíz del árbol.
+    """
+    if not keys:
+        return None
+
     root = None
-    for value in values:
-        root = insert(root, value) # Reutilizamos nuestra propia lógica de inserción
+    # Cada entrada es (inicio, fin, padre, es_hijo_izquierdo)
+    stack = [(0, len(keys) - 1, None, False)]
+    while stack:
+        lo, hi, parent, is_left = stack.pop()
+        mid = (lo + hi) // 2
+        node = Node(keys[mid])
+        node.size = hi - lo + 1
+        if parent is None:
+            root = node
+        elif is_left:
+            parent.left = node
+        else:
+            parent.right = node
+        if lo < mid:
+            stack.append((lo, mid - 1, node, True))
+        if mid < hi:
+            stack.append((mid + 1, hi, node, False))
     return root
 
 
 # --- ALGORITMOS PRINCIPALES DEL BST ---
+# Todos son iterativos: un BST construido con claves ordenadas es una lista
+# enlazada y la recursión superaría el límite de Python (~1000 niveles).
+#
+# Traza opcional: si se pasa una lista en 'trace', cada algoritmo añade
+# eventos pequeños (nodos visitados con su comparación, inserción, borrado,
+# sucesor usado) para animar la operación paso a paso. Con trace=None el
+# único coste es comprobar 'trace is not None'.
+#
+# Cada nodo guarda el tamaño de su subárbol: insert y delete lo ajustan en
+# los nodos del camino recorrido.
 
-def insert(root, key):
+def _visit(trace, node, key):
+    cmp = "<" if key < node.key else ">" if key > node.key else "="
+    trace.append({"type": "visit", "key": node.key, "cmp": cmp})
+
+def insert(root, key, trace=None):
     """
     Inserta una nueva clave en el BST. Devuelve la nueva raíz del árbol.
     """
     if root is None:
+        if trace is not None:
+            trace.append({"type": "insert", "key": key})
         return Node(key)
-    
-    if key < root.key:
-        root.left = insert(root.left, key)
-    elif key > root.key:
-        root.right = insert(root.right, key)
-        
+
+    path = [] # Ancestros del nuevo nodo, para actualizar sus tamaños
+    current = root
+    while True:
+        if trace is not None:
+            _visit(trace, current, key)
+        path.append(current)
+        if key < current.key:
+            if current.left is None:
+                current.left = Node(key)
+                break
+            current = current.left
+        elif key > current.key:
+            if current.right is None:
+                current.right = Node(key)
+                break
+            current = current.right
+        else:
+            return root # Claves duplicadas no se permiten
+
+    for node in path:
+        node.size += 1
+    if trace is not None:
+        trace.append({"type": "insert", "key": key, "parent": current.key})
     return root
 
-def search(root, key):
+def search(root, key, trace=None):
     """
     Busca una clave en el BST. Devuelve el nodo si lo encuentra, si no None.
     """
-    if root is None or root.key == key:
-        return root
-    
-    if key < root.key:
-        return search(root.left, key)
-    
-    return search(root.right, key)
+    current = root
+    while current is not None:
+        if trace is not None:
+            _visit(trace, current, key)
+        if current.key == key:
+            break
+        current = current.left if key < current.key else current.right
+    return current
 
-def delete(root, key):
+def delete(root, key, trace=None):
     """
     Elimina una clave del BST. Devuelve la nueva raíz del árbol.
     """
-    if not root:
+    # Buscamos el nodo a eliminar y su padre, guardando los ancestros
+    path = []
+    parent = None
+    current = root
+    while current is not None:
+        if trace is not None:
+            _visit(trace, current, key)
+        if current.key == key:
+            break
+        parent = current
+        path.append(current)
+        current = current.left if key < current.key else current.right
+
+    if current is None: # La clave no estaba en el árbol
         return root
 
-    # Buscamos el nodo a eliminar
-    if key < root.key:
-        root.left = delete(root.left, key)
-    elif key > root.key:
-        root.right = delete(root.right, key)
+    if trace is not None:
+        trace.append({"type": "delete", "key": key})
+
+    # Caso 2: El nodo tiene dos hijos
+    # Encontramos el sucesor in-order (el menor en el subárbol derecho),
+    # copiamos su valor y pasamos a eliminar el sucesor, que no tiene hijo izquierdo.
+    if current.left and current.right:
+        path.append(current)
+        successor_parent = current
+        successor = current.right
+        while successor.left:
+            path.append(successor)
+            successor_parent = successor
+            successor = successor.left
+        if trace is not None:
+            trace.append({"type": "successor", "key": successor.key, "replaces": key})
+        current.key = successor.key
+        parent, current = successor_parent, successor
+
+    # Caso 1: El nodo tiene un hijo o ninguno
+    for node in path:
+        node.size -= 1
+    replacement = current.left if current.left else current.right
+    if parent is None:
+        return replacement
+    if parent.left is current:
+        parent.left = replacement
     else:
-        # Caso 1: El nodo tiene un hijo o ninguno
-        if not root.left:
-            return root.right
-        elif not root.right:
-            return root.left
-
-        # Caso 2: El nodo tiene dos hijos
-        # Encontramos el sucesor in-order (el menor en el subárbol derecho)
-        temp = root.right
-        while temp.left:
-            temp = temp.left
-        
-        root.key = temp.key # Copiamos el valor del sucesor
-        root.right = delete(root.right, temp.key) # Eliminamos el sucesor
-
-    return root
\ No newline at end of file
+        parent.right = replacement
+    return root
+
+
+# --- RESUMEN ---
+
+def summary(root):
+    """Número de claves, niveles, menor y mayor clave (las columnas de resumen de Tree)."""
+    return {"node_count": get_size(root), "height": compact.height(root), "min_key": minimum(root), "max_key": maximum(root)}
+
+
+def quick_summary(root):
+    """
+    Las columnas que salen sin recorrer el árbol (tamaño de la raíz y los
+    extremos, O(h)). La altura no se guarda en los nodos: se recalcula con
+    summary cuando se reescribe la instantánea.
+    """
+    return {"node_count": get_size(root), "min_key": minimum(root), "max_key": maximum(root)}
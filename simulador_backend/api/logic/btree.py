@@ -1,28 +1,37 @@
+from bisect import bisect_left
+from functools import lru_cache
 
+from . import compact
 
 # --- Estructura de Clases del Árbol B ---
 class BTreeNode:
+    __slots__ = ('leaf', 'keys', 'children') # Sin __dict__ por nodo
+
     def __init__(self, leaf=False):
         self.leaf = leaf
         self.keys = []
         self.children = []
 
 class BTree:
-    def __init__(self, t):
+    def __init__(self, t, trace=None):
         self.root = BTreeNode(leaf=True)
         self.t = t # Grado mínimo
+        # Lista opcional de eventos (visitas, divisiones, préstamos, fusiones)
+        # para animar la operación. Con None no se registra nada.
+        self.trace = trace
 
     def search(self, key, node=None):
-        # (Implementación sin cambios)
+        # Descenso iterativo desde 'node' (o la raíz) hasta encontrar la clave
         node = node if node is not None else self.root
-        i = 0
-        while i < len(node.keys) and key > node.keys[i]: i += 1
-        if i < len(node.keys) and key == node.keys[i]: return (node, i)
-        elif node.leaf: return None
-        else: return self.search(key, node.children[i])
+        while True:
+            if self.trace is not None: self.trace.append({"type": "visit", "keys": list(node.keys)})
+            # Búsqueda binaria de la posición dentro del nodo
+            i = bisect_left(node.keys, key)
+            if i < len(node.keys) and key == node.keys[i]: return (node, i)
+            elif node.leaf: return None
+            node = node.children[i]
 
     def insert(self, key):
-        # (Implementación sin cambios)
         root = self.root
         if len(root.keys) == (2 * self.t) - 1:
             new_root = BTreeNode()
@@ -34,26 +43,29 @@ class BTree:
             self._insert_non_full(self.root, key)
 
     def _insert_non_full(self, node, key):
-        # (Implementación sin cambios)
-        i = len(node.keys) - 1
-        if node.leaf:
-            node.keys.append(0)
-            while i >= 0 and key < node.keys[i]:
-                node.keys[i + 1] = node.keys[i]
-                i -= 1
-            node.keys[i + 1] = key
-        else:
-            while i >= 0 and key < node.keys[i]: i -= 1
-            i += 1
+        # Bajamos dividiendo de antemano los hijos llenos, así nunca hay que
+        # volver hacia arriba y basta con un bucle.
+        # Las posiciones se buscan con bisect y las claves repetidas se ignoran,
+        # igual que en los demás árboles.
+        while not node.leaf:
+            if self.trace is not None: self.trace.append({"type": "visit", "keys": list(node.keys)})
+            i = bisect_left(node.keys, key)
+            if i < len(node.keys) and node.keys[i] == key: return
             if len(node.children[i].keys) == (2 * self.t) - 1:
                 self._split_child(node, i)
+                if key == node.keys[i]: return
                 if key > node.keys[i]: i += 1
-            self._insert_non_full(node.children[i], key)
+            node = node.children[i]
+        i = bisect_left(node.keys, key)
+        if i < len(node.keys) and node.keys[i] == key: return
+        node.keys.insert(i, key)
+        if self.trace is not None: self.trace.append({"type": "insert", "key": key, "keys": list(node.keys)})
     
     def _split_child(self, parent_node, child_index):
-        # (Implementación sin cambios)
         t = self.t
         full_child = parent_node.children[child_index]
+        if self.trace is not None:
+            self.trace.append({"type": "split", "keys": list(full_child.keys), "median": full_child.keys[t - 1]})
         new_node = BTreeNode(leaf=full_child.leaf)
         parent_node.keys.insert(child_index, full_child.keys[t - 1])
         parent_node.children.insert(child_index + 1, new_node)
@@ -67,61 +79,69 @@ class BTree:
     def delete(self, key, node=None):
         if node is None: node = self.root
         
-        self._delete_recursive(node, key)
+        self._delete_from(node, key)
 
         # Si la raíz queda vacía y no es una hoja, la reemplazamos por su único hijo
         if len(self.root.keys) == 0 and not self.root.leaf:
             self.root = self.root.children[0]
 
-    def _delete_recursive(self, node, key):
+    def _delete_from(self, node, key):
+        # Borrado en una sola bajada: cada caso termina descendiendo a un hijo
+        # (a veces buscando otra clave), así que el bucle reemplaza la recursión.
         t = self.t
-        i = 0
-        while i < len(node.keys) and key > node.keys[i]: i += 1
+        while True:
+            if self.trace is not None: self.trace.append({"type": "visit", "keys": list(node.keys)})
+            i = bisect_left(node.keys, key)
 
-        # CASO 1: La clave está en un nodo hoja
-        if node.leaf:
-            if i < len(node.keys) and node.keys[i] == key:
-                node.keys.pop(i)
-            return
+            # CASO 1: La clave está en un nodo hoja
+            if node.leaf:
+                if i < len(node.keys) and node.keys[i] == key:
+                    node.keys.pop(i)
+                    if self.trace is not None: self.trace.append({"type": "delete", "key": key})
+                return
 
-        # CASO 2: La clave está en un nodo interno
-        if i < len(node.keys) and node.keys[i] == key:
-            # CASO 2a: El hijo izquierdo tiene al menos 't' claves
-            if len(node.children[i].keys) >= t:
-                predecessor = self._find_predecessor(node.children[i])
-                node.keys[i] = predecessor
-                self._delete_recursive(node.children[i], predecessor)
-            # CASO 2b: El hijo derecho tiene al menos 't' claves
-            elif len(node.children[i+1].keys) >= t:
-                successor = self._find_successor(node.children[i+1])
-                node.keys[i] = successor
-                self._delete_recursive(node.children[i+1], successor)
-            # CASO 2c: Ambos hijos tienen 't-1' claves -> Fusionar
-            else:
-                self._merge_children(node, i)
-                self._delete_recursive(node.children[i], key)
-            return
-
-        # CASO 3: La clave no está aquí, hay que descender.
-        # Primero, asegurar que el hijo al que bajamos tenga al menos 't' claves.
-        child_node = node.children[i]
-        if len(child_node.keys) == t - 1:
-            # CASO 3a: Tomar prestado del hermano izquierdo
-            if i > 0 and len(node.children[i-1].keys) >= t:
-                self._borrow_from_prev(node, i)
-            # CASO 3a: Tomar prestado del hermano derecho
-            elif i < len(node.keys) and len(node.children[i+1].keys) >= t:
-                self._borrow_from_next(node, i)
-            # CASO 3b: Fusionar
-            else:
-                if i < len(node.keys):
+            # CASO 2: La clave está en un nodo interno
+            if i < len(node.keys) and node.keys[i] == key:
+                # CASO 2a: El hijo izquierdo tiene al menos 't' claves
+                if len(node.children[i].keys) >= t:
+                    predecessor = self._find_predecessor(node.children[i])
+                    if self.trace is not None:
+                        self.trace.append({"type": "predecessor", "key": predecessor, "replaces": key})
+                    node.keys[i] = predecessor
+                    node, key = node.children[i], predecessor
+                # CASO 2b: El hijo derecho tiene al menos 't' claves
+                elif len(node.children[i+1].keys) >= t:
+                    successor = self._find_successor(node.children[i+1])
+                    if self.trace is not None:
+                        self.trace.append({"type": "successor", "key": successor, "replaces": key})
+                    node.keys[i] = successor
+                    node, key = node.children[i+1], successor
+                # CASO 2c: Ambos hijos tienen 't-1' claves -> Fusionar
+                else:
                     self._merge_children(node, i)
-                else: # El hijo es el último, fusionar con el anterior
-                    self._merge_children(node, i - 1)
-                    i -= 1 # Apuntar al nuevo nodo fusionado
+                    node = node.children[i]
+                continue
+
+            # CASO 3: La clave no está aquí, hay que descender.
+            # Primero, asegurar que el hijo al que bajamos tenga al menos 't' claves.
             child_node = node.children[i]
-        
-        self._delete_recursive(child_node, key)
+            if len(child_node.keys) == t - 1:
+                # CASO 3a: Tomar prestado del hermano izquierdo
+                if i > 0 and len(node.children[i-1].keys) >= t:
+                    self._borrow_from_prev(node, i)
+                # CASO 3a: Tomar prestado del hermano derecho
+                elif i < len(node.keys) and len(node.children[i+1].keys) >= t:
+                    self._borrow_from_next(node, i)
+                # CASO 3b: Fusionar
+                else:
+                    if i < len(node.keys):
+                        self._merge_children(node, i)
+                    else: # El hijo es el último, fusionar con el anterior
+                        self._merge_children(node, i - 1)
+                        i -= 1 # Apuntar al nuevo nodo fusionado
+                child_node = node.children[i]
+
+            node = child_node
 
     def _find_predecessor(self, node):
         # El predecesor es la clave más a la derecha en el subárbol
@@ -147,6 +167,7 @@ class BTree:
         # Mover hijo del hermano al hijo
         if not sibling.leaf:
             child.children.insert(0, sibling.children.pop())
+        if self.trace is not None: self.trace.append({"type": "borrow", "from": "left", "keys": list(child.keys)})
 
     def _borrow_from_next(self, parent_node, child_index):
         child = parent_node.children[child_index]
@@ -157,6 +178,7 @@ class BTree:
 
         if not sibling.leaf:
             child.children.append(sibling.children.pop(0))
+        if self.trace is not None: self.trace.append({"type": "borrow", "from": "right", "keys": list(child.keys)})
 
     def _merge_children(self, parent_node, child_index):
         child = parent_node.children[child_index]
@@ -170,49 +192,382 @@ class BTree:
         
         # Eliminar al hermano del padre
         parent_node.children.pop(child_index + 1)
+        if self.trace is not None: self.trace.append({"type": "merge", "keys": list(child.keys)})
 
 
 # --- Interfaz Pública para la API ---
 
-def tree_to_dict(btree_node, highlight_key=None): # Sin cambios
+def tree_to_dict(btree_node, highlight_key=None, highlight_keys=None, max_depth=None):
     if not btree_node: return None
-    key_str = ", ".join(map(str, btree_node.keys))
-    node_dict = {"name": f"[{key_str}]"}
-    if highlight_key is not None and highlight_key in btree_node.keys:
-        node_dict["highlighted"] = True
-    if not btree_node.leaf:
-        node_dict["children"] = [tree_to_dict(child, highlight_key) for child in btree_node.children]
-    return node_dict
-
-def dict_to_tree(data, t=2): # Sin cambios
-    def get_values(node_dict):
-        if not node_dict: return []
+    root_children = []
+    stack = [(btree_node, root_children, 0)] # (nodo, lista de hijos del diccionario padre, profundidad)
+    while stack:
+        node, siblings, depth = stack.pop()
+        key_str = ", ".join(map(str, node.keys))
+        node_dict = {"name": f"[{key_str}]"}
+        if (highlight_key is not None and highlight_key in node.keys) or (highlight_keys and any(k in highlight_keys for k in node.keys)):
+            node_dict["highlighted"] = True
+        if not node.leaf:
+            if depth == max_depth:
+                # Nodo plegado: a partir de 'max_depth' solo se indica cuántos hijos tiene
+                node_dict["collapsed"] = True
+                node_dict["child_count"] = len(node.children)
+            else:
+                node_dict["children"] = []
+                for child in reversed(node.children):
+                    stack.append((child, node_dict["children"], depth + 1))
+        siblings.append(node_dict)
+    return root_children[0]
+
+def dict_to_tree(data):
+    # Reconstruye los nodos tal como estaban guardados: mismos grupos de claves
+    # y mismas hojas, sin volver a insertar ni dividir nodos.
+    def node_from_dict(node_dict):
         keys_str = node_dict['name'].strip('[]').replace(' ', '')
-        if not keys_str: return []
-        values = [int(k) for k in keys_str.split(',')]
-        if 'children' in node_dict:
-            for child in node_dict['children']: values.extend(get_values(child))
-        return values
-    values = get_values(data)
-    btree = BTree(t)
-    for v in sorted(values): btree.insert(v)
-    return btree.root
+        node = BTreeNode(leaf=not node_dict.get('children'))
+        node.keys = [int(k) for k in keys_str.split(',')] if keys_str else []
+        return node
+    if not data: return BTreeNode(leaf=True)
+    root = node_from_dict(data)
+    stack = [(data, root)]
+    while stack:
+        node_dict, node = stack.pop()
+        for child_dict in node_dict.get('children', []):
+            child = node_from_dict(child_dict)
+            node.children.append(child)
+            stack.append((child_dict, child))
+    return root
+
+# Formato compacto (ver logic/compact.py): las claves de todos los nodos en
+# preorden, cuántas tiene cada nodo ('counts') y la altura. Como todas las
+# hojas están a la misma profundidad, con la altura basta para saber qué
+# nodos son hojas; cada nodo interno tiene len(keys) + 1 hijos.
+def tree_to_compact(btree_node, highlight_keys=None):
+    keys, counts = [], []
+    stack = [btree_node] if btree_node else []
+    while stack:
+        node = stack.pop()
+        keys.extend(node.keys)
+        counts.append(len(node.keys))
+        if not node.leaf: stack.extend(reversed(node.children))
+    height = 0
+    node = btree_node
+    while node and not node.leaf:
+        height += 1
+        node = node.children[0]
+    return compact.pack(keys, highlight_keys, counts=counts, height=height)
+
+def compact_to_tree(data):
+    keys, height = data['keys'], data.get('height', 0)
+    root = None
+    pos = 0
+    stack = [] # (nodo interno al que aún le faltan hijos, profundidad)
+    for count in data.get('counts') or [0]:
+        depth = stack[-1][1] + 1 if stack else 0
+        node = BTreeNode(leaf=depth == height)
+        node.keys = keys[pos:pos + count]
+        pos += count
+        if stack:
+            parent = stack[-1][0]
+            parent.children.append(node)
+            if len(parent.children) == len(parent.keys) + 1: stack.pop()
+        else:
+            root = node
+        if not node.leaf: stack.append((node, depth))
+    return root
+
+def _spread(total, parts):
+    # Reparte 'total' elementos en 'parts' grupos lo más parejos posible
+    base, extra = divmod(total, parts)
+    return [base + 1] * extra + [base] * (parts - extra)
+
+def build_from_sorted(keys, t=2, fill=1.0):
+    # Carga masiva de abajo hacia arriba en O(n) desde claves ordenadas y sin
+    # repetir. 'fill' es el factor de llenado de cada nodo (1.0 = nodos llenos
+    # con 2t-1 claves); nunca baja del mínimo de t-1 claves por nodo.
+    max_keys = 2 * t - 1
+    per_node = max(t - 1, min(max_keys, int(fill * max_keys)))
+    n = len(keys)
+    if n == 0: return BTreeNode(leaf=True)
 
-def insert(root_node, key, t=2): # Sin cambios
-    btree = BTree(t)
+    # 1. Hojas: cada hoja toma su grupo de claves y la clave siguiente queda
+    #    como separador para el nivel de arriba.
+    count = -(-(n + 1) // (per_node + 1))
+    while count > 1 and (n - count + 1) // count < t - 1: count -= 1
+    nodes, separators = [], []
+    pos = 0
+    for i, size in enumerate(_spread(n - count + 1, count)):
+        leaf = BTreeNode(leaf=True)
+        leaf.keys = list(keys[pos:pos + size])
+        pos += size
+        nodes.append(leaf)
+        if i < count - 1:
+            separators.append(keys[pos])
+            pos += 1
+
+    # 2. Niveles internos: agrupamos hijos consecutivos (entre t y 2t por nodo)
+    #    con los separadores que hay entre ellos, hasta que quede una raíz.
+    while len(nodes) > 1:
+        total = len(nodes)
+        count = -(-total // (per_node + 1))
+        while count > 1 and total // count < t: count -= 1
+        parents, upper_separators = [], []
+        pos = 0
+        for j, size in enumerate(_spread(total, count)):
+            parent = BTreeNode(leaf=False)
+            parent.children = nodes[pos:pos + size]
+            parent.keys = separators[pos:pos + size - 1]
+            pos += size
+            parents.append(parent)
+            if j < count - 1: upper_separators.append(separators[pos - 1])
+        nodes, separators = parents, upper_separators
+    return nodes[0]
+
+def insert(root_node, key, t=2, trace=None):
+    btree = BTree(t, trace)
     if root_node and root_node.keys: btree.root = root_node
     btree.insert(key)
     return btree.root
 
-def search(root_node, key, t=2): # Sin cambios
+def search(root_node, key, t=2, trace=None):
     if not root_node or not root_node.keys: return None
-    btree = BTree(t)
+    btree = BTree(t, trace)
     btree.root = root_node
     return btree.search(key)
 
-def delete(root_node, key, t=2):
+def delete(root_node, key, t=2, trace=None):
     if not root_node or not root_node.keys: return root_node
-    btree = BTree(t)
+    btree = BTree(t, trace)
     btree.root = root_node
     btree.delete(key)
-    return btree.root
\ No newline at end of file
+    return btree.root
+
+# --- DIVIDIR Y UNIR ---
+# Base de las operaciones de conjuntos entre árboles (ver setops.py). Los
+# trozos intermedios pueden tener una raíz con menos de t - 1 claves (como
+# cualquier raíz); join los arregla al colgarlos dentro de otro árbol.
+
+def _is_empty(node):
+    return node is None or not node.keys
+
+def _height(node):
+    # Niveles por el camino más a la izquierda (todas las hojas están a la misma profundidad)
+    height = 1
+    while not node.leaf:
+        height += 1
+        node = node.children[0]
+    return height
+
+def _piece(keys, children, leaf):
+    """Nodo con esas claves e hijos; sin claves es su único hijo (o un árbol vacío)."""
+    if not keys:
+        return children[0] if children else BTreeNode(leaf=True)
+    node = BTreeNode(leaf)
+    node.keys = keys
+    node.children = children
+    return node
+
+def _join_siblings(left, key, right, t):
+    """
+    Junta dos nodos de la misma altura y su separador. Devuelve (nodo,) si
+    caben en uno, o (izquierdo, separador, derecho) con al menos t - 1
+    claves en cada lado.
+    """
+    keys = left.keys + [key] + right.keys
+    children = left.children + right.children
+    if len(keys) <= 2 * t - 1:
+        return (_piece(keys, children, left.leaf),)
+    if len(left.keys) >= t - 1 and len(right.keys) >= t - 1:
+        return (left, key, right)
+    mid = len(keys) // 2
+    return (_piece(keys[:mid], children[:mid + 1], left.leaf), keys[mid],
+            _piece(keys[mid + 1:], children[mid + 1:], left.leaf))
+
+def _split_up(path, t):
+    """Divide hacia arriba por el camino (de la raíz hacia abajo) los nodos con una clave de más."""
+    for i in range(len(path) - 1, -1, -1):
+        node = path[i]
+        if len(node.keys) <= 2 * t - 1:
+            break
+        mid = len(node.keys) // 2
+        left = _piece(node.keys[:mid], node.children[:mid + 1], node.leaf)
+        right = _piece(node.keys[mid + 1:], node.children[mid + 1:], node.leaf)
+        if i == 0:
+            root = BTreeNode()
+            root.keys = [node.keys[mid]]
+            root.children = [left, right]
+            return root
+        parent = path[i - 1]
+        pos = parent.children.index(node)
+        parent.children[pos:pos + 1] = [left, right]
+        parent.keys.insert(pos, node.keys[mid])
+    return path[0]
+
+def join(left, key, right, t=2):
+    """
+    Une dos árboles B y una clave intermedia (las claves de 'left' < key <
+    las de 'right') en O(t · diferencia de alturas): el más bajo se cuelga
+    en el borde del más alto, al nivel que le corresponde, y los nodos que
+    se llenen se dividen hacia arriba como en la inserción.
+    """
+    if _is_empty(left): return insert(right, key, t)
+    if _is_empty(right): return insert(left, key, t)
+    left_height, right_height = _height(left), _height(right)
+    if left_height == right_height:
+        joined = _join_siblings(left, key, right, t)
+        if len(joined) == 1:
+            return joined[0]
+        root = BTreeNode()
+        root.keys = [joined[1]]
+        root.children = [joined[0], joined[2]]
+        return root
+
+    # Camino por el borde del más alto hasta el padre de los nodos de la altura del otro
+    taller_is_left = left_height > right_height
+    path = [left if taller_is_left else right]
+    for _ in range(abs(left_height - right_height) - 1):
+        path.append(path[-1].children[-1 if taller_is_left else 0])
+    parent = path[-1]
+    if taller_is_left:
+        joined = _join_siblings(parent.children[-1], key, right, t)
+        parent.children[-1:] = [joined[0]] + ([joined[2]] if len(joined) == 3 else [])
+        if len(joined) == 3: parent.keys.append(joined[1])
+    else:
+        joined = _join_siblings(left, key, parent.children[0], t)
+        parent.children[:1] = [joined[0]] + ([joined[2]] if len(joined) == 3 else [])
+        if len(joined) == 3: parent.keys.insert(0, joined[1])
+    return _split_up(path, t)
+
+def join2(left, right, t=2):
+    """Une dos árboles B sin clave intermedia: la menor de 'right' pasa a hacer de clave de unión."""
+    if _is_empty(right): return left
+    if _is_empty(left): return right
+    node = right
+    while not node.leaf:
+        node = node.children[0]
+    key = node.keys[0]
+    return join(left, key, delete(right, key, t), t)
+
+def split(root_node, key, t=2):
+    """
+    Divide el árbol en (claves < key, si 'key' estaba, claves > key). Se
+    baja buscando la clave; cada nodo del camino queda partido en su parte
+    izquierda y derecha, que al volver se unen con join a lo ya dividido.
+    Consume 'root_node'.
+    """
+    if _is_empty(root_node):
+        return BTreeNode(leaf=True), False, BTreeNode(leaf=True)
+    path = [] # (nodo, hijo por el que se bajó)
+    node = root_node
+    while True:
+        i = bisect_left(node.keys, key)
+        if i < len(node.keys) and node.keys[i] == key:
+            found = True
+            left = _piece(node.keys[:i], node.children[:i + 1], node.leaf)
+            right = _piece(node.keys[i + 1:], node.children[i + 1:], node.leaf)
+            break
+        if node.leaf:
+            found = False
+            left = _piece(node.keys[:i], [], True)
+            right = _piece(node.keys[i:], [], True)
+            break
+        path.append((node, i))
+        node = node.children[i]
+    for node, i in reversed(path):
+        if i > 0:
+            left = join(_piece(node.keys[:i - 1], node.children[:i], False), node.keys[i - 1], left, t)
+        if i < len(node.keys):
+            right = join(right, node.keys[i], _piece(node.keys[i + 1:], node.children[i + 1:], False), t)
+    return left, found, right
+
+def summary(root_node):
+    # Columnas de resumen de Tree: claves de todos los nodos, niveles y
+    # extremos (primera clave de la hoja más a la izquierda, última de la
+    # más a la derecha)
+    if not root_node or not root_node.keys:
+        return {"node_count": 0, "height": 0, "min_key": None, "max_key": None}
+    count, height = 0, 1
+    stack = [root_node]
+    while stack:
+        node = stack.pop()
+        count += len(node.keys)
+        if not node.leaf: stack.extend(node.children)
+    first = last = root_node
+    while not first.leaf:
+        height += 1
+        first, last = first.children[0], last.children[-1]
+    return {"node_count": count, "height": height, "min_key": first.keys[0], "max_key": last.keys[-1]}
+
+def quick_summary(root_node):
+    # Lo que sale bajando por los dos bordes, O(h): niveles y extremos. El
+    # número de claves (recorrer todos los nodos) lo actualiza storage con
+    # lo que hizo cada operación.
+    if not root_node or not root_node.keys:
+        return {"node_count": 0, "height": 0, "min_key": None, "max_key": None}
+    height = 1
+    first = last = root_node
+    while not first.leaf:
+        height += 1
+        first, last = first.children[0], last.children[-1]
+    return {"height": height, "min_key": first.keys[0], "max_key": last.keys[-1]}
+
+
+# --- Árboles B con grado 't' propio ---
+
+class BTreeLogic:
+    """
+    Misma interfaz que este módulo (la que usan las vistas para cualquier
+    tipo de árbol), pero con el grado mínimo 't' fijado. Así el resto del
+    código no necesita saber que el Árbol B tiene un parámetro extra.
+    """
+    def __init__(self, t):
+        self.t = t
+
+    @staticmethod
+    def tree_to_dict(btree_node, highlight_key=None, highlight_keys=None, max_depth=None):
+        return tree_to_dict(btree_node, highlight_key, highlight_keys, max_depth)
+
+    @staticmethod
+    def dict_to_tree(data):
+        return dict_to_tree(data)
+
+    @staticmethod
+    def tree_to_compact(btree_node, highlight_keys=None):
+        return tree_to_compact(btree_node, highlight_keys)
+
+    @staticmethod
+    def compact_to_tree(data):
+        return compact_to_tree(data)
+
+    @staticmethod
+    def summary(root_node):
+        return summary(root_node)
+
+    @staticmethod
+    def quick_summary(root_node):
+        return quick_summary(root_node)
+
+    def build_from_sorted(self, keys, fill=1.0):
+        return build_from_sorted(keys, self.t, fill)
+
+    def insert(self, root_node, key, trace=None):
+        return insert(root_node, key, self.t, trace)
+
+    def search(self, root_node, key, trace=None):
+        return search(root_node, key, self.t, trace)
+
+    def delete(self, root_node, key, trace=None):
+        return delete(root_node, key, self.t, trace)
+
+    def join(self, left, key, right):
+        return join(left, key, right, self.t)
+
+    def join2(self, left, right):
+        return join2(left, right, self.t)
+
+    def split(self, root_node, key):
+        return split(root_node, key, self.t)
+
+@lru_cache(maxsize=None)
+def for_degree(t):
+    return BTreeLogic(t)
@@ -0,0 +1,81 @@
+"""
+Formato compacto de los árboles: listas planas de enteros en lugar del
+diccionario D3 anidado ({"name": ..., "children": [...]}).
+
+    {"format": "compact", "keys": [...], "highlight": [...]}
+
+- Árboles binarios (BST, AVL, Splay, Rojo-Negro, Treap): 'keys' son las
+  claves en preorden. En un BST el preorden basta para reconstruir la forma
+  exacta, así que no hace falta guardar índices de hijos. Las alturas y los
+  tamaños se recalculan; el Rojo-Negro añade 'red' (una cadena de "0"/"1",
+  un carácter por nodo) y el Treap 'priority' (una lista), ambos en preorden.
+- Árboles B y B+: 'keys' son todas las claves de los nodos en preorden,
+  'counts' cuántas claves tiene cada nodo y 'height' el número de niveles
+  por debajo de la raíz (todas las hojas están a esa profundidad).
+- Arreglo ordenado: 'keys' es el arreglo.
+
+'highlight' (opcional) son las claves resaltadas. Cada módulo de lógica
+tiene tree_to_compact y compact_to_tree; la conversión a D3 solo se hace
+cuando un cliente lo pide.
+"""
+
+FORMAT = "compact"
+
+
+def is_compact(data):
+    return isinstance(data, dict) and data.get('format') == FORMAT
+
+
+def pack(keys, highlight_keys=None, **extra):
+    """Diccionario compacto con las claves, las claves resaltadas y los campos extra del tipo de árbol."""
+    data = {"format": FORMAT, "keys": keys}
+    data.update(extra)
+    if highlight_keys:
+        data["highlight"] = sorted(highlight_keys)
+    return data
+
+
+def preorder(root):
+    """Nodos de un árbol binario en preorden (raíz, subárbol izquierdo, subárbol derecho)."""
+    nodes = []
+    stack = [root] if root is not None else []
+    while stack:
+        node = stack.pop()
+        nodes.append(node)
+        if node.right is not None: stack.append(node.right)
+        if node.left is not None: stack.append(node.left)
+    return nodes
+
+
+def height(root):
+    """Número de niveles de un árbol binario (0 si está vacío), con una pila de (nodo, profundidad)."""
+    best = 0
+    stack = [(root, 1)] if root is not None else []
+    while stack:
+        node, depth = stack.pop()
+        if depth > best: best = depth
+        if node.left is not None: stack.append((node.left, depth + 1))
+        if node.right is not None: stack.append((node.right, depth + 1))
+    return best
+
+
+def from_preorder(keys, make_node):
+    """
+    Reconstruye un BST desde sus claves en preorden en O(n): la pila guarda
+    el camino de nodos que todavía pueden recibir un hijo derecho. Devuelve
+    los nodos creados en preorden (el primero es la raíz), así cada hijo va
+    después de su padre y se pueden recalcular alturas y tamaños al revés.
+    """
+    nodes = [make_node(key) for key in keys]
+    if not nodes: return nodes
+    stack = [nodes[0]]
+    for node in nodes[1:]:
+        if node.key < stack[-1].key:
+            stack[-1].left = node
+        else:
+            parent = stack.pop()
+            while stack and stack[-1].key < node.key:
+                parent = stack.pop()
+            parent.right = node
+        stack.append(node)
+    return nodes
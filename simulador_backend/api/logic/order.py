@@ -0,0 +1,127 @@
+"""
+Consultas de orden comunes a los árboles binarios con el tamaño de cada
+subárbol en 'size' (BST, AVL, Splay, Rojo-Negro y Treap): minimum,
+maximum, predecessor, successor, rank, select y range_keys.
+
+Devuelven claves (o None si no hay), no nodos. 'rank' y 'select' usan el
+tamaño de los subárboles, así que cuestan lo mismo que una búsqueda. Solo
+leen 'key', 'left', 'right' y 'size', así que sirven para cualquier nodo
+binario; cada módulo de lógica las importa y las expone como propias.
+"""
+
+
+def _size(node):
+    return node.size if node else 0
+
+
+def _visit(trace, node, key):
+    cmp = "<" if key < node.key else ">" if key > node.key else "="
+    trace.append({"type": "visit", "key": node.key, "cmp": cmp})
+
+
+def minimum(root, trace=None):
+    """Devuelve la menor clave del árbol."""
+    node = root
+    while node is not None:
+        if trace is not None:
+            trace.append({"type": "visit", "key": node.key})
+        if node.left is None:
+            return node.key
+        node = node.left
+    return None
+
+def maximum(root, trace=None):
+    """Devuelve la mayor clave del árbol."""
+    node = root
+    while node is not None:
+        if trace is not None:
+            trace.append({"type": "visit", "key": node.key})
+        if node.right is None:
+            return node.key
+        node = node.right
+    return None
+
+def predecessor(root, key, trace=None):
+    """Devuelve la mayor clave estrictamente menor que 'key'."""
+    best = None
+    node = root
+    while node is not None:
+        if trace is not None:
+            _visit(trace, node, key)
+        if node.key < key:
+            best = node.key
+            node = node.right
+        else:
+            node = node.left
+    return best
+
+def successor(root, key, trace=None):
+    """Devuelve la menor clave estrictamente mayor que 'key'."""
+    best = None
+    node = root
+    while node is not None:
+        if trace is not None:
+            _visit(trace, node, key)
+        if node.key > key:
+            best = node.key
+            node = node.left
+        else:
+            node = node.right
+    return best
+
+def rank(root, key, trace=None):
+    """Cuántas claves del árbol son menores que 'key' (su posición empezando en 0)."""
+    result = 0
+    node = root
+    while node is not None:
+        if trace is not None:
+            _visit(trace, node, key)
+        if key <= node.key:
+            node = node.left
+        else:
+            result += _size(node.left) + 1
+            node = node.right
+    return result
+
+def select(root, index, trace=None):
+    """Devuelve la clave en la posición 'index' (empezando en 0) del recorrido in-order."""
+    if index < 0 or index >= _size(root):
+        return None
+    node = root
+    while node is not None:
+        if trace is not None:
+            trace.append({"type": "visit", "key": node.key})
+        left_size = _size(node.left)
+        if index < left_size:
+            node = node.left
+        elif index == left_size:
+            return node.key
+        else:
+            index -= left_size + 1
+            node = node.right
+    return None
+
+def range_keys(root, low, high, trace=None):
+    """
+    Devuelve en orden las claves en [low, high], en O(h + k): un recorrido
+    in-order con pila que no entra en los subárboles que quedan fuera.
+    """
+    result = []
+    stack = []
+    node = root
+    while stack or node is not None:
+        if node is not None:
+            if trace is not None:
+                trace.append({"type": "visit", "key": node.key})
+            if node.key >= low:
+                stack.append(node)
+                node = node.left
+            else:
+                node = node.right # Todo el subárbol izquierdo es menor que 'low'
+        else:
+            node = stack.pop()
+            if node.key > high:
+                break
+            result.append(node.key)
+            node = node.right
+    return result
@@ -0,0 +1,290 @@
+from . import compact
+from .order import minimum, maximum, predecessor, successor, rank, select, range_keys # Consultas de orden comunes
+
+class Node:
+    __slots__ = ('key', 'left', 'right', 'red', 'size') # Sin __dict__ por nodo
+
+    def __init__(self, key, red=True):
+        self.key = int(key)
+        self.left = None
+        self.right = None
+        self.red = red # Un nodo nuevo siempre entra rojo
+        self.size = 1 # Número de nodos del subárbol (para rank/select)
+
+# Igual que en el AVL, el color va dentro del nombre: "clave (R)" o "clave (N)",
+# con 'original_name' para la clave. dict_to_tree conserva forma y colores.
+def tree_to_dict(node, highlight_key=None, highlight_keys=None, max_depth=None):
+    if not node: return None
+    root_children = []
+    stack = [(node, root_children, 0)] # (nodo, lista de hijos del diccionario padre, profundidad)
+    while stack:
+        current, siblings, depth = stack.pop()
+        color = "R" if current.red else "N"
+        node_dict = {"name": f"{current.key} ({color})", "original_name": str(current.key)}
+        if (highlight_key is not None and current.key == highlight_key) or (highlight_keys and current.key in highlight_keys):
+            node_dict["highlighted"] = True
+        if current.left or current.right:
+            if depth == max_depth: # Plegado (ver bst.tree_to_dict)
+                node_dict["collapsed"] = True
+                node_dict["child_count"] = (current.left is not None) + (current.right is not None)
+                node_dict["descendants"] = current.size - 1
+            else:
+                node_dict["children"] = []
+                if current.right: stack.append((current.right, node_dict["children"], depth + 1))
+                if current.left: stack.append((current.left, node_dict["children"], depth + 1))
+        siblings.append(node_dict)
+    return root_children[0]
+
+def _node_from_dict(node_dict):
+    name = node_dict['name']
+    return Node(node_dict.get('original_name', name.split(' ')[0]), red=name.endswith('(R)'))
+
+def dict_to_tree(data):
+    if not data: return None
+    root = _node_from_dict(data)
+    created = [root]
+    stack = [(data, root)]
+    while stack:
+        node_dict, node = stack.pop()
+        for child_dict in node_dict.get('children', []):
+            child = _node_from_dict(child_dict)
+            if child.key < node.key: node.left = child
+            else: node.right = child
+            created.append(child)
+            stack.append((child_dict, child))
+    # Los tamaños no se guardan: de abajo hacia arriba (hijos antes que padres)
+    for node in reversed(created):
+        _update(node)
+    return root
+
+# Formato compacto (ver logic/compact.py): claves en preorden y los colores
+# en 'red', un carácter "1" (rojo) o "0" (negro) por nodo en el mismo orden.
+def tree_to_compact(node, highlight_keys=None):
+    nodes = compact.preorder(node)
+    return compact.pack([current.key for current in nodes], highlight_keys,
+                        red="".join("1" if current.red else "0" for current in nodes))
+
+def compact_to_tree(data):
+    nodes = compact.from_preorder(data['keys'], Node)
+    for node, color in zip(nodes, data.get('red', '')):
+        node.red = color == "1"
+    for node in reversed(nodes):
+        _update(node)
+    return nodes[0] if nodes else None
+
+def build_from_sorted(keys):
+    # Carga masiva en O(n) desde claves ordenadas y sin repetir: la mediana de
+    # cada rango es la raíz, así que todas las hojas quedan a profundidad d o d+1
+    # con d = floor(log2(n + 1)). Los nodos del último nivel (incompleto) son
+    # rojos y el resto negros: todos los caminos tienen d nodos negros.
+    if not keys: return None
+    black_depth = (len(keys) + 1).bit_length() - 1
+    root = None
+    stack = [(0, len(keys) - 1, None, False, 0)] # (inicio, fin, padre, es_hijo_izquierdo, profundidad)
+    while stack:
+        lo, hi, parent, is_left, depth = stack.pop()
+        mid = (lo + hi) // 2
+        node = Node(keys[mid], red=depth >= black_depth)
+        node.size = hi - lo + 1
+        if parent is None: root = node
+        elif is_left: parent.left = node
+        else: parent.right = node
+        if lo < mid: stack.append((lo, mid - 1, node, True, depth + 1))
+        if mid < hi: stack.append((mid + 1, hi, node, False, depth + 1))
+    return root
+
+# --- Funciones Auxiliares del Rojo-Negro ---
+
+def is_red(node):
+    return node is not None and node.red
+
+def get_size(node):
+    return node.size if node else 0
+
+def _update(node):
+    node.size = 1 + get_size(node.left) + get_size(node.right)
+
+def right_rotate(y):
+    x = y.left
+    y.left = x.right
+    x.right = y
+    _update(y)
+    _update(x)
+    return x
+
+def left_rotate(x):
+    y = x.right
+    x.right = y.left
+    y.left = x
+    _update(x)
+    _update(y)
+    return y
+
+def _replace_child(parent, old, new):
+    if parent.left is old: parent.left = new
+    else: parent.right = new
+
+def _rotate(node, to_left, ancestors, root, trace=None):
+    """
+    Rota 'node' y engancha el resultado en su padre (el último de 'ancestors')
+    o lo deja como raíz. Devuelve (nuevo subárbol, raíz del árbol).
+    """
+    if trace is not None: trace.append({"type": "rotation", "direction": "left" if to_left else "right", "key": node.key})
+    new_node = left_rotate(node) if to_left else right_rotate(node)
+    if ancestors: _replace_child(ancestors[-1], node, new_node)
+    else: root = new_node
+    return new_node, root
+
+def _visit(trace, node, key):
+    cmp = "<" if key < node.key else ">" if key > node.key else "="
+    trace.append({"type": "visit", "key": node.key, "cmp": cmp})
+
+# --- Algoritmos Principales del Rojo-Negro ---
+# Los de Cormen et al., pero sin punteros al padre: el camino desde la raíz
+# se guarda en una lista y los arreglos suben por ella. Como mucho 2
+# rotaciones por inserción y 3 por borrado (el AVL puede rotar en cada nivel
+# al borrar); el resto de los arreglos son cambios de color.
+# Con una lista en 'trace' se registran visitas, recoloreos y rotaciones.
+
+def insert(root, key, trace=None):
+    path = []
+    node = root
+    while node:
+        if trace is not None: _visit(trace, node, key)
+        if key == node.key: return root # Claves duplicadas no se permiten
+        path.append(node)
+        node = node.left if key < node.key else node.right
+    node = Node(key)
+    if not path:
+        node.red = False
+        if trace is not None: trace.append({"type": "insert", "key": key})
+        return node
+    parent = path[-1]
+    if key < parent.key: parent.left = node
+    else: parent.right = node
+    for ancestor in path: ancestor.size += 1
+    if trace is not None: trace.append({"type": "insert", "key": key, "parent": parent.key})
+
+    # Arreglo: mientras el padre sea rojo hay dos rojos seguidos.
+    # 'path' son los ancestros de 'node' (path[-1] es su padre).
+    while len(path) >= 2 and path[-1].red:
+        parent, grand = path[-1], path[-2]
+        parent_is_left = grand.left is parent
+        uncle = grand.right if parent_is_left else grand.left
+        if is_red(uncle):
+            # Tío rojo: recolorear y seguir subiendo desde el abuelo
+            parent.red = uncle.red = False
+            grand.red = True
+            if trace is not None: trace.append({"type": "recolor", "key": grand.key})
+            node = grand
+            del path[-2:]
+            continue
+        # Tío negro: una o dos rotaciones y termina
+        if (node is parent.right) == parent_is_left:
+            # Caso "zig-zag": primero se alinea el nodo con su padre
+            _rotate(parent, parent_is_left, path[:-1], root, trace)
+            parent = node
+        parent.red = False
+        grand.red = True
+        _, root = _rotate(grand, not parent_is_left, path[:-2], root, trace)
+        break
+    root.red = False
+    return root
+
+def delete(root, key, trace=None):
+    path = []
+    node = root
+    while node:
+        if trace is not None: _visit(trace, node, key)
+        if node.key == key: break
+        path.append(node)
+        node = node.left if key < node.key else node.right
+    if not node: return root # La clave no estaba en el árbol
+    if trace is not None: trace.append({"type": "delete", "key": key})
+
+    # Dos hijos: copiamos el sucesor in-order y pasamos a borrar el sucesor
+    if node.left and node.right:
+        path.append(node)
+        successor = node.right
+        while successor.left:
+            path.append(successor)
+            successor = successor.left
+        if trace is not None: trace.append({"type": "successor", "key": successor.key, "replaces": key})
+        node.key = successor.key
+        node = successor
+
+    # Ahora el nodo tiene un hijo o ninguno: lo sustituye ese hijo
+    child = node.left if node.left else node.right
+    for ancestor in path: ancestor.size -= 1
+    if not path:
+        if child: child.red = False
+        return child
+    parent = path.pop() # Desde aquí 'path' son los ancestros de 'parent'
+    is_left = parent.left is node
+    if is_left: parent.left = child
+    else: parent.right = child
+    if node.red: return root
+    if is_red(child):
+        child.red = False
+        return root
+
+    # Arreglo del "doble negro" en la posición de 'child' (que puede ser None)
+    while parent is not None:
+        sibling = parent.right if is_left else parent.left
+        if sibling.red:
+            # Hermano rojo: rotar para que el hermano pase a ser negro
+            sibling.red = False
+            parent.red = True
+            new_parent, root = _rotate(parent, is_left, path, root, trace)
+            path.append(new_parent)
+            sibling = parent.right if is_left else parent.left
+        near = sibling.left if is_left else sibling.right
+        far = sibling.right if is_left else sibling.left
+        if not is_red(near) and not is_red(far):
+            # Hermano negro con hijos negros: recolorear y subir
+            sibling.red = True
+            if trace is not None: trace.append({"type": "recolor", "key": sibling.key})
+            if parent.red:
+                parent.red = False
+                break
+            child = parent
+            parent = path.pop() if path else None
+            is_left = parent is not None and parent.left is child
+            continue
+        if not is_red(far):
+            # Sobrino cercano rojo: se lleva al lado lejano
+            near.red = False
+            sibling.red = True
+            sibling, _ = _rotate(sibling, not is_left, [parent], root, trace)
+        # Sobrino lejano rojo: una rotación en el padre y termina
+        sibling.red = parent.red
+        parent.red = False
+        (sibling.right if is_left else sibling.left).red = False
+        _, root = _rotate(parent, is_left, path, root, trace)
+        break
+    root.red = False
+    return root
+
+def search(root, key, trace=None):
+    # La búsqueda es idéntica a la del BST
+    while root is not None:
+        if trace is not None: _visit(trace, root, key)
+        if root.key == key: break
+        root = root.left if key < root.key else root.right
+    return root
+
+
+# --- RESUMEN ---
+
+def summary(root):
+    """Número de claves, niveles, menor y mayor clave (las columnas de resumen de Tree)."""
+    return {"node_count": get_size(root), "height": compact.height(root), "min_key": minimum(root), "max_key": maximum(root)}
+
+
+def quick_summary(root):
+    """
+    Las columnas que salen sin recorrer el árbol (tamaño de la raíz y los
+    extremos, O(h)). La altura no se guarda en los nodos: se recalcula con
+    summary cuando se reescribe la instantánea.
+    """
+    return {"node_count": get_size(root), "min_key": minimum(root), "max_key": maximum(root)}
@@ -0,0 +1,120 @@
+"""
+Unión, intersección y diferencia de dos árboles a partir de split y join
+(el esquema de Blelloch, Ferizovic y Sun, "Just Join for Parallel Ordered Sets").
+
+Se recorre el árbol más pequeño (m claves) y el grande (n claves) se va
+dividiendo por las claves de cada nodo. Los resultados de los hijos se
+vuelven a unir con join (con la clave del nodo si se conserva) o join2 (si no).
+En total cuesta O(m log(n/m + 1)), en lugar de O(m log n) insertando
+las claves una a una, y ningún nodo se copia: los dos árboles de entrada se
+consumen y sus subárboles pasan al resultado.
+
+Sirve para cualquier módulo con split(raíz, clave) -> (menores, estaba,
+mayores), join(izq, clave, der) y join2(izq, der): los binarios (AVL, Splay)
+y el Árbol B, cuyos nodos tienen varias claves y se recorren igual (hijo 0,
+clave 0, hijo 1, ...). El recorrido usa una pila explícita, así que un
+Splay degenerado no agota la pila de llamadas.
+
+Para los demás tipos está merge_keys: mezcla lineal de las claves en orden.
+"""
+
+# operación: (se conservan las claves solo en a, las de ambos, las solo en b)
+OPERATIONS = {
+    'union': (True, True, True),
+    'intersection': (False, True, False),
+    'difference': (True, False, False), # a - b
+}
+
+
+def _is_empty(node):
+    return node is None or (isinstance(getattr(node, 'keys', None), list) and not node.keys)
+
+
+def _parts(node):
+    """Claves e hijos de un nodo (None para los hijos que no existen)."""
+    if hasattr(node, 'children'):
+        return node.keys, node.children if not node.leaf else [None] * (len(node.keys) + 1)
+    return [node.key], [node.left, node.right]
+
+
+def combine(logic, a, b, operation, size_a, size_b):
+    """
+    Aplica la operación ('union', 'intersection' o 'difference' = a - b)
+    y devuelve la raíz del resultado (None si queda vacío). 'size_a' y
+    'size_b' solo sirven para elegir qué árbol recorrer.
+    """
+    only_a, both, only_b = OPERATIONS[operation]
+    if size_b < size_a:
+        a, b = b, a
+        only_a, only_b = only_b, only_a
+
+    result = [None]
+    # Dos tipos de tarea: (x, y, destino, índice) resuelve la operación entre
+    # un subárbol de 'a' y un trozo de 'b'; (claves, encontradas, resultados,
+    # destino, índice) une los resultados de los hijos de un nodo.
+    stack = [(a, b, result, 0)]
+    while stack:
+        task = stack.pop()
+        if len(task) == 4:
+            x, y, out, index = task
+            if _is_empty(x):
+                out[index] = y if only_b else None
+                continue
+            if _is_empty(y):
+                out[index] = x if only_a else None
+                continue
+            keys, children = _parts(x)
+            if only_b and both == only_a and all(child is None for child in children):
+                # Hoja de 'a' (la mitad de los nodos o más): sus claves se insertan en
+                # (o se borran de) 'y' directamente, sin dividir ni volver a unir
+                for key in keys:
+                    y = logic.insert(y, key) if both else logic.delete(y, key)
+                out[index] = y
+                continue
+            pieces, found = [], []
+            for key in keys:
+                piece, present, y = logic.split(y, key)
+                pieces.append(piece)
+                found.append(present)
+            pieces.append(y)
+            results = [None] * len(children)
+            stack.append((keys, found, results, out, index))
+            for i in range(len(children) - 1, -1, -1):
+                stack.append((children[i], pieces[i], results, i))
+        else:
+            keys, found, results, out, index = task
+            joined = results[0]
+            for key, present, right in zip(keys, found, results[1:]):
+                if both if present else only_a:
+                    joined = logic.join(None if _is_empty(joined) else joined, key, None if _is_empty(right) else right)
+                else:
+                    joined = logic.join2(None if _is_empty(joined) else joined, None if _is_empty(right) else right)
+            out[index] = joined
+    return None if _is_empty(result[0]) else result[0]
+
+
+def merge_keys(keys_a, keys_b, operation):
+    """La operación sobre dos secuencias de claves ordenadas, como lista ordenada, en O(n + m)."""
+    only_a, both, only_b = OPERATIONS[operation]
+    merged = []
+    iter_a, iter_b = iter(keys_a), iter(keys_b)
+    a, b = next(iter_a, None), next(iter_b, None)
+    while a is not None and b is not None:
+        if a < b:
+            if only_a: merged.append(a)
+            a = next(iter_a, None)
+        elif b < a:
+            if only_b: merged.append(b)
+            b = next(iter_b, None)
+        else:
+            if both: merged.append(a)
+            a, b = next(iter_a, None), next(iter_b, None)
+    if only_a:
+        while a is not None:
+            merged.append(a)
+            a = next(iter_a, None)
+    if only_b:
+        while b is not None:
+            merged.append(b)
+            b = next(iter_b, None)
+    return merged
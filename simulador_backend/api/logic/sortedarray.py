@@ -0,0 +1,201 @@
+import numpy as np
+
+from . import compact
+
+# --- Arreglo ordenado (línea base) ---
+# No es un árbol: las claves viven en un arreglo NumPy int64 ordenado y sin
+# repetidas. Buscar es una búsqueda binaria (np.searchsorted) y cada
+# inserción o borrado copia el arreglo (O(n)), pero con memoria contigua y
+# sin un objeto por nodo. Sirve de referencia para medir los módulos con
+# punteros, y para los lotes grandes, que se resuelven vectorizados.
+#
+# La "raíz" que manejan las vistas es el propio arreglo. Las funciones
+# nunca lo modifican en el sitio: devuelven uno nuevo.
+
+DTYPE = np.int64
+
+def _empty():
+    return np.empty(0, dtype=DTYPE)
+
+
+# --- TRADUCTORES: JSON <-> ARREGLO ---
+
+def tree_to_dict(arr, highlight_key=None, highlight_keys=None, max_depth=None):
+    """
+    Vista de árbol para el frontend: el BST balanceado que sale de tomar la
+    mediana de cada rango como raíz (el mismo que bst.build_from_sorted).
+    Formato: {"name": "valor", "children": [...]}
+    """
+    if arr is None or len(arr) == 0:
+        return None
+    keys = arr.tolist() # Enteros de Python: más rápidos de recorrer y serializables
+    root_children = []
+    # Cada entrada es (inicio, fin, lista de hijos del diccionario padre, profundidad).
+    # Se apila el rango derecho antes que el izquierdo para conservar el orden.
+    stack = [(0, len(keys) - 1, root_children, 0)]
+    while stack:
+        lo, hi, siblings, depth = stack.pop()
+        mid = (lo + hi) // 2
+        key = keys[mid]
+        node_dict = {"name": str(key)}
+        if (highlight_key is not None and key == highlight_key) or (highlight_keys and key in highlight_keys):
+            node_dict["highlighted"] = True
+        if lo < hi and depth == max_depth: # Plegado (ver bst.tree_to_dict)
+            node_dict["collapsed"] = True
+            node_dict["child_count"] = (lo < mid) + (mid < hi)
+            node_dict["descendants"] = hi - lo
+        elif lo < hi:
+            node_dict["children"] = []
+            if mid < hi:
+                stack.append((mid + 1, hi, node_dict["children"], depth + 1))
+            if lo < mid:
+                stack.append((lo, mid - 1, node_dict["children"], depth + 1))
+        siblings.append(node_dict)
+    return root_children[0]
+
+def dict_to_tree(data):
+    """
+    Recoge todas las claves del diccionario (sin importar su forma) y
+    devuelve el arreglo ordenado. La forma guardada no hace falta: la vista
+    se deriva siempre del arreglo.
+    """
+    if not data:
+        return _empty()
+    keys = []
+    stack = [data]
+    while stack:
+        node_dict = stack.pop()
+        keys.append(int(node_dict.get('original_name', node_dict['name'])))
+        stack.extend(node_dict.get('children', []))
+    return np.unique(np.asarray(keys, dtype=DTYPE)) # np.unique ordena y quita repetidas
+
+def tree_to_compact(arr, highlight_keys=None):
+    """Formato compacto (ver logic/compact.py): el propio arreglo como lista."""
+    return compact.pack(arr.tolist(), highlight_keys)
+
+def compact_to_tree(data):
+    return np.asarray(data['keys'], dtype=DTYPE)
+
+
+# --- CARGA MASIVA ---
+
+def build_from_sorted(keys):
+    """Las claves ya vienen ordenadas y sin repetir: basta con copiarlas al arreglo."""
+    return np.asarray(keys, dtype=DTYPE)
+
+
+# --- OPERACIONES ---
+# Con una lista en 'trace' se registra la posición encontrada por la
+# búsqueda binaria y la inserción o el borrado.
+
+def search(arr, key, trace=None):
+    """Devuelve la posición de la clave si está, si no None."""
+    i = int(np.searchsorted(arr, key))
+    if trace is not None:
+        trace.append({"type": "bisect", "key": key, "index": i})
+    return i if i < len(arr) and arr[i] == key else None
+
+def insert(arr, key, trace=None):
+    i = int(np.searchsorted(arr, key))
+    if trace is not None:
+        trace.append({"type": "bisect", "key": key, "index": i})
+    if i < len(arr) and arr[i] == key:
+        return arr # Claves duplicadas no se permiten
+    if trace is not None:
+        trace.append({"type": "insert", "key": key, "index": i})
+    return np.insert(arr, i, key)
+
+def delete(arr, key, trace=None):
+    i = int(np.searchsorted(arr, key))
+    if trace is not None:
+        trace.append({"type": "bisect", "key": key, "index": i})
+    if i == len(arr) or arr[i] != key:
+        return arr # La clave no estaba
+    if trace is not None:
+        trace.append({"type": "delete", "key": key, "index": i})
+    return np.delete(arr, i)
+
+
+# --- OPERACIONES VECTORIZADAS ---
+# Un tramo de operaciones seguidas del mismo tipo (todo inserciones, todo
+# borrados o todo búsquedas) da el mismo resultado en cualquier orden, así
+# que se puede resolver de una vez sobre el arreglo completo.
+
+VECTOR_OPERATIONS = ('insert', 'delete', 'search')
+
+def contains_many(arr, keys):
+    """Para cada clave de 'keys', si está en el arreglo (arreglo de bool)."""
+    keys = np.asarray(keys, dtype=DTYPE)
+    if len(arr) == 0:
+        return np.zeros(len(keys), dtype=bool)
+    positions = np.searchsorted(arr, keys)
+    found = positions < len(arr)
+    found[found] = arr[positions[found]] == keys[found]
+    return found
+
+def insert_many(arr, keys):
+    # Solo se ordenan las claves nuevas; después una sola copia intercala
+    # todo en O(n + m), sin volver a ordenar el arreglo completo.
+    keys = np.unique(np.asarray(keys, dtype=DTYPE))
+    keys = keys[~contains_many(arr, keys)]
+    return np.insert(arr, np.searchsorted(arr, keys), keys)
+
+def delete_many(arr, keys):
+    keys = np.unique(np.asarray(keys, dtype=DTYPE))
+    return np.delete(arr, np.searchsorted(arr, keys[contains_many(arr, keys)]))
+
+def apply_run(arr, operation, keys):
+    """
+    Aplica un tramo de operaciones del mismo tipo. Devuelve (nuevo arreglo,
+    resultados), con un resultado por clave como en la versión de a una:
+    para las inserciones y borrados, si esa clave cambió el arreglo (solo
+    la primera aparición de una clave nueva, o de una que estaba).
+    """
+    found = contains_many(arr, keys)
+    if operation == 'search':
+        return arr, found.tolist()
+    first = np.zeros(len(keys), dtype=bool)
+    first[np.unique(np.asarray(keys, dtype=DTYPE), return_index=True)[1]] = True
+    changed = first & (found if operation == 'delete' else ~found)
+    if operation == 'insert':
+        return insert_many(arr, keys), changed.tolist()
+    return delete_many(arr, keys), changed.tolist()
+
+
+# --- RESUMEN ---
+
+def summary(arr):
+    """Columnas de resumen de Tree; la altura es la de la vista de árbol (el BST balanceado)."""
+    n = len(arr)
+    return {"node_count": n, "height": n.bit_length(), "min_key": minimum(arr), "max_key": maximum(arr)}
+
+quick_summary = summary # Ya es O(1)
+
+
+# --- CONSULTAS DE ORDEN ---
+# Todas son una búsqueda binaria o un acceso por posición.
+
+def minimum(arr, trace=None):
+    return int(arr[0]) if len(arr) else None
+
+def maximum(arr, trace=None):
+    return int(arr[-1]) if len(arr) else None
+
+def predecessor(arr, key, trace=None):
+    i = int(np.searchsorted(arr, key, side='left'))
+    return int(arr[i - 1]) if i > 0 else None
+
+def successor(arr, key, trace=None):
+    i = int(np.searchsorted(arr, key, side='right'))
+    return int(arr[i]) if i < len(arr) else None
+
+def rank(arr, key, trace=None):
+    return int(np.searchsorted(arr, key, side='left'))
+
+def select(arr, index, trace=None):
+    return int(arr[index]) if 0 <= index < len(arr) else None
+
+def range_keys(arr, low, high, trace=None):
+    lo = np.searchsorted(arr, low, side='left')
+    hi = np.searchsorted(arr, high, side='right')
+    return arr[lo:hi].tolist()
@@ -1,57 +1,127 @@
+from . import compact
+# Las consultas de orden, a diferencia de 'search', no hacen splay: son de solo
+# lectura y no cambian la forma del árbol (ni pasan por el registro de operaciones).
+from .order import minimum, maximum, predecessor, successor, rank, select, range_keys
 
 class Node:
+    # __slots__ evita un __dict__ por nodo: menos memoria en árboles grandes
+    __slots__ = ('key', 'left', 'right', 'size')
+
     def __init__(self, key):
         self.key = int(key)
         self.left = None
         self.right = None
+        self.size = 1 # Número de nodos del subárbol (para rank/select)
+
+def get_size(node):
+    return node.size if node else 0
+
+def _update(node):
+    node.size = 1 + get_size(node.left) + get_size(node.right)
 
-def tree_to_dict(node, highlight_key=None):
+def tree_to_dict(node, highlight_key=None, highlight_keys=None, max_depth=None):
     """
-    Convierte recursivamente un árbol de nodos a un diccionario D3.js/n3.js-friendly.
+    Convierte un árbol de nodos a un diccionario D3.js/n3.js-friendly.
     Formato: {"name": "valor", "children": [...]}
-    Añade una bandera 'highlighted' si la clave coincide con highlight_key.
+    Añade una bandera 'highlighted' si la clave coincide con highlight_key
+    o está en el conjunto highlight_keys.
+    Con 'max_depth' los nodos a esa profundidad quedan plegados (ver bst.tree_to_dict).
+    Usa una pila explícita en lugar de recursión.
     """
     if node is None:
         return None
 
-    node_dict = {"name": str(node.key)}
-    
-    # Si esta es la clave que estamos buscando, la marcamos para el frontend.
-    if highlight_key is not None and node.key == highlight_key:
-        node_dict["highlighted"] = True
-
-    children = []
-    if node.left:
-        children.append(tree_to_dict(node.left, highlight_key))
-    if node.right:
-        children.append(tree_to_dict(node.right, highlight_key))
-        
-    if children:
-        node_dict["children"] = children
-        
-    return node_dict
+    root_children = []
+    stack = [(node, root_children, 0)]
+    while stack:
+        current, siblings, depth = stack.pop()
+        node_dict = {"name": str(current.key)}
+
+        # Si esta es la clave que estamos buscando, la marcamos para el frontend.
+        if (highlight_key is not None and current.key == highlight_key) or (highlight_keys and current.key in highlight_keys):
+            node_dict["highlighted"] = True
+
+        if current.left or current.right:
+            if depth == max_depth:
+                # Nodo plegado: se indica cuántos hijos y descendientes oculta
+                node_dict["collapsed"] = True
+                node_dict["child_count"] = (current.left is not None) + (current.right is not None)
+                node_dict["descendants"] = current.size - 1
+            else:
+                node_dict["children"] = []
+                if current.right:
+                    stack.append((current.right, node_dict["children"], depth + 1))
+                if current.left:
+                    stack.append((current.left, node_dict["children"], depth + 1))
+
+        siblings.append(node_dict)
+
+    return root_children[0]
 
 def dict_to_tree(data):
     """
     Convierte un diccionario (proveniente de JSON) a un árbol de nodos.
-    Esta función es más simple: solo inserta los valores uno por uno
-    para reconstruir el árbol BST y asegurar su integridad.
+    Reconstruye los nodos tal como estaban guardados, sin insertar ni hacer
+    splay: así la raíz y los hijos de la petición anterior se conservan.
+    El lado de cada hijo se decide comparando su clave con la del padre.
+    Los tamaños de los subárboles se recalculan al final, hijos antes que padres.
     """
-    
-    def get_values(node_dict):
-        """Extrae todos los valores de la estructura de diccionario."""
-        if not node_dict:
-            return []
-        values = [int(node_dict['name'])]
-        if 'children' in node_dict:
-            for child in node_dict['children']:
-                values.extend(get_values(child))
-        return values
-
-    values = get_values(data)
+    if not data:
+        return None
+
+    root = Node(data['name'])
+    created = [root]
+    stack = [(data, root)]
+    while stack:
+        node_dict, node = stack.pop()
+        for child_dict in node_dict.get('children', []):
+            child = Node(child_dict['name'])
+            if child.key < node.key:
+                node.left = child
+            else:
+                node.right = child
+            created.append(child)
+            stack.append((child_dict, child))
+    for node in reversed(created):
+        _update(node)
+    return root
+
+def tree_to_compact(node, highlight_keys=None):
+    """Formato compacto (ver logic/compact.py): las claves en preorden, con la raíz del último splay primero."""
+    return compact.pack([current.key for current in compact.preorder(node)], highlight_keys)
+
+def compact_to_tree(data):
+    nodes = compact.from_preorder(data['keys'], Node)
+    for node in reversed(nodes):
+        _update(node)
+    return nodes[0] if nodes else None
+
+def build_from_sorted(keys):
+    """
+    Construye un árbol balanceado a partir de claves ordenadas y sin repetir,
+    en O(n). Cualquier BST válido es un Splay válido; el balanceado es un buen
+    punto de partida porque los primeros accesos no recorren caminos largos.
+    """
+    if not keys:
+        return None
+
     root = None
-    for value in values:
-        root = insert(root, value) 
+    stack = [(0, len(keys) - 1, None, False)] # (inicio, fin, padre, es_hijo_izquierdo)
+    while stack:
+        lo, hi, parent, is_left = stack.pop()
+        mid = (lo + hi) // 2
+        node = Node(keys[mid])
+        node.size = hi - lo + 1
+        if parent is None:
+            root = node
+        elif is_left:
+            parent.left = node
+        else:
+            parent.right = node
+        if lo < mid:
+            stack.append((lo, mid - 1, node, True))
+        if mid < hi:
+            stack.append((mid + 1, hi, node, False))
     return root
 
 # --- Rotaciones para Splay ---
@@ -59,59 +129,115 @@ def right_rotate(x):
     y = x.left
     x.left = y.right
     y.right = x
+    _update(x)
+    _update(y)
     return y
 
 def left_rotate(x):
     y = x.right
     x.right = y.left
     y.left = x
+    _update(x)
+    _update(y)
     return y
 
 # --- Algoritmos Principales del Splay ---
 
-def splay(root, key):
-    """La operación clave: trae el nodo con la 'key' a la raíz."""
+def splay(root, key, trace=None):
+    """
+    La operación clave: trae el nodo con la 'key' a la raíz.
+    Versión descendente (top-down) de Sleator y Tarjan: baja una sola vez
+    desde la raíz, colgando los nodos recorridos en dos árboles auxiliares
+    (menores y mayores que 'key') que se reensamblan al final. No usa
+    recursión ni pila. Si la clave no está, sube el último nodo visitado.
+    Con una lista en 'trace' registra cada paso (zig, zig-zig, zig-zag).
+
+    Tamaños: al enlazar un nodo en un árbol auxiliar su otro hijo ya es
+    definitivo, así que se acumula el tamaño de cada árbol auxiliar y al
+    final se reparte bajando por su espina (como en la versión con tamaños
+    de Sleator), sin listas auxiliares.
+    """
     if not root or root.key == key: return root
 
-    if key < root.key:
-        # La clave no está en el árbol, terminamos
-        if not root.left: return root
-        # Zig-Zig (Izquierda-Izquierda)
-        if key < root.left.key:
-            root.left.left = splay(root.left.left, key)
-            root = right_rotate(root)
-        # Zig-Zag (Izquierda-Derecha)
-        elif key > root.left.key:
-            root.left.right = splay(root.left.right, key)
-            if root.left.right:
-                root.left = left_rotate(root.left)
-        # Zig (Izquierda)
-        return right_rotate(root) if root.left else root
-    else: # key > root.key
-        # La clave no está en el árbol, terminamos
-        if not root.right: return root
-        # Zig-Zag (Derecha-Izquierda)
-        if key < root.right.key:
-            root.right.left = splay(root.right.left, key)
-            if root.right.left:
-                root.right = right_rotate(root.right)
-        # Zig-Zig (Derecha-Derecha)
-        elif key > root.right.key:
-            root.right.right = splay(root.right.right, key)
-            root = left_rotate(root)
-        # Zig (Derecha)
-        return left_rotate(root) if root.right else root
-
-def search(root, key):
+    # 'header' hace de raíz ficticia de ambos árboles auxiliares:
+    # header.right es el árbol izquierdo y header.left el árbol derecho.
+    header = Node(0)
+    left_max = right_min = header
+    left_size = right_size = 0
+    current = root
+    while True:
+        if key < current.key:
+            if not current.left: break
+            # Zig-Zig (Izquierda-Izquierda): rotamos antes de enlazar
+            if key < current.left.key:
+                if trace is not None: trace.append({"type": "splay", "step": "zig-zig", "key": current.key})
+                current = right_rotate(current)
+                if not current.left: break
+            elif trace is not None:
+                # Zig-Zag (Izquierda-Derecha): en la versión descendente son dos enlaces seguidos
+                step = "zig-zag" if key > current.left.key and current.left.right else "zig"
+                trace.append({"type": "splay", "step": step, "key": current.key})
+            # Enlazar a la derecha (Zig)
+            right_min.left = current
+            right_min = current
+            right_size += 1 + get_size(current.right)
+            current = current.left
+        elif key > current.key:
+            if not current.right: break
+            # Zig-Zig (Derecha-Derecha)
+            if key > current.right.key:
+                if trace is not None: trace.append({"type": "splay", "step": "zig-zig", "key": current.key})
+                current = left_rotate(current)
+                if not current.right: break
+            elif trace is not None:
+                # Zig-Zag (Derecha-Izquierda)
+                step = "zig-zag" if key < current.right.key and current.right.left else "zig"
+                trace.append({"type": "splay", "step": step, "key": current.key})
+            # Enlazar a la izquierda (Zig)
+            left_max.right = current
+            left_max = current
+            left_size += 1 + get_size(current.left)
+            current = current.right
+        else:
+            break
+
+    # Reensamblar: los subárboles del nodo final pasan a los árboles auxiliares
+    left_size += get_size(current.left)
+    right_size += get_size(current.right)
+    left_rest, right_rest = current.left, current.right
+    left_max.right = current.left
+    right_min.left = current.right
+    current.left = header.right
+    current.right = header.left
+
+    # Cada nodo enlazado tiene como tamaño lo que queda del árbol auxiliar
+    # desde él hacia abajo por la espina
+    node, size = current.left, left_size
+    while node is not left_rest:
+        node.size = size
+        size -= 1 + get_size(node.left)
+        node = node.right
+    node, size = current.right, right_size
+    while node is not right_rest:
+        node.size = size
+        size -= 1 + get_size(node.right)
+        node = node.left
+    current.size = 1 + left_size + right_size
+    if trace is not None: trace.append({"type": "root", "key": current.key})
+    return current
+
+def search(root, key, trace=None):
     """En un árbol Splay, la búsqueda es simplemente un splay."""
-    return splay(root, key)
+    return splay(root, key, trace)
 
-def insert(root, key):
+def insert(root, key, trace=None):
     """Inserta la clave y la convierte en la nueva raíz."""
-    if not root: return Node(key)
+    if not root:
+        if trace is not None: trace.append({"type": "insert", "key": key})
+        return Node(key)
     
     # Splay acerca la clave (o su padre) a la raíz
-    root = splay(root, key)
+    root = splay(root, key, trace)
     
     # Si la clave ya existe, no hacemos nada
     if root.key == key: return root
@@ -125,24 +251,83 @@ def insert(root, key):
         new_node.left = root
         new_node.right = root.right
         root.right = None
+    _update(root)
+    _update(new_node)
+    if trace is not None: trace.append({"type": "insert", "key": key})
     return new_node
 
-def delete(root, key):
+def delete(root, key, trace=None):
     """Elimina la clave, haciendo que su sucesor o predecesor sea la nueva raíz."""
     if not root: return None
     
     # Trae el nodo a eliminar a la raíz
-    root = splay(root, key)
+    root = splay(root, key, trace)
     
     if key != root.key: # La clave no estaba en el árbol
         return root
 
     # Si lo encontramos, lo eliminamos y unimos los dos subárboles
+    if trace is not None: trace.append({"type": "delete", "key": key})
     if not root.left:
         return root.right
     else:
         new_root = root.left
         # Hacemos splay del elemento más grande del subárbol izquierdo a la raíz
-        new_root = splay(new_root, key)
+        new_root = splay(new_root, key, trace)
         new_root.right = root.right
-        return new_root
\ No newline at end of file
+        _update(new_root)
+        return new_root
+
+
+# --- DIVIDIR Y UNIR ---
+# Base de las operaciones de conjuntos entre árboles (ver setops.py). En un
+# Splay no hay equilibrio que mantener: la unión con clave intermedia es O(1)
+# y el resto cuesta lo que un splay (O(log n) amortizado).
+
+def join(left, key, right):
+    """Une dos árboles y una clave intermedia (las claves de 'left' < key < las de 'right')."""
+    middle = Node(key)
+    middle.left, middle.right = left, right
+    _update(middle)
+    return middle
+
+def join2(left, right):
+    """Une dos árboles sin clave intermedia: el splay sube la mayor clave de 'left', que queda sin hijo derecho."""
+    if left is None: return right
+    left = splay(left, float('inf'))
+    left.right = right
+    _update(left)
+    return left
+
+def split(root, key):
+    """
+    Divide el árbol en (claves < key, si 'key' estaba, claves > key): tras
+    el splay basta con cortar la raíz de uno de sus hijos. Consume 'root'.
+    """
+    if root is None: return None, False, None
+    root = splay(root, key)
+    if root.key == key:
+        return root.left, True, root.right
+    if root.key < key:
+        right, root.right = root.right, None
+        _update(root)
+        return root, False, right
+    left, root.left = root.left, None
+    _update(root)
+    return left, False, root
+
+
+# --- RESUMEN ---
+
+def summary(root):
+    """Número de claves, niveles, menor y mayor clave (las columnas de resumen de Tree)."""
+    return {"node_count": get_size(root), "height": compact.height(root), "min_key": minimum(root), "max_key": maximum(root)}
+
+
+def quick_summary(root):
+    """
+    Las columnas que salen sin recorrer el árbol (tamaño de la raíz y los
+    extremos, O(h)). La altura no se guarda en los nodos: se recalcula con
+    summary cuando se reescribe la instantánea.
+    """
+    return {"node_count": get_size(root), "min_key": minimum(root), "max_key": maximum(root)}
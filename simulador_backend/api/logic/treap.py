@@ -0,0 +1,226 @@
+import random
+from collections import deque
+
+from . import compact
+from .order import minimum, maximum, predecessor, successor, rank, select, range_keys # Consultas de orden comunes
+
+# Prioridades aleatorias: un treap es un BST por clave y un montículo de
+# máximos por prioridad, así que su forma es la de un BST con las claves
+# insertadas en orden aleatorio (altura esperada O(log n)).
+_random = random.Random()
+MAX_PRIORITY = 1 << 30
+
+class Node:
+    __slots__ = ('key', 'left', 'right', 'priority', 'size') # Sin __dict__ por nodo
+
+    def __init__(self, key, priority=None):
+        self.key = int(key)
+        self.left = None
+        self.right = None
+        self.priority = _random.randrange(MAX_PRIORITY) if priority is None else priority
+        self.size = 1 # Número de nodos del subárbol (para rank/select)
+
+# La prioridad va en el nombre, como la altura en el AVL: "clave (p:prioridad)".
+# Hay que guardarla: sin ella la forma del árbol no se podría reproducir.
+def tree_to_dict(node, highlight_key=None, highlight_keys=None, max_depth=None):
+    if not node: return None
+    root_children = []
+    stack = [(node, root_children, 0)] # (nodo, lista de hijos del diccionario padre, profundidad)
+    while stack:
+        current, siblings, depth = stack.pop()
+        node_dict = {"name": f"{current.key} (p:{current.priority})", "original_name": str(current.key)}
+        if (highlight_key is not None and current.key == highlight_key) or (highlight_keys and current.key in highlight_keys):
+            node_dict["highlighted"] = True
+        if current.left or current.right:
+            if depth == max_depth: # Plegado (ver bst.tree_to_dict)
+                node_dict["collapsed"] = True
+                node_dict["child_count"] = (current.left is not None) + (current.right is not None)
+                node_dict["descendants"] = current.size - 1
+            else:
+                node_dict["children"] = []
+                if current.right: stack.append((current.right, node_dict["children"], depth + 1))
+                if current.left: stack.append((current.left, node_dict["children"], depth + 1))
+        siblings.append(node_dict)
+    return root_children[0]
+
+def _node_from_dict(node_dict):
+    name = node_dict['name']
+    priority = int(name.split('(p:')[1].rstrip(')')) if '(p:' in name else None
+    return Node(node_dict.get('original_name', name.split(' ')[0]), priority)
+
+def dict_to_tree(data):
+    if not data: return None
+    root = _node_from_dict(data)
+    created = [root]
+    stack = [(data, root)]
+    while stack:
+        node_dict, node = stack.pop()
+        for child_dict in node_dict.get('children', []):
+            child = _node_from_dict(child_dict)
+            if child.key < node.key: node.left = child
+            else: node.right = child
+            created.append(child)
+            stack.append((child_dict, child))
+    # Los tamaños no se guardan: de abajo hacia arriba (hijos antes que padres)
+    for node in reversed(created):
+        _update(node)
+    return root
+
+# Formato compacto (ver logic/compact.py): claves y prioridades en preorden.
+def tree_to_compact(node, highlight_keys=None):
+    nodes = compact.preorder(node)
+    return compact.pack([current.key for current in nodes], highlight_keys,
+                        priority=[current.priority for current in nodes])
+
+def compact_to_tree(data):
+    nodes = compact.from_preorder(data['keys'], lambda key: Node(key, 0)) # Prioridad real justo abajo
+    for node, priority in zip(nodes, data.get('priority', [])):
+        node.priority = priority
+    for node in reversed(nodes):
+        _update(node)
+    return nodes[0] if nodes else None
+
+def build_from_sorted(keys):
+    # Carga masiva desde claves ordenadas y sin repetir: forma balanceada (la
+    # mediana de cada rango es la raíz) y prioridades aleatorias repartidas
+    # por niveles de mayor a menor, así se cumple la propiedad de montículo.
+    if not keys: return None
+    priorities = sorted((_random.randrange(MAX_PRIORITY) for _ in keys), reverse=True)
+    root = None
+    queue = deque([(0, len(keys) - 1, None, False)]) # (inicio, fin, padre, es_hijo_izquierdo), por niveles
+    index = 0
+    while queue:
+        lo, hi, parent, is_left = queue.popleft()
+        mid = (lo + hi) // 2
+        node = Node(keys[mid], priorities[index])
+        node.size = hi - lo + 1
+        index += 1
+        if parent is None: root = node
+        elif is_left: parent.left = node
+        else: parent.right = node
+        if lo < mid: queue.append((lo, mid - 1, node, True))
+        if mid < hi: queue.append((mid + 1, hi, node, False))
+    return root
+
+# --- Funciones Auxiliares del Treap ---
+
+def get_size(node):
+    return node.size if node else 0
+
+def _update(node):
+    node.size = 1 + get_size(node.left) + get_size(node.right)
+
+def right_rotate(y):
+    x = y.left
+    y.left = x.right
+    x.right = y
+    _update(y)
+    _update(x)
+    return x
+
+def left_rotate(x):
+    y = x.right
+    x.right = y.left
+    y.left = x
+    _update(x)
+    _update(y)
+    return y
+
+def _visit(trace, node, key):
+    cmp = "<" if key < node.key else ">" if key > node.key else "="
+    trace.append({"type": "visit", "key": node.key, "cmp": cmp})
+
+# --- Algoritmos Principales del Treap ---
+# Iterativos con el camino guardado en una lista. Insertar = insertar como
+# en un BST y subir el nodo rotando mientras su prioridad supere la del padre.
+# Borrar = bajar el nodo rotando hacia el hijo de mayor prioridad hasta que
+# tenga a lo sumo un hijo, y quitarlo.
+
+def insert(root, key, trace=None):
+    path = []
+    node = root
+    while node:
+        if trace is not None: _visit(trace, node, key)
+        if key == node.key: return root # Claves duplicadas no se permiten
+        path.append(node)
+        node = node.left if key < node.key else node.right
+    node = Node(key)
+    if not path:
+        if trace is not None: trace.append({"type": "insert", "key": key})
+        return node
+    parent = path[-1]
+    if key < parent.key: parent.left = node
+    else: parent.right = node
+    for ancestor in path: ancestor.size += 1
+    if trace is not None: trace.append({"type": "insert", "key": key, "parent": parent.key})
+
+    for i in range(len(path) - 1, -1, -1):
+        parent = path[i]
+        if node.priority <= parent.priority: break
+        to_left = parent.right is node
+        if trace is not None: trace.append({"type": "rotation", "direction": "left" if to_left else "right", "key": parent.key})
+        if to_left: left_rotate(parent)
+        else: right_rotate(parent)
+        if i > 0:
+            grand = path[i - 1]
+            if grand.left is parent: grand.left = node
+            else: grand.right = node
+        else:
+            root = node
+    return root
+
+def delete(root, key, trace=None):
+    path = []
+    node = root
+    while node:
+        if trace is not None: _visit(trace, node, key)
+        if node.key == key: break
+        path.append(node)
+        node = node.left if key < node.key else node.right
+    if not node: return root # La clave no estaba en el árbol
+    if trace is not None: trace.append({"type": "delete", "key": key})
+
+    # Bajar el nodo: sube el hijo de mayor prioridad, que pasa a ser su padre
+    while node.left and node.right:
+        to_left = node.right.priority > node.left.priority
+        if trace is not None: trace.append({"type": "rotation", "direction": "left" if to_left else "right", "key": node.key})
+        new_parent = left_rotate(node) if to_left else right_rotate(node)
+        if path:
+            if path[-1].left is node: path[-1].left = new_parent
+            else: path[-1].right = new_parent
+        else:
+            root = new_parent
+        path.append(new_parent)
+
+    # Ahora el nodo tiene un hijo o ninguno: lo sustituye ese hijo
+    child = node.left if node.left else node.right
+    for ancestor in path: ancestor.size -= 1
+    if not path: return child
+    parent = path[-1]
+    if parent.left is node: parent.left = child
+    else: parent.right = child
+    return root
+
+def search(root, key, trace=None):
+    # La búsqueda es idéntica a la del BST
+    while root is not None:
+        if trace is not None: _visit(trace, root, key)
+        if root.key == key: break
+        root = root.left if key < root.key else root.right
+    return root
+
+
+# --- RESUMEN ---
+
+def summary(root):
+    """Número de claves, niveles, menor y mayor clave (las columnas de resumen de Tree)."""
+    return {"node_count": get_size(root), "height": compact.height(root), "min_key": minimum(root), "max_key": maximum(root)}
+
+
+def quick_summary(root):
+    """
+    Las columnas que salen sin recorrer el árbol (tamaño de la raíz y los
+    extremos, O(h)). La altura no se guarda en los nodos: se recalcula con
+    summary cuando se reescribe la instantánea.
+    """
+    return {"node_count": get_size(root), "min_key": minimum(root), "max_key": maximum(root)}
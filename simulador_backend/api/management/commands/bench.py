@@ -0,0 +1,245 @@
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timezone
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from rest_framework.test import APIClient
+
+from api import storage
+from api.cache import tree_cache
+from api.logic import avl, bplustree, bst, btree, redblack, sortedarray, splay, treap
+from api.models import Tree
+
+# Motor -> (tipo de árbol, función que devuelve el módulo de lógica para un grado 't')
+ENGINES = {
+    'bst': (Tree.TreeTypes.BST, lambda t: bst),
+    'avl': (Tree.TreeTypes.AVL, lambda t: avl),
+    'splay': (Tree.TreeTypes.SPLAY, lambda t: splay),
+    'redblack': (Tree.TreeTypes.RED_BLACK, lambda t: redblack),
+    'treap': (Tree.TreeTypes.TREAP, lambda t: treap),
+    'btree': (Tree.TreeTypes.B_TREE, btree.for_degree),
+    'bplustree': (Tree.TreeTypes.B_PLUS_TREE, bplustree.for_degree),
+    'array': (Tree.TreeTypes.ARRAY, lambda t: sortedarray),
+}
+WORKLOADS = ('sequential', 'random', 'zipf', 'sorted')
+PHASES = ('insert', 'search', 'delete')
+
+
+def _workload(name, n, seed):
+    """
+    Devuelve (claves a insertar, claves a buscar, claves a borrar):
+    - sequential: todo en orden creciente (buena localidad).
+    - random: inserción y borrado en orden aleatorio, búsquedas uniformes.
+    - zipf: inserción aleatoria y búsquedas con distribución de Zipf (s=1.2),
+      unas pocas claves calientes concentran casi todos los accesos.
+    - sorted: caso adversario; inserción creciente y búsquedas y borrados en
+      orden inverso (los nodos más profundos de un BST degenerado primero).
+    """
+    rng = random.Random(seed)
+    keys = list(range(n))
+    if name == 'sequential':
+        return keys, keys, keys
+    if name == 'sorted':
+        return keys, keys[::-1], keys[::-1]
+    shuffled = keys[:]
+    rng.shuffle(shuffled)
+    to_delete = keys[:]
+    rng.shuffle(to_delete)
+    if name == 'random':
+        return shuffled, [rng.randrange(n) for _ in range(n)], to_delete
+    hot = keys[:]
+    rng.shuffle(hot) # Las claves calientes no son las más pequeñas
+    ranks = np.random.default_rng(seed).zipf(1.2, n) - 1
+    return shuffled, [hot[r % n] for r in ranks.tolist()], to_delete
+
+
+def _summary(latencies, elapsed):
+    """Operaciones por segundo y percentiles de latencia (en microsegundos)."""
+    if not latencies:
+        return {"ops": 0}
+    ordered = sorted(latencies)
+    pick = lambda q: round(ordered[int(q * (len(ordered) - 1))] / 1000, 3)
+    return {
+        "ops": len(ordered),
+        "ops_per_sec": round(len(ordered) / elapsed, 1) if elapsed else None,
+        "p50_us": pick(0.50),
+        "p99_us": pick(0.99),
+        "max_us": round(ordered[-1] / 1000, 3),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide los módulos de lógica (ops/s, latencia p50/p99 y memoria pico) con "
+        "varias cargas de trabajo y tamaños, y el camino completo de /operate/ "
+        "sobre SQLite. Escribe los resultados en JSON para comparar entre commits."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--engines', default=','.join(ENGINES), help="Motores separados por comas.")
+        parser.add_argument('--workloads', default=','.join(WORKLOADS), help="Cargas separadas por comas.")
+        parser.add_argument('--sizes', default='1000,10000,100000',
+                            help="Número de claves, separados por comas (p. ej. 1000,10000,100000,1000000).")
+        parser.add_argument('--degree', type=int, default=2, help="Grado mínimo 't' de los árboles B y B+.")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--budget', type=float, default=20.0,
+                            help="Segundos máximos por fase; si se agotan la fase se corta y se marca 'truncated'.")
+        parser.add_argument('--no-memory', action='store_true', help="No medir la memoria (evita la pasada con tracemalloc).")
+        parser.add_argument('--endpoint-sizes', default='1000,10000',
+                            help="Tamaños para medir /operate/ (vacío para no medirlo).")
+        parser.add_argument('--requests', type=int, default=200, help="Peticiones a /operate/ por caso.")
+        parser.add_argument('--output', help="Archivo JSON de salida (por defecto, la salida estándar).")
+
+    def handle(self, *args, **options):
+        engines = self._split(options['engines'], ENGINES)
+        workloads = self._split(options['workloads'], WORKLOADS)
+        sizes = [int(size) for size in options['sizes'].split(',') if size]
+        endpoint_sizes = [int(size) for size in options['endpoint_sizes'].split(',') if size]
+
+        results = {
+            "meta": self._meta(options),
+            "logic": [],
+            "endpoint": [],
+        }
+        for name in engines:
+            tree_type, factory = ENGINES[name]
+            logic = factory(options['degree'])
+            for workload in workloads:
+                for n in sizes:
+                    case = {"engine": name, "workload": workload, "size": n}
+                    case.update(self._bench_logic(logic, tree_type, workload, n, options))
+                    results["logic"].append(case)
+                    self.stderr.write(f"{name} {workload} {n}: " + ", ".join(
+                        f"{phase} {case[phase].get('ops_per_sec')} ops/s" for phase in PHASES))
+
+        if endpoint_sizes:
+            results["endpoint"] = self._bench_endpoint(engines, endpoint_sizes, options)
+
+        output = json.dumps(results, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                handle.write(output + "\n")
+        else:
+            self.stdout.write(output)
+
+    def _split(self, value, allowed):
+        names = [name for name in value.split(',') if name]
+        unknown = [name for name in names if name not in allowed]
+        if unknown:
+            raise CommandError(f"Desconocidos: {', '.join(unknown)}. Opciones: {', '.join(allowed)}.")
+        return names
+
+    def _meta(self, options):
+        try:
+            commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, timeout=5).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            commit = None
+        return {
+            "commit": commit or None,
+            "date": datetime.now(timezone.utc).isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "database": connection.vendor,
+            "options": {key: options[key] for key in ('engines', 'workloads', 'sizes', 'degree', 'seed', 'budget', 'endpoint_sizes', 'requests')},
+        }
+
+    def _run_phase(self, logic, tree_type, root_node, operation, keys, budget, timed=True):
+        """Aplica 'operation' a cada clave; devuelve (raíz, latencias en ns, segundos, cortada)."""
+        latencies = []
+        clock = time.perf_counter_ns
+        start = clock()
+        deadline = start + int(budget * 1e9)
+        apply = storage.apply_operation
+        for i, key in enumerate(keys):
+            if timed:
+                before = clock()
+                root_node, _ = apply(logic, tree_type, root_node, operation, key)
+                latencies.append(clock() - before)
+            else:
+                root_node, _ = apply(logic, tree_type, root_node, operation, key)
+            if i & 255 == 255 and clock() > deadline:
+                return root_node, latencies, (clock() - start) / 1e9, True
+        return root_node, latencies, (clock() - start) / 1e9, False
+
+    def _bench_logic(self, logic, tree_type, workload, n, options):
+        inserts, searches, deletes = _workload(workload, n, options['seed'])
+        budget = options['budget']
+        case = {}
+
+        if not options['no_memory']:
+            # Pasada aparte: tracemalloc hace más lentas las asignaciones
+            tracemalloc.start()
+            root_node, _, _, truncated = self._run_phase(logic, tree_type, logic.dict_to_tree({}), 'insert', inserts, budget, timed=False)
+            retained, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            case["memory"] = {"retained_bytes": retained, "peak_bytes": peak, "truncated": truncated}
+            del root_node
+
+        root_node = logic.dict_to_tree({})
+        truncated = False
+        for operation, keys in zip(PHASES, (inserts, searches, deletes)):
+            root_node, latencies, elapsed, cut = self._run_phase(logic, tree_type, root_node, operation, keys, budget)
+            case[operation] = _summary(latencies, elapsed)
+            truncated = truncated or cut
+        case["truncated"] = truncated
+        return case
+
+    def _bench_endpoint(self, engines, sizes, options):
+        """
+        Mide POST /operate/ completo (cargar, operar, serializar y guardar) sobre
+        la base de datos configurada, que debe ser SQLite. Todo ocurre dentro de
+        una transacción que se deshace al final: no queda nada guardado.
+        Cada caso se mide con la caché de árboles caliente y vacía ('cold':
+        cada petición reconstruye el árbol desde el JSON).
+        """
+        if connection.vendor != 'sqlite':
+            self.stderr.write(f"Se omite /operate/: la base de datos es '{connection.vendor}', no SQLite.")
+            return []
+
+        rng = random.Random(options['seed'])
+        results = []
+        created = []
+        with transaction.atomic():
+            user = User.objects.create_user(username=f"bench-{uuid.uuid4().hex[:12]}")
+            client = APIClient(HTTP_HOST='localhost')
+            client.force_authenticate(user)
+            for name in engines:
+                tree_type, _ = ENGINES[name]
+                for n in sizes:
+                    tree = Tree.objects.create(user=user, name=f"{name}-{n}", tree_type=tree_type, degree=options['degree'])
+                    created.append(tree.pk)
+                    response = client.post(f'/api/trees/{tree.pk}/bulk-load/', {"values": list(range(0, 2 * n, 2))}, format='json')
+                    if response.status_code != 200:
+                        raise CommandError(f"bulk-load de {name} falló: {response.status_code}")
+                    url = f'/api/trees/{tree.pk}/operate/'
+                    for cache_state in ('warm', 'cold'):
+                        latencies = []
+                        start = time.perf_counter_ns()
+                        for _ in range(options['requests']):
+                            roll = rng.random()
+                            operation = 'insert' if roll < 0.4 else 'search' if roll < 0.8 else 'delete'
+                            body = {"operation": operation, "value": rng.randrange(2 * n)}
+                            if cache_state == 'cold':
+                                tree_cache.discard(tree.pk)
+                            before = time.perf_counter_ns()
+                            response = client.post(url, body, format='json')
+                            latencies.append(time.perf_counter_ns() - before)
+                            if response.status_code != 200:
+                                raise CommandError(f"/operate/ de {name} falló: {response.status_code}")
+                        summary = {"engine": name, "size": n, "cache": cache_state}
+                        summary.update(_summary(latencies, (time.perf_counter_ns() - start) / 1e9))
+                        results.append(summary)
+                        self.stderr.write(f"operate {name} {n} {cache_state}: {summary['ops_per_sec']} req/s, p99 {summary['p99_us']} us")
+            transaction.set_rollback(True)
+        for pk in created:
+            tree_cache.discard(pk)
+        return results
@@ -0,0 +1,111 @@
+"""
+Medición por fases de las operaciones sobre árboles.
+
+Cada petición a /operate/ (o /operate-batch/) usa un PhaseTimer que mide
+cuánto tarda cada fase: cargar el árbol ('load': caché, dict_to_tree o
+re-aplicar el registro), ejecutar la operación ('operate'), convertirlo a
+JSON ('serialize'), guardarlo en la BBDD ('save') y preparar la respuesta
+('render'). Los tiempos se devuelven en la cabecera Server-Timing y se
+escriben en el log. Si TREE_METRICS está activo, además se acumulan en
+histogramas por tipo de árbol, operación y fase (ver /api/trees/metrics/).
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+
+from django.conf import settings
+
+# Límites superiores (en ms) de los cubos de los histogramas; el último es "+inf"
+BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class PhaseTimer:
+    """Acumula la duración (en ms) de cada fase de una petición, en orden."""
+
+    def __init__(self):
+        self.durations = {}
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.durations[name] = self.durations.get(name, 0.0) + (time.perf_counter() - start) * 1000
+
+    def total(self):
+        return (time.perf_counter() - self._start) * 1000
+
+    def header(self):
+        """Valor de la cabecera Server-Timing: 'load;dur=0.12, operate;dur=0.03, ...'."""
+        parts = [f"{name};dur={duration:.3f}" for name, duration in self.durations.items()]
+        parts.append(f"total;dur={self.total():.3f}")
+        return ", ".join(parts)
+
+
+def phase(timer, name):
+    """timer.phase(name), o un contexto vacío si no hay timer."""
+    return timer.phase(name) if timer is not None else nullcontext()
+
+
+class Histogram:
+    __slots__ = ('counts', 'count', 'sum_ms', 'max_ms')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, value_ms):
+        self.counts[bisect_left(BUCKETS_MS, value_ms)] += 1
+        self.count += 1
+        self.sum_ms += value_ms
+        self.max_ms = max(self.max_ms, value_ms)
+
+
+class MetricsRegistry:
+    """Histogramas por (tipo de árbol, operación, fase), por proceso."""
+
+    def __init__(self):
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def record(self, tree_type, operation, timer):
+        with self._lock:
+            for name, duration in list(timer.durations.items()) + [("total", timer.total())]:
+                key = (tree_type, operation, name)
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    histogram = self._histograms[key] = Histogram()
+                histogram.observe(duration)
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def snapshot(self):
+        with self._lock:
+            series = [
+                {
+                    "tree_type": tree_type,
+                    "operation": operation,
+                    "phase": name,
+                    "count": histogram.count,
+                    "sum_ms": round(histogram.sum_ms, 3),
+                    "max_ms": round(histogram.max_ms, 3),
+                    "buckets": list(histogram.counts),
+                }
+                for (tree_type, operation, name), histogram in sorted(self._histograms.items())
+            ]
+        return {"buckets_ms": list(BUCKETS_MS) + ["+inf"], "series": series}
+
+
+def enabled():
+    return getattr(settings, 'TREE_METRICS', False)
+
+
+# Instancia única por proceso de trabajo
+registry = MetricsRegistry()
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-17 13:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tree',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
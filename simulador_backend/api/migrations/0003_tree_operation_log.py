@@ -0,0 +1,50 @@
+# Generated by Django 5.2.4 on 2026-10-17 13:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_tree_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tree',
+            name='pending_bytes',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='tree',
+            name='pending_operations',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='tree',
+            name='snapshot_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='tree',
+            name='storage_mode',
+            field=models.CharField(choices=[('SNAPSHOT', 'Instantánea completa'), ('LOG', 'Registro de operaciones')], default='SNAPSHOT', max_length=10),
+        ),
+        migrations.CreateModel(
+            name='TreeOperation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveIntegerField()),
+                ('position', models.PositiveIntegerField(default=0)),
+                ('operation', models.CharField(max_length=10)),
+                ('value', models.BigIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('tree', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='operations', to='api.tree')),
+            ],
+            options={
+                'ordering': ['version', 'position'],
+                'unique_together': {('tree', 'version', 'position')},
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-17 13:05
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_tree_operation_log'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tree',
+            name='degree',
+            field=models.PositiveSmallIntegerField(default=2, help_text='Grado mínimo t (solo para Árbol B)', validators=[django.core.validators.MinValueValidator(2), django.core.validators.MaxValueValidator(1024)]),
+        ),
+    ]
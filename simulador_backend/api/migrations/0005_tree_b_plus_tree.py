@@ -0,0 +1,24 @@
+# Generated by Django 5.2.4 on 2026-10-17 13:09
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_tree_degree'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='tree',
+            name='degree',
+            field=models.PositiveSmallIntegerField(default=2, help_text='Grado mínimo t (solo para Árbol B y B+)', validators=[django.core.validators.MinValueValidator(2), django.core.validators.MaxValueValidator(1024)]),
+        ),
+        migrations.AlterField(
+            model_name='tree',
+            name='tree_type',
+            field=models.CharField(choices=[('BST', 'Árbol Binario de Búsqueda'), ('AVL', 'Árbol AVL'), ('SPLAY', 'Árbol Splay'), ('B_TREE', 'Árbol B'), ('B_PLUS_TREE', 'Árbol B+')], default='BST', max_length=20),
+        ),
+    ]
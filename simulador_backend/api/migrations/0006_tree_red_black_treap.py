@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-17 13:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_tree_b_plus_tree'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='tree',
+            name='tree_type',
+            field=models.CharField(choices=[('BST', 'Árbol Binario de Búsqueda'), ('AVL', 'Árbol AVL'), ('SPLAY', 'Árbol Splay'), ('B_TREE', 'Árbol B'), ('B_PLUS_TREE', 'Árbol B+'), ('RED_BLACK', 'Árbol Rojo-Negro'), ('TREAP', 'Treap')], default='BST', max_length=20),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-17 13:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_tree_red_black_treap'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='tree',
+            name='tree_type',
+            field=models.CharField(choices=[('BST', 'Árbol Binario de Búsqueda'), ('AVL', 'Árbol AVL'), ('SPLAY', 'Árbol Splay'), ('B_TREE', 'Árbol B'), ('B_PLUS_TREE', 'Árbol B+'), ('RED_BLACK', 'Árbol Rojo-Negro'), ('TREAP', 'Treap'), ('ARRAY', 'Arreglo ordenado')], default='BST', max_length=20),
+        ),
+    ]
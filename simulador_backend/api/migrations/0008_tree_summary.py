@@ -0,0 +1,164 @@
+# Generated by Django 5.2.4 on 2026-10-17 13:33
+
+import json
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+# El cálculo del resumen está copiado aquí a propósito: la migración no debe
+# depender de los módulos de lógica ni de los formatos tal como evolucionen.
+# Lee las dos formas en que se guardaban los árboles al crear esta migración:
+# el formato compacto ({"format": "compact", "keys": [...], ...}) y el
+# diccionario D3 ({"name": ..., "children": [...]}).
+
+MULTIWAY = ('B_TREE', 'B_PLUS_TREE')
+
+
+def _levels_from_preorder(keys):
+    """Niveles de un BST dado por sus claves en preorden (pila con el camino de posibles padres)."""
+    best = 0
+    stack = [] # (clave, profundidad)
+    for key in keys:
+        depth = 1
+        if stack and key < stack[-1][0]:
+            depth = stack[-1][1] + 1
+        elif stack:
+            parent = stack.pop()
+            while stack and stack[-1][0] < key:
+                parent = stack.pop()
+            depth = parent[1] + 1
+        stack.append((key, depth))
+        best = max(best, depth)
+    return best
+
+
+def _compact_summary(tree_type, data):
+    """(claves que cuentan, niveles) de una estructura compacta."""
+    keys = data.get('keys') or []
+    if tree_type == 'ARRAY':
+        return keys, len(keys).bit_length()
+    if tree_type not in MULTIWAY:
+        return keys, _levels_from_preorder(keys)
+    height = data.get('height', 0)
+    if tree_type == 'B_TREE':
+        return keys, height + 1 if keys else 0
+    # B+: solo cuentan las hojas (los nodos a profundidad 'height'); los separadores son copias
+    leaf_keys, pos = [], 0
+    stack = [] # (hijos que aún le faltan al nodo interno, profundidad)
+    for count in data.get('counts') or []:
+        depth = stack[-1][1] + 1 if stack else 0
+        if stack:
+            stack[-1][0] -= 1
+            if stack[-1][0] == 0:
+                stack.pop()
+        if depth == height:
+            leaf_keys.extend(keys[pos:pos + count])
+        else:
+            stack.append([count + 1, depth])
+        pos += count
+    return leaf_keys, height + 1 if leaf_keys else 0
+
+
+def _d3_summary(tree_type, data):
+    """(claves que cuentan, niveles) de un diccionario D3."""
+    keys, levels = [], 0
+    stack = [(data, 1)]
+    while stack:
+        node, depth = stack.pop()
+        levels = max(levels, depth)
+        children = node.get('children') or []
+        name = str(node.get('original_name', node['name']))
+        if tree_type in MULTIWAY:
+            if tree_type == 'B_TREE' or not children:
+                keys.extend(int(key) for key in name.strip('[]').replace(' ', '').split(',') if key)
+        else:
+            keys.append(int(name.split()[0])) # "5 (h:2)" en el AVL antiguo sin 'original_name'
+        stack.extend((child, depth + 1) for child in children)
+    return keys, levels
+
+
+def summary(tree_type, structure):
+    fields = {"node_count": 0, "height": 0, "min_key": None, "max_key": None, "size_bytes": len(json.dumps(structure))}
+    if not isinstance(structure, dict) or not structure:
+        return fields
+    try:
+        if structure.get('format') == 'compact':
+            keys, levels = _compact_summary(tree_type, structure)
+        else:
+            keys, levels = _d3_summary(tree_type, structure)
+    except (KeyError, IndexError, TypeError, ValueError, AttributeError):
+        return fields
+    if keys:
+        fields.update(node_count=len(keys), height=levels, min_key=min(keys), max_key=max(keys))
+    return fields
+
+
+def fill_summaries(apps, schema_editor):
+    # Los árboles existentes calculan su resumen desde la estructura guardada
+    Tree = apps.get_model('api', 'Tree')
+    for tree in Tree.objects.iterator():
+        for name, value in summary(tree.tree_type, tree.structure).items():
+            setattr(tree, name, value)
+        tree.save(update_fields=['node_count', 'height', 'min_key', 'max_key', 'size_bytes'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_tree_array'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tree',
+            name='height',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='tree',
+            name='max_key',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='tree',
+            name='min_key',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='tree',
+            name='node_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='tree',
+            name='size_bytes',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='tree',
+            index=models.Index(fields=['user', 'updated_at'], name='tree_user_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tree',
+            index=models.Index(fields=['user', 'node_count'], name='tree_user_nodes_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tree',
+            index=models.Index(fields=['user', 'height'], name='tree_user_height_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tree',
+            index=models.Index(fields=['user', 'min_key'], name='tree_user_min_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tree',
+            index=models.Index(fields=['user', 'max_key'], name='tree_user_max_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tree',
+            index=models.Index(fields=['user', 'size_bytes'], name='tree_user_size_idx'),
+        ),
+        migrations.RunPython(fill_summaries, migrations.RunPython.noop),
+    ]
@@ -2,6 +2,7 @@
 
 from django.db import models
 from django.contrib.auth.models import User
+from django.core.validators import MaxValueValidator, MinValueValidator
 
 class Tree(models.Model):
     """
@@ -14,6 +15,18 @@ class Tree(models.Model):
         AVL = 'AVL', 'Árbol AVL'
         SPLAY = 'SPLAY', 'Árbol Splay'
         B_TREE = 'B_TREE', 'Árbol B'
+        B_PLUS_TREE = 'B_PLUS_TREE', 'Árbol B+'
+        RED_BLACK = 'RED_BLACK', 'Árbol Rojo-Negro'
+        TREAP = 'TREAP', 'Treap'
+        # Línea base: arreglo ordenado (NumPy), se muestra como un BST balanceado
+        ARRAY = 'ARRAY', 'Arreglo ordenado'
+
+    # --- Opciones para el modo de almacenamiento ---
+    # SNAPSHOT: cada operación reescribe el JSON completo (comportamiento original).
+    # LOG: cada operación se añade a TreeOperation y el JSON se compacta cada N operaciones.
+    class StorageModes(models.TextChoices):
+        SNAPSHOT = 'SNAPSHOT', 'Instantánea completa'
+        LOG = 'LOG', 'Registro de operaciones'
 
     # --- Relaciones ---
     # Cada árbol pertenece a un único usuario.
@@ -27,11 +40,20 @@ class Tree(models.Model):
     # Tipo de árbol para saber qué lógica aplicar.
     # Usamos `choices` para restringir los valores a los definidos en TreeTypes. [7, 9]
     tree_type = models.CharField(
-        max_length=10,
+        max_length=20,
         choices=TreeTypes.choices,
         default=TreeTypes.BST
     )
 
+    # Grado mínimo 't' del Árbol B (cada nodo tiene entre t-1 y 2t-1 claves).
+    # Un 't' alto (32...256) mantiene el árbol muy bajo con millones de claves.
+    # Solo se usa en árboles B y B+ y se fija al crear el árbol.
+    degree = models.PositiveSmallIntegerField(
+        default=2,
+        validators=[MinValueValidator(2), MaxValueValidator(1024)],
+        help_text="Grado mínimo t (solo para Árbol B y B+)"
+    )
+
     # El corazón del modelo. Almacenamos la estructura completa del árbol como JSON.
     # Esto es ideal para la visualización en el frontend con n3.js/D3.js. [1, 6]
     # `default=dict` asegura que el campo sea un objeto JSON vacío por defecto.
@@ -40,6 +62,32 @@ class Tree(models.Model):
         help_text="Estructura del árbol en formato JSON para visualización"
     )
 
+    # Versión del árbol: aumenta en 1 cada vez que cambia su estructura.
+    # Permite a los clientes saber si su copia local está al día (respuestas delta).
+    version = models.PositiveIntegerField(default=0)
+
+    storage_mode = models.CharField(
+        max_length=10,
+        choices=StorageModes.choices,
+        default=StorageModes.SNAPSHOT
+    )
+    # En modo LOG, `structure` es la instantánea de esta versión; las operaciones
+    # posteriores están en TreeOperation y se re-aplican al cargar el árbol.
+    snapshot_version = models.PositiveIntegerField(default=0)
+    # Operaciones y bytes acumulados en el registro desde la última instantánea.
+    pending_operations = models.PositiveIntegerField(default=0)
+    pending_bytes = models.PositiveIntegerField(default=0)
+
+    # --- Resumen ---
+    # Se actualizan en cada guardado (ver storage.save_structure) para poder
+    # listar, ordenar y filtrar árboles sin leer 'structure'.
+    # 'size_bytes' es el tamaño del JSON guardado en 'structure'.
+    node_count = models.PositiveIntegerField(default=0)
+    height = models.PositiveIntegerField(default=0)
+    min_key = models.BigIntegerField(null=True, blank=True)
+    max_key = models.BigIntegerField(null=True, blank=True)
+    size_bytes = models.PositiveIntegerField(default=0)
+
     # --- Timestamps ---
     # Guarda la fecha y hora de creación automáticamente la primera vez. [4, 5, 14]
     created_at = models.DateTimeField(auto_now_add=True)
@@ -57,3 +105,34 @@ class Tree(models.Model):
         unique_together = ('user', 'name')
         # Ordena los árboles por fecha de modificación descendente por defecto.
         ordering = ['-updated_at']
+        # La lista resumida siempre filtra por usuario y ordena por una columna
+        indexes = [
+            models.Index(fields=['user', 'updated_at'], name='tree_user_updated_idx'),
+            models.Index(fields=['user', 'node_count'], name='tree_user_nodes_idx'),
+            models.Index(fields=['user', 'height'], name='tree_user_height_idx'),
+            models.Index(fields=['user', 'min_key'], name='tree_user_min_idx'),
+            models.Index(fields=['user', 'max_key'], name='tree_user_max_idx'),
+            models.Index(fields=['user', 'size_bytes'], name='tree_user_size_idx'),
+        ]
+
+
+class TreeOperation(models.Model):
+    """
+    Una operación registrada sobre un árbol en modo LOG.
+    Cargar el árbol = su última instantánea + estas operaciones, en orden.
+    """
+    tree = models.ForeignKey(Tree, on_delete=models.CASCADE, related_name='operations')
+    # Versión del árbol que produjo la petición y posición dentro de ella
+    # (una petición por lotes registra varias operaciones con la misma versión).
+    version = models.PositiveIntegerField()
+    position = models.PositiveIntegerField(default=0)
+    operation = models.CharField(max_length=10)
+    value = models.BigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.operation}({self.value}) - v{self.version}"
+
+    class Meta:
+        unique_together = ('tree', 'version', 'position')
+        ordering = ['version', 'position']
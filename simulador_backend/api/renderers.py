@@ -0,0 +1,19 @@
+import msgpack
+from rest_framework.renderers import BaseRenderer
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    Respuestas en MessagePack: binario, más pequeño y rápido de leer que el
+    JSON, sobre todo con la estructura compacta (listas largas de enteros).
+    Se pide con 'Accept: application/msgpack' o con '?format=msgpack'.
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, use_bin_type=True, default=str)
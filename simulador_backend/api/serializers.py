@@ -35,6 +35,41 @@ class TreeSerializer(serializers.ModelSerializer):
     class Meta:
         model = Tree
         # Campos que se incluirán en la API
-        fields = ('id', 'user', 'name', 'tree_type', 'structure', 'created_at', 'updated_at')
+        fields = ('id', 'user', 'name', 'tree_type', 'degree', 'storage_mode', 'structure', 'version',
+                  'node_count', 'height', 'min_key', 'max_key', 'size_bytes', 'created_at', 'updated_at')
         # Campos que no se pueden editar directamente a través de la API
-        read_only_fields = ('id', 'user', 'created_at', 'updated_at')
\ No newline at end of file
+        # (las columnas de resumen se calculan desde la estructura)
+        read_only_fields = ('id', 'user', 'version', 'node_count', 'height', 'min_key', 'max_key', 'size_bytes',
+                            'created_at', 'updated_at')
+
+    def to_representation(self, instance):
+        # La vista puede indicar cómo mostrar la estructura (D3, con disposición...);
+        # la instancia no se toca, así que al guardarla sigue la estructura compacta
+        data = super().to_representation(instance)
+        structure_for = self.context.get('structure_for')
+        if structure_for is not None:
+            data['structure'] = structure_for(instance)
+        return data
+
+    def validate_degree(self, value):
+        # La distribución de claves de un Árbol B depende de 't': cambiarlo
+        # después dejaría nodos con más o menos claves de las permitidas.
+        if self.instance is not None and value != self.instance.degree:
+            raise serializers.ValidationError("El grado no se puede cambiar después de crear el árbol.")
+        return value
+
+    def validate_tree_type(self, value):
+        # Igual que el grado: la estructura guardada (y las columnas de resumen)
+        # solo tienen sentido para el tipo con el que se construyó el árbol.
+        if self.instance is not None and value != self.instance.tree_type:
+            raise serializers.ValidationError("El tipo de árbol no se puede cambiar después de crear el árbol.")
+        return value
+
+
+# Serializer para la lista resumida: todo menos 'structure'
+class TreeSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Tree
+        fields = ('id', 'name', 'tree_type', 'degree', 'storage_mode', 'version',
+                  'node_count', 'height', 'min_key', 'max_key', 'size_bytes', 'created_at', 'updated_at')
+        read_only_fields = fields
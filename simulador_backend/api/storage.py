@@ -0,0 +1,504 @@
+import bisect
+import json
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .cache import tree_cache
+from . import streaming
+from .logic import bst, avl, splay, btree, bplustree, redblack, treap, compact, setops
+from .metrics import phase
+from .models import Tree, TreeOperation
+
+
+# Consultas de solo lectura -> función del módulo de lógica que las resuelve.
+# No todos los módulos las tienen (ver supports_operation).
+QUERY_FUNCTIONS = {
+    'range': 'range_keys',
+    'min': 'minimum',
+    'max': 'maximum',
+    'predecessor': 'predecessor',
+    'successor': 'successor',
+    'rank': 'rank',
+    'select': 'select',
+}
+
+
+def logic_for(tree_type, degree):
+    """
+    Módulo de lógica para un tipo de árbol (None si no hay). Para los árboles
+    B y B+ devuelve la lógica con el grado 't' ya fijado.
+    El arreglo necesita NumPy, que es opcional (ver requirements-array.txt):
+    se importa solo aquí y, si no está instalado, el tipo no tiene lógica.
+    """
+    if tree_type == Tree.TreeTypes.BST:
+        return bst
+    elif tree_type == Tree.TreeTypes.AVL:
+        return avl
+    elif tree_type == Tree.TreeTypes.SPLAY:
+        return splay
+    elif tree_type == Tree.TreeTypes.RED_BLACK:
+        return redblack
+    elif tree_type == Tree.TreeTypes.TREAP:
+        return treap
+    elif tree_type == Tree.TreeTypes.ARRAY:
+        try:
+            from .logic import sortedarray
+        except ImportError:
+            return None
+        return sortedarray
+    elif tree_type == Tree.TreeTypes.B_TREE:
+        return btree.for_degree(degree)
+    elif tree_type == Tree.TreeTypes.B_PLUS_TREE:
+        return bplustree.for_degree(degree)
+    return None
+
+
+class VersionConflict(Exception):
+    """Otra petición guardó el árbol entre que lo cargamos y lo quisimos guardar."""
+
+
+def apply_operation(logic, tree_type, root_node, operation, value, trace=None, high=None):
+    """
+    Ejecuta una operación sobre el árbol en memoria.
+    Devuelve (nueva raíz, resultado): para la búsqueda, si se encontró la
+    clave; para el rango [value, high], la lista de claves; para las demás
+    consultas, lo que devuelva el módulo (una clave, una posición o None);
+    para inserción y eliminación, si cambió el número de claves (save_root
+    lo usa para actualizar 'node_count' sin contar los nodos).
+    Si 'trace' es una lista, el módulo de lógica añade ahí los pasos de la operación.
+    """
+    if operation in ('insert', 'delete'):
+        get_size = getattr(logic, 'get_size', None)
+        if get_size is not None:
+            size = get_size(root_node)
+        else:
+            # B, B+ y arreglo: la búsqueda no modifica la estructura
+            present = logic.search(root_node, value) is not None
+        root_node = getattr(logic, operation)(root_node, value, trace=trace)
+        if get_size is not None:
+            return root_node, get_size(root_node) != size
+        return root_node, present == (operation == 'delete')
+    if operation == 'range':
+        return root_node, logic.range_keys(root_node, value, high, trace=trace)
+    if operation in ('min', 'max'):
+        return root_node, getattr(logic, QUERY_FUNCTIONS[operation])(root_node, trace=trace)
+    if operation in QUERY_FUNCTIONS:
+        return root_node, getattr(logic, QUERY_FUNCTIONS[operation])(root_node, value, trace=trace)
+
+    # La búsqueda en Splay modifica el árbol. Para otros, no.
+    # Nuestro diseño lo maneja de forma transparente.
+    search_result = logic.search(root_node, value, trace=trace)
+
+    # En Splay, search devuelve la nueva raíz, así que la actualizamos
+    # y comprobamos si la clave quedó en la raíz.
+    if tree_type == Tree.TreeTypes.SPLAY:
+        return search_result, search_result is not None and search_result.key == value
+    return root_node, search_result is not None # Si no es None, la clave fue encontrada
+
+
+def apply_batch(logic, tree_type, root_node, operations, with_trace=False):
+    """
+    Aplica en orden una lista de (operación, valor, high).
+    Devuelve (nueva raíz, [(resultado, traza)]) con una entrada por operación.
+    Si el módulo sabe resolver tramos vectorizados ('apply_run', como el
+    arreglo ordenado) y no se pidió la traza, cada tramo de operaciones
+    seguidas del mismo tipo se aplica de una sola vez.
+    """
+    vector_operations = () if with_trace else getattr(logic, 'VECTOR_OPERATIONS', ())
+    outcomes = []
+    i = 0
+    while i < len(operations):
+        operation, value, high = operations[i]
+        if operation in vector_operations:
+            j = i
+            while j < len(operations) and operations[j][0] == operation:
+                j += 1
+            root_node, results = logic.apply_run(root_node, operation, [item[1] for item in operations[i:j]])
+            outcomes.extend((result, None) for result in results)
+            i = j
+            continue
+        trace = [] if with_trace else None
+        root_node, result = apply_operation(logic, tree_type, root_node, operation, value, trace, high)
+        outcomes.append((result, trace))
+        i += 1
+    return root_node, outcomes
+
+
+def matched_key(operation, value, outcome):
+    """Clave que hay que resaltar tras una búsqueda o una consulta que devuelve una clave."""
+    if operation == 'search':
+        return value if outcome else None
+    if operation in ('min', 'max', 'predecessor', 'successor', 'select'):
+        return outcome
+    return None
+
+
+def supports_operation(logic, operation):
+    """Las consultas extra (rango, rank, select...) solo existen en algunos módulos de lógica."""
+    return operation not in QUERY_FUNCTIONS or hasattr(logic, QUERY_FUNCTIONS[operation])
+
+
+def changes_structure(tree_type, operation):
+    """Indica si la operación modifica la forma del árbol (y por tanto va al registro)."""
+    return operation in ('insert', 'delete') or (operation == 'search' and tree_type == Tree.TreeTypes.SPLAY)
+
+
+def decode_structure(logic, structure):
+    """Árbol en memoria desde la estructura guardada, en formato compacto o D3 (el de las versiones anteriores)."""
+    if compact.is_compact(structure):
+        return logic.compact_to_tree(structure)
+    return logic.dict_to_tree(structure)
+
+
+def d3_structure(tree, logic, root_node=None):
+    """
+    La estructura del árbol en el formato D3 anidado que dibuja el frontend.
+    En la BBDD se guarda compacta; la conversión se hace solo al responder.
+    Si ya se tiene el árbol en memoria ('root_node', o el estado actual que
+    dejaron save_root o current_root) se usa directamente en lugar de volver
+    a decodificarlo.
+    """
+    if root_node is None:
+        root_node = current_root(tree, logic)
+        if root_node is not None:
+            return logic.tree_to_dict(root_node, highlight_keys=tree._highlight_keys) or {}
+    structure = tree.structure
+    if not compact.is_compact(structure):
+        return structure
+    if root_node is None:
+        root_node = logic.compact_to_tree(structure)
+    highlight_keys = set(structure.get('highlight', ()))
+    if highlight_keys:
+        return logic.tree_to_dict(root_node, highlight_keys=highlight_keys) or {}
+    return logic.tree_to_dict(root_node) or {}
+
+
+def build_tree(logic, tree_type, keys, fill=1.0):
+    """
+    Construye el árbol de una vez con el constructor masivo del módulo.
+    Los constructores esperan claves estrictamente crecientes: si 'keys' ya
+    viene así se usa tal cual, si no se ordena y se quitan repetidas.
+    Para los árboles B y B+, 'fill' es el factor de llenado de los nodos.
+    """
+    if not all(keys[i] < keys[i + 1] for i in range(len(keys) - 1)):
+        keys = sorted(set(keys))
+    if tree_type in (Tree.TreeTypes.B_TREE, Tree.TreeTypes.B_PLUS_TREE):
+        return logic.build_from_sorted(keys, fill=fill)
+    return logic.build_from_sorted(keys)
+
+
+def combine_roots(logic, tree_type, left_root, right_root, operation, left_size, right_size):
+    """
+    Unión, intersección o diferencia (izquierdo - derecho) de dos árboles
+    del mismo tipo, ya en memoria; los consume. Con split/join en el módulo
+    (AVL, Splay, Árbol B) se usa el algoritmo de setops.combine; en los
+    demás se mezclan las claves en orden y se construye el árbol de una vez.
+    Los tamaños solo sirven para elegir qué árbol recorrer.
+    """
+    if hasattr(logic, 'split'):
+        root_node = setops.combine(logic, left_root, right_root, operation, left_size, right_size)
+        return root_node if root_node is not None else logic.dict_to_tree({})
+    keys = setops.merge_keys(streaming.iter_keys(tree_type, left_root),
+                             streaming.iter_keys(tree_type, right_root), operation)
+    return build_tree(logic, tree_type, keys)
+
+
+def find_subtree(tree_type, root_node, key=None, path=None):
+    """
+    Subárbol para la vista por ventanas (GET /subtree/). Se elige por clave
+    (el nodo con esa clave; en los árboles B y B+, el primer nodo que la
+    contiene bajando desde la raíz) o por 'path', los índices de los hijos
+    desde la raíz en el mismo orden que 'children' en D3. Solo se recorre el
+    árbol: en un Splay la búsqueda no reestructura nada.
+    Devuelve (subárbol, camino) o (None, None) si no existe. Para el arreglo
+    el subárbol es el trozo del arreglo bajo ese nodo, que se dibuja igual.
+    """
+    steps = list(path) if path is not None else None
+    taken = []
+
+    if tree_type == Tree.TreeTypes.ARRAY:
+        lo, hi = 0, len(root_node) - 1
+        while lo <= hi:
+            mid = (lo + hi) // 2
+            children = [r for r in ((lo, mid - 1), (mid + 1, hi)) if r[0] <= r[1]]
+            if steps is not None:
+                if not steps:
+                    return root_node[lo:hi + 1], taken
+                index = steps.pop(0)
+            elif root_node[mid] == key:
+                return root_node[lo:hi + 1], taken
+            else:
+                side = (lo, mid - 1) if key < root_node[mid] else (mid + 1, hi)
+                index = children.index(side) if side in children else -1
+            if not 0 <= index < len(children):
+                return None, None
+            taken.append(index)
+            lo, hi = children[index]
+        return None, None
+
+    if tree_type in (Tree.TreeTypes.B_TREE, Tree.TreeTypes.B_PLUS_TREE):
+        node = root_node if root_node is not None and root_node.keys else None
+        while node is not None:
+            if steps is not None:
+                if not steps:
+                    return node, taken
+                index = steps.pop(0)
+            elif key in node.keys:
+                return node, taken
+            else:
+                index = bisect.bisect_left(node.keys, key)
+            if node.leaf or not 0 <= index < len(node.children):
+                return None, None
+            taken.append(index)
+            node = node.children[index]
+        return None, None
+
+    node = root_node
+    while node is not None:
+        children = [child for child in (node.left, node.right) if child is not None]
+        if steps is not None:
+            if not steps:
+                return node, taken
+            index = steps.pop(0)
+            if not 0 <= index < len(children):
+                return None, None
+            child = children[index]
+        elif key == node.key:
+            return node, taken
+        else:
+            child = node.left if key < node.key else node.right
+            if child is None:
+                return None, None
+            index = children.index(child)
+        taken.append(index)
+        node = child
+    return None, None
+
+
+def summary_for(tree_type, degree, structure):
+    """
+    Columnas de resumen (node_count, height, min_key, max_key, size_bytes)
+    de una estructura guardada, en cualquier formato. Para los árboles que se
+    crean o editan enviando la estructura directamente; si no se puede leer,
+    el resumen queda vacío.
+    """
+    fields = {"node_count": 0, "height": 0, "min_key": None, "max_key": None, "size_bytes": len(json.dumps(structure))}
+    logic = logic_for(tree_type, degree)
+    if logic is None or not structure:
+        return fields
+    try:
+        fields.update(logic.summary(decode_structure(logic, structure)))
+    except (KeyError, IndexError, TypeError, ValueError, AttributeError):
+        pass
+    return fields
+
+
+def load_root(tree, logic):
+    """
+    Devuelve el árbol en memoria: desde la caché si la versión guardada
+    coincide, o reconstruyéndolo desde su JSON en la BBDD si no. En modo
+    registro, el JSON es la última instantánea y encima se re-aplican las
+    operaciones registradas después de ella.
+    """
+    root_node = tree_cache.take(tree.pk, tree.updated_at)
+    if root_node is not None:
+        return root_node
+
+    root_node = decode_structure(logic, tree.structure)
+    operations = pending_operations(tree)
+    if operations:
+        root_node, _ = apply_batch(logic, tree.tree_type, root_node, operations)
+    return root_node
+
+
+def pending_operations(tree):
+    """Operaciones registradas después de la última instantánea, como (operación, valor, None)."""
+    if tree.storage_mode != Tree.StorageModes.LOG or not tree.pending_operations:
+        return []
+    pending = (TreeOperation.objects
+               .filter(tree=tree, version__gt=tree.snapshot_version)
+               .order_by('version', 'position')
+               .values_list('operation', 'value'))
+    return [(operation, value, None) for operation, value in pending.iterator()]
+
+
+def _quick_summary(tree, logic, root_node, operations, outcomes):
+    """Columnas de resumen tras un guardado en modo registro (ver save_root)."""
+    summary = logic.quick_summary(root_node)
+    if 'node_count' not in summary:
+        if outcomes is None:
+            return logic.summary(root_node)
+        count = tree.node_count
+        for (operation, _), changed in zip(operations, outcomes):
+            if changed and operation in ('insert', 'delete'):
+                count += 1 if operation == 'insert' else -1
+        summary['node_count'] = count
+    return summary
+
+
+def save_root(tree, logic, root_node, operations=None, highlight_key=None, highlight_keys=None, timer=None, outcomes=None):
+    """
+    Guarda el nuevo estado del árbol y deja la raíz en la caché.
+
+    'operations' es la lista de (operación, valor) aplicadas en esta petición.
+    En modo instantánea (o si no hay lista, como en la carga masiva) se reescribe
+    el JSON completo. En modo registro solo se añaden las operaciones a
+    TreeOperation y se actualizan unas pocas columnas; el JSON completo se
+    reescribe (compacta) cada TREE_SNAPSHOT_INTERVAL operaciones o cuando el
+    registro pendiente supera TREE_SNAPSHOT_BYTES. Solo entonces se genera la
+    estructura compacta: en el resto de guardados en modo registro el coste
+    no depende del tamaño del árbol.
+
+    La estructura se guarda en formato compacto (ver logic/compact.py), con
+    la clave encontrada y las del rango como claves resaltadas. La raíz
+    queda en 'tree._root_node' (y las claves resaltadas en
+    'tree._highlight_keys') para pasarla a D3 sin decodificarla
+    (d3_structure); si no se reescribió, 'tree.structure' sigue siendo la
+    instantánea y materialize genera la compacta solo si se pide.
+
+    Lo mismo vale para las columnas de resumen: al reescribir la instantánea
+    se recalculan con logic.summary (que puede recorrer el árbol entero); en
+    el resto de guardados se usa logic.quick_summary, que solo lee lo que ya
+    guardan los nodos (tamaño, alturas AVL, los bordes). Si no da el número de
+    claves (B y B+), se suma al anterior lo que cambió cada inserción y
+    eliminación según 'outcomes' (los resultados de apply_operation, uno por
+    operación). La altura de los tipos que no la guardan en los nodos se
+    queda en el último valor calculado hasta la siguiente compactación.
+
+    Con un 'timer' (metrics.PhaseTimer) se miden por separado la conversión
+    a formato compacto ('serialize') y la escritura en la BBDD ('save').
+
+    La escritura (save_structure) es optimista: solo se hace si la fila sigue
+    en la versión que se cargó (UPDATE ... WHERE version = v). Si otra
+    petición guardó antes, no se escribe nada y se lanza VersionConflict;
+    with_retries recarga el árbol y repite la operación sobre la versión nueva.
+    """
+    highlighted = set(highlight_keys or ())
+    if highlight_key is not None:
+        highlighted.add(highlight_key)
+    structure = None
+    with phase(timer, 'serialize'):
+        if _log_state(tree, operations)[3]:
+            structure = logic.tree_to_compact(root_node, highlighted)
+            summary = logic.summary(root_node)
+        else:
+            summary = _quick_summary(tree, logic, root_node, operations, outcomes)
+    save_structure(tree, structure, operations, timer, summary)
+    tree._structure_is_current = structure is not None
+    tree._root_node = root_node
+    tree._highlight_keys = highlighted
+    tree_cache.put(tree.pk, tree.updated_at, root_node)
+
+
+def _log_state(tree, operations):
+    """
+    Lo que haría un guardado con 'operations': (operaciones que van al
+    registro, pendientes y bytes pendientes tras él, si reescribe la instantánea).
+    """
+    logged = []
+    pending_count, pending_bytes = tree.pending_operations, tree.pending_bytes
+    if tree.storage_mode == Tree.StorageModes.LOG and operations is not None:
+        logged = [(op, value) for op, value in operations if changes_structure(tree.tree_type, op)]
+        pending_count += len(logged)
+        pending_bytes += sum(len(op) + len(str(value)) for op, value in logged)
+    snapshot = (
+        operations is None
+        or tree.storage_mode == Tree.StorageModes.SNAPSHOT
+        or pending_count >= getattr(settings, 'TREE_SNAPSHOT_INTERVAL', 100)
+        or pending_bytes >= getattr(settings, 'TREE_SNAPSHOT_BYTES', 64 * 1024)
+    )
+    return logged, pending_count, pending_bytes, snapshot
+
+
+def save_structure(tree, structure, operations=None, timer=None, summary=None):
+    """
+    La escritura de save_root, para quien ya tiene la estructura compacta
+    (por ejemplo, calculada en otro proceso, ver workers.py). Deja 'tree'
+    en memoria con los valores guardados o lanza VersionConflict.
+    'summary' (logic.summary) actualiza las columnas de resumen; 'size_bytes'
+    solo cambia cuando se reescribe la instantánea. 'structure' puede ser
+    None si el guardado no la reescribe (ver _log_state).
+    """
+    loaded_version = tree.version
+    version = loaded_version + 1
+
+    with phase(timer, 'save'), transaction.atomic():
+        logged, pending_count, pending_bytes, compact = _log_state(tree, operations)
+        fields = {"version": version, "updated_at": timezone.now()}
+        fields.update(summary or {})
+        if compact:
+            fields.update(structure=structure, snapshot_version=version, pending_operations=0, pending_bytes=0,
+                          size_bytes=len(json.dumps(structure)))
+        else:
+            # Escritura de tamaño constante: el JSON de la BBDD sigue siendo la instantánea
+            fields.update(pending_operations=pending_count, pending_bytes=pending_bytes)
+        if not Tree.objects.filter(pk=tree.pk, version=loaded_version).update(**fields):
+            raise VersionConflict(f"El árbol {tree.pk} ya no está en la versión {loaded_version}.")
+
+        # La versión ya es nuestra: el registro no puede chocar con otra petición
+        TreeOperation.objects.bulk_create([
+            TreeOperation(tree=tree, version=version, position=i, operation=op, value=value)
+            for i, (op, value) in enumerate(logged)
+        ])
+        if compact and tree.storage_mode == Tree.StorageModes.LOG:
+            TreeOperation.objects.filter(tree=tree, version__lte=version).delete()
+
+    for name, value in fields.items():
+        setattr(tree, name, value)
+    if structure is not None:
+        tree.structure = structure
+
+
+def with_retries(tree, attempt):
+    """
+    Ejecuta attempt() (cargar el árbol, operar y llamar a save_root) y, si
+    otra petición guardó el árbol antes (VersionConflict), lo recarga de la
+    BBDD y repite todo sobre la versión nueva, hasta TREE_SAVE_RETRIES veces.
+    Devuelve lo que devuelva attempt(); si se agotan los intentos, relanza
+    VersionConflict.
+    """
+    retries = getattr(settings, 'TREE_SAVE_RETRIES', 5)
+    for attempt_number in range(retries + 1):
+        try:
+            return attempt()
+        except VersionConflict:
+            if attempt_number == retries:
+                raise
+            tree.refresh_from_db()
+
+
+def current_root(tree, logic):
+    """
+    El árbol en memoria con su estado actual si 'tree.structure' no lo tiene
+    (modo registro con operaciones pendientes) o si ya se cargó (save_root);
+    None si basta con decodificar 'tree.structure'. Deja la raíz en
+    'tree._root_node' y las claves resaltadas en 'tree._highlight_keys'.
+    """
+    root_node = getattr(tree, '_root_node', None)
+    if root_node is not None:
+        return root_node
+    if (tree.storage_mode != Tree.StorageModes.LOG or not tree.pending_operations
+            or getattr(tree, '_structure_is_current', False)):
+        return None
+    root_node = load_root(tree, logic)
+    tree_cache.put(tree.pk, tree.updated_at, root_node)
+    tree._root_node = root_node
+    tree._highlight_keys = set()
+    return root_node
+
+
+def materialize(tree, logic):
+    """
+    Deja en 'tree.structure' (solo en memoria) el estado actual de un árbol en
+    modo registro con operaciones pendientes, en formato compacto: para
+    responder con ?structure=compact o guardar una edición directa.
+    """
+    if getattr(tree, '_structure_is_current', False):
+        return
+    root_node = current_root(tree, logic)
+    if root_node is None:
+        return
+    tree.structure = logic.tree_to_compact(root_node, tree._highlight_keys)
+    tree._structure_is_current = True
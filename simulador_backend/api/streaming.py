@@ -0,0 +1,203 @@
+"""
+Exportación e importación de árboles en flujo, sin pasar por el diccionario
+D3 anidado (que hay que construir entero en memoria antes de enviarlo).
+
+Exportar (GET /api/trees/{id}/export/): generadores que recorren el árbol en
+memoria y producen el texto por trozos para un StreamingHttpResponse.
+- kind=keys: una clave por línea, en orden.
+- kind=nodes: NDJSON, un registro por nodo en preorden. Binarios:
+  {"id", "parent", "key"} y, según el tipo, "height", "red" o "priority";
+  árboles B y B+: {"id", "parent", "keys", "leaf"}; arreglo: {"id", "key"}.
+  Los nodos internos del B+ llevan "separators" en lugar de "keys": son solo
+  guías para bajar (tras un borrado pueden quedar claves que ya no están) y
+  las claves del árbol son las de las hojas.
+
+Importar (POST /api/trees/{id}/import/): el cuerpo se lee por trozos y las
+claves se acumulan en un array de enteros de 64 bits (8 bytes por clave en
+lugar de un objeto int) que se ordena (con NumPy si está instalado) y va
+directo al constructor masivo del tipo de árbol. Acepta lo que produce la
+exportación.
+"""
+import json
+import re
+from array import array
+
+from .models import Tree
+
+# Líneas por trozo de la respuesta
+CHUNK_LINES = 1000
+# Bytes del cuerpo que se leen cada vez al importar
+READ_BYTES = 64 * 1024
+
+# Atributos extra de los nodos binarios que se exportan si el nodo los tiene
+EXTRA_FIELDS = ('height', 'red', 'priority')
+KINDS = {
+    'keys': 'text/plain; charset=utf-8',
+    'nodes': 'application/x-ndjson',
+}
+
+_SEPARATORS = re.compile(rb'[\s,]+')
+
+
+class TooManyKeys(Exception):
+    """La importación superó el límite de claves."""
+
+
+# --- EXPORTACIÓN ---
+
+def iter_keys(tree_type, root):
+    """Claves del árbol en orden, sin construir la lista completa."""
+    if tree_type == Tree.TreeTypes.ARRAY:
+        for start in range(0, len(root), CHUNK_LINES):
+            yield from root[start:start + CHUNK_LINES].tolist()
+        return
+
+    if tree_type == Tree.TreeTypes.B_PLUS_TREE:
+        # Las claves están en las hojas: se baja a la primera y se sigue la cadena
+        leaf = root if root is not None and root.keys else None
+        while leaf is not None and not leaf.leaf:
+            leaf = leaf.children[0]
+        while leaf is not None:
+            yield from leaf.keys
+            leaf = leaf.next
+        return
+
+    if tree_type == Tree.TreeTypes.B_TREE:
+        # La pila guarda nodos por visitar y claves (enteros) por emitir
+        stack = [root] if root is not None and root.keys else []
+        while stack:
+            item = stack.pop()
+            if isinstance(item, int):
+                yield item
+            elif item.leaf:
+                yield from item.keys
+            else:
+                for i in range(len(item.keys), 0, -1):
+                    stack.append(item.children[i])
+                    stack.append(item.keys[i - 1])
+                stack.append(item.children[0])
+        return
+
+    stack = []
+    node = root
+    while stack or node is not None:
+        while node is not None:
+            stack.append(node)
+            node = node.left
+        node = stack.pop()
+        yield node.key
+        node = node.right
+
+
+def iter_node_records(tree_type, root):
+    """Un diccionario por nodo en preorden, con su id (posición en el preorden) y el de su padre."""
+    if tree_type == Tree.TreeTypes.ARRAY:
+        for i, key in enumerate(iter_keys(tree_type, root)):
+            yield {"id": i, "key": key}
+        return
+
+    multiway = tree_type in (Tree.TreeTypes.B_TREE, Tree.TreeTypes.B_PLUS_TREE)
+    separators = 'separators' if tree_type == Tree.TreeTypes.B_PLUS_TREE else 'keys'
+    if multiway:
+        stack = [(root, None)] if root is not None and root.keys else []
+    else:
+        stack = [(root, None)] if root is not None else []
+    next_id = 0
+    while stack:
+        node, parent = stack.pop()
+        node_id = next_id
+        next_id += 1
+        if multiway:
+            record = {"id": node_id, "parent": parent, "keys" if node.leaf else separators: list(node.keys), "leaf": node.leaf}
+            children = node.children
+        else:
+            record = {"id": node_id, "parent": parent, "key": node.key}
+            for field in EXTRA_FIELDS:
+                if hasattr(node, field):
+                    record[field] = getattr(node, field)
+            children = [child for child in (node.left, node.right) if child is not None]
+        yield record
+        for child in reversed(children):
+            stack.append((child, node_id))
+
+
+def export_chunks(tree_type, root, kind):
+    """Texto de la exportación en trozos de CHUNK_LINES líneas."""
+    if kind == 'keys':
+        lines = map(str, iter_keys(tree_type, root))
+    else:
+        lines = map(json.dumps, iter_node_records(tree_type, root))
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) == CHUNK_LINES:
+            yield "\n".join(batch) + "\n"
+            batch = []
+    if batch:
+        yield "\n".join(batch) + "\n"
+
+
+# --- IMPORTACIÓN ---
+
+def _add_line(keys, line):
+    """
+    Una línea NDJSON: un registro de la exportación ("key" o "keys"; los
+    nodos internos del B+ solo tienen "separators" y no aportan claves) o
+    enteros sueltos.
+    """
+    line = line.strip()
+    if line.startswith(b'{'):
+        record = json.loads(line)
+        if 'separators' in record:
+            return
+        keys.extend(int(key) for key in (record['keys'] if 'keys' in record else [record['key']]))
+    else:
+        keys.extend(int(token) for token in _SEPARATORS.split(line) if token)
+
+
+def read_keys(stream, ndjson=False, limit=None):
+    """
+    Lee las claves de 'stream' (cualquier objeto con read(n)) por trozos de
+    READ_BYTES: enteros separados por comas o espacios, o NDJSON si 'ndjson'.
+    El trozo final de cada lectura puede estar cortado y se une al siguiente.
+    Devuelve un array('q'). Lanza ValueError (u OverflowError) si algo no es
+    un entero de 64 bits y TooManyKeys en cuanto se pasa de 'limit'.
+    """
+    keys = array('q')
+    tail = b''
+    while True:
+        chunk = stream.read(READ_BYTES) if stream is not None else b''
+        if not chunk:
+            break
+        data = tail + chunk
+        if ndjson:
+            lines = data.split(b'\n')
+            tail = lines.pop()
+            for line in lines:
+                _add_line(keys, line)
+        else:
+            tokens = _SEPARATORS.split(data)
+            tail = tokens.pop()
+            keys.extend(int(token) for token in tokens if token)
+        if limit is not None and len(keys) > limit:
+            raise TooManyKeys()
+
+    if ndjson:
+        _add_line(keys, tail)
+    elif tail:
+        keys.append(int(tail))
+    if limit is not None and len(keys) > limit:
+        raise TooManyKeys()
+    return keys
+
+
+def sorted_unique(keys):
+    """Las claves como lista ordenada y sin repetidas (lo que esperan los constructores masivos)."""
+    try:
+        import numpy as np # Opcional: ver requirements-array.txt
+    except ImportError:
+        return sorted(set(keys))
+    values = np.frombuffer(keys, dtype=np.int64) if len(keys) else np.empty(0, dtype=np.int64)
+    if len(values) > 1 and not np.all(values[1:] > values[:-1]):
+        values = np.unique(values)
+    return values.tolist()
@@ -1,3 +1,1052 @@
-from django.test import TestCase
+import json
+import random
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from . import delta, layout, metrics, storage, streaming, workers
+from .cache import TreeCache, tree_cache
+from .logic import bst, avl, splay, btree, bplustree, redblack, treap, sortedarray, setops
+from .models import Tree
+
+
+def _same_binary_shape(a, b):
+    """Compara dos árboles binarios nodo a nodo (clave, altura, color, prioridad e hijos)."""
+    if a is None or b is None:
+        return a is b
+    return (a.key == b.key
+            and getattr(a, 'height', None) == getattr(b, 'height', None)
+            and getattr(a, 'red', None) == getattr(b, 'red', None)
+            and getattr(a, 'priority', None) == getattr(b, 'priority', None)
+            and _same_binary_shape(a.left, b.left)
+            and _same_binary_shape(a.right, b.right))
+
+
+def _same_btree_shape(a, b):
+    """Compara dos árboles B nodo a nodo (grupos de claves, hojas e hijos)."""
+    if a.keys != b.keys or a.leaf != b.leaf or len(a.children) != len(b.children):
+        return False
+    return all(_same_btree_shape(x, y) for x, y in zip(a.children, b.children))
+
+
+def _highlighted_names(structure):
+    """Claves ('original_name' o 'name') de los nodos marcados con 'highlighted'."""
+    stack, names = [structure], []
+    while stack:
+        node = stack.pop()
+        if node.get("highlighted"):
+            names.append(node.get("original_name", node["name"]))
+        stack.extend(node.get("children", []))
+    return names
+
+
+class RoundTripTests(SimpleTestCase):
+    """
+    Propiedad: cargar lo que se guardó devuelve exactamente el mismo árbol,
+    es decir, load(save(t)) == t para cualquier secuencia de operaciones.
+    """
+    OPERATIONS = 400
+
+    def _random_round_trips(self, logic, same_shape, seed):
+        rng = random.Random(seed)
+        root = logic.dict_to_tree({})
+        for _ in range(self.OPERATIONS):
+            key = rng.randint(0, 200)
+            roll = rng.random()
+            if roll < 0.6:
+                root = logic.insert(root, key)
+            elif roll < 0.85:
+                root = logic.delete(root, key)
+            else:
+                result = logic.search(root, key)
+                if logic is splay:
+                    root = result
+
+            saved = logic.tree_to_dict(root)
+            loaded = logic.dict_to_tree(saved)
+            self.assertTrue(same_shape(root, loaded))
+            self.assertEqual(logic.tree_to_dict(loaded), saved)
+            # El formato compacto (el que se guarda en la BBDD) también
+            packed = json.loads(json.dumps(logic.tree_to_compact(root)))
+            self.assertTrue(same_shape(root, logic.compact_to_tree(packed)))
+            root = loaded
+
+    def test_bst_round_trip(self):
+        for seed in range(5):
+            self._random_round_trips(bst, _same_binary_shape, seed)
+
+    def test_avl_round_trip(self):
+        for seed in range(5):
+            self._random_round_trips(avl, _same_binary_shape, seed)
+
+    def test_splay_round_trip(self):
+        for seed in range(5):
+            self._random_round_trips(splay, _same_binary_shape, seed)
+
+    def test_btree_round_trip(self):
+        for seed in range(5):
+            self._random_round_trips(btree, _same_btree_shape, seed)
+
+    def test_red_black_round_trip(self):
+        for seed in range(5):
+            self._random_round_trips(redblack, _same_binary_shape, seed)
+
+    def test_treap_round_trip(self):
+        for seed in range(5):
+            self._random_round_trips(treap, _same_binary_shape, seed)
+
+    def test_splay_root_is_preserved(self):
+        # Antes, re-insertar en preorden dejaba como raíz la última clave insertada.
+        root = None
+        for key in [50, 30, 70, 20, 40]:
+            root = splay.insert(root, key)
+        root = splay.search(root, 30)
+        loaded = splay.dict_to_tree(splay.tree_to_dict(root))
+        self.assertEqual(loaded.key, 30)
+        self.assertTrue(_same_binary_shape(root, loaded))
+
+    def test_btree_layout_is_preserved(self):
+        # Antes, insertar las claves ordenadas producía otra distribución de nodos.
+        root = btree.dict_to_tree({})
+        for key in [10, 20, 5, 6, 12, 30, 7, 17, 3, 1, 2]:
+            root = btree.insert(root, key)
+        root = btree.delete(root, 6)
+        loaded = btree.dict_to_tree(btree.tree_to_dict(root))
+        self.assertTrue(_same_btree_shape(root, loaded))
+
+
+class OperateBatchTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='ana', password='clave-segura-123')
+        self.client.force_authenticate(self.user)
+        self.tree = Tree.objects.create(user=self.user, name='avl', tree_type=Tree.TreeTypes.AVL)
+        self.url = f'/api/trees/{self.tree.pk}/operate-batch/'
+
+    def test_applies_operations_in_order(self):
+        operations = [{"operation": "insert", "value": v} for v in range(1, 8)]
+        operations += [{"operation": "delete", "value": 4}, {"operation": "search", "value": 4},
+                       {"operation": "search", "value": 6}]
+        response = self.client.post(self.url, {"operations": operations}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["results"]), len(operations))
+        self.assertEqual(response.data["results"][-2], {"operation": "search", "value": 4, "found": False})
+        self.assertEqual(response.data["results"][-1], {"operation": "search", "value": 6, "found": True})
+
+        self.tree.refresh_from_db()
+        root = avl.compact_to_tree(self.tree.structure)
+        self.assertIsNone(avl.search(root, 4))
+        self.assertIsNotNone(avl.search(root, 7))
+
+    def test_invalid_operation_rejects_whole_batch(self):
+        operations = [{"operation": "insert", "value": 1}, {"operation": "rotate", "value": 2}]
+        response = self.client.post(self.url, {"operations": operations}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.tree.refresh_from_db()
+        self.assertEqual(self.tree.structure, {})
+
+
+class BulkLoadTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='ana', password='clave-segura-123')
+        self.client.force_authenticate(self.user)
+
+    def _load(self, tree_type, payload, **kwargs):
+        tree = Tree.objects.create(user=self.user, name=tree_type, tree_type=tree_type)
+        response = self.client.post(f'/api/trees/{tree.pk}/bulk-load/', payload, **kwargs)
+        self.assertEqual(response.status_code, 200)
+        tree.refresh_from_db()
+        return tree.structure
+
+    def test_unsorted_values_build_a_balanced_avl(self):
+        values = list(range(100, 0, -1)) + [50, 50]
+        root = avl.compact_to_tree(self._load(Tree.TreeTypes.AVL, {"values": values}, format='json'))
+        self.assertEqual(root.height, 7) # ceil(log2(101))
+        for value in range(1, 101):
+            self.assertIsNotNone(avl.search(root, value))
+
+    def test_btree_from_uploaded_file(self):
+        upload = SimpleUploadedFile('claves.txt', b'\n'.join(str(v).encode() for v in range(1, 51)))
+        root = btree.compact_to_tree(self._load(Tree.TreeTypes.B_TREE, {"file": upload}, format='multipart'))
+        for value in range(1, 51):
+            self.assertIsNotNone(btree.search(root, value))
+        self.assertIsNone(btree.search(root, 51))
+
+    def test_fill_must_be_in_range(self):
+        tree = Tree.objects.create(user=self.user, name="b", tree_type=Tree.TreeTypes.B_TREE)
+        for fill in ("nan", "inf", "-inf", 0, -0.5, 1.5, "mucho"):
+            response = self.client.post(f'/api/trees/{tree.pk}/bulk-load/', {"values": [1, 2, 3], "fill": fill}, format='json')
+            self.assertEqual(response.status_code, 400, fill)
+        response = self.client.post(f'/api/trees/{tree.pk}/bulk-load/', {"values": [1, 2, 3], "fill": 0.5}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+
+class TreeCacheTests(APITestCase):
+    def setUp(self):
+        tree_cache.clear()
+        self.user = User.objects.create_user(username='ana', password='clave-segura-123')
+        self.client.force_authenticate(self.user)
+        self.tree = Tree.objects.create(user=self.user, name='bst', tree_type=Tree.TreeTypes.BST)
+        self.url = f'/api/trees/{self.tree.pk}/operate/'
+
+    def test_consecutive_operations_hit_the_cache(self):
+        for value in (5, 3, 8):
+            self.client.post(self.url, {"operation": "insert", "value": value}, format='json')
+        stats = self.client.get('/api/trees/cache-stats/').data
+        self.assertEqual((stats["hits"], stats["misses"]), (2, 1))
+
+    def test_external_update_invalidates_entry(self):
+        self.client.post(self.url, {"operation": "insert", "value": 5}, format='json')
+        # Otro proceso (o un PUT) cambia el árbol: la versión cacheada ya no sirve
+        self.tree.refresh_from_db()
+        self.tree.structure = {"name": "42"}
+        self.tree.save()
+        response = self.client.post(self.url, {"operation": "search", "value": 42}, format='json')
+        self.assertTrue(response.data["structure"]["highlighted"])
+        self.assertEqual(tree_cache.stats()["misses"], 2)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = TreeCache(max_entries=2)
+        for pk in (1, 2, 3):
+            cache.put(pk, 'v', object())
+        self.assertIsNone(cache.take(1, 'v'))
+        self.assertIsNotNone(cache.take(3, 'v'))
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+
+class DeltaResponseTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='ana', password='clave-segura-123')
+        self.client.force_authenticate(self.user)
+
+    def _apply(self, records, changes):
+        """Aplica un delta a una copia plana del árbol, como haría el cliente."""
+        records = dict(records)
+        for node_id in changes["removed"]:
+            del records[node_id]
+        for record in changes["added"] + changes["changed"]:
+            records[record["id"]] = record
+        return records
+
+    def test_delta_reproduces_the_new_structure(self):
+        for tree_type in (Tree.TreeTypes.AVL, Tree.TreeTypes.SPLAY, Tree.TreeTypes.B_TREE):
+            tree = Tree.objects.create(user=self.user, name=tree_type, tree_type=tree_type)
+            url = f'/api/trees/{tree.pk}/operate/'
+            client_copy, version = {}, 0
+            for operation, value in [("insert", v) for v in range(1, 12)] + [("delete", 4), ("search", 9)]:
+                response = self.client.post(url, {"operation": operation, "value": value, "response": "delta"}, format='json')
+                self.assertEqual(response.data["base_version"], version)
+                client_copy = self._apply(client_copy, response.data["delta"])
+                version = response.data["version"]
+
+            tree.refresh_from_db()
+            self.assertEqual(tree.version, version)
+            self.assertEqual(client_copy, delta.flatten(self.client.get(f'/api/trees/{tree.pk}/').data["structure"]))
+
+    def test_b_plus_separators_and_leaves_with_the_same_keys(self):
+        # Tras borrar 4 la raíz es el separador [3] y una de sus hojas también es [3]
+        tree = Tree.objects.create(user=self.user, name='b+', tree_type=Tree.TreeTypes.B_PLUS_TREE, degree=2)
+        url = f'/api/trees/{tree.pk}/operate/'
+        for value in (1, 2, 3, 4):
+            self.client.post(url, {"operation": "insert", "value": value}, format='json')
+        client_copy = delta.flatten(self.client.get(f'/api/trees/{tree.pk}/').data["structure"])
+        response = self.client.post(url, {"operation": "delete", "value": 4, "response": "delta"}, format='json')
+        changes = response.data["delta"]
+        self.assertTrue(all(record["parent"] != record["id"] for record in changes["added"] + changes["changed"]))
+        client_copy = self._apply(client_copy, changes)
+        self.assertEqual(client_copy, delta.flatten(self.client.get(f'/api/trees/{tree.pk}/').data["structure"]))
+        self.assertEqual(sorted(record["name"] for record in client_copy.values()), ["[1, 2]", "[3]", "[3]"])
+
+    def test_stale_client_gets_the_full_tree(self):
+        tree = Tree.objects.create(user=self.user, name='bst', tree_type=Tree.TreeTypes.BST)
+        url = f'/api/trees/{tree.pk}/operate/'
+        self.client.post(url, {"operation": "insert", "value": 1}, format='json')
+        response = self.client.post(url, {"operation": "insert", "value": 2, "response": "delta", "base_version": 0}, format='json')
+        self.assertNotIn("delta", response.data)
+        self.assertEqual(response.data["version"], 2)
+
+
+@override_settings(TREE_SNAPSHOT_INTERVAL=5)
+class OperationLogTests(APITestCase):
+    def setUp(self):
+        tree_cache.clear()
+        self.user = User.objects.create_user(username='ana', password='clave-segura-123')
+        self.client.force_authenticate(self.user)
+        self.tree = Tree.objects.create(user=self.user, name='log', tree_type=Tree.TreeTypes.SPLAY,
+                                        storage_mode=Tree.StorageModes.LOG)
+        self.url = f'/api/trees/{self.tree.pk}/operate/'
+
+    def _operate(self, operation, value):
+        return self.client.post(self.url, {"operation": operation, "value": value}, format='json')
+
+    def test_operations_are_appended_until_the_snapshot_interval(self):
+        for value in (10, 20, 30):
+            response = self._operate("insert", value)
+        self.tree.refresh_from_db()
+        self.assertEqual(self.tree.structure, {}) # La instantánea todavía no se reescribió
+        self.assertEqual(self.tree.operations.count(), 3)
+        self.assertEqual(response.data["structure"]["name"], "30")
+
+        self._operate("search", 10)
+        self._operate("insert", 40) # Quinta operación: se compacta
+        self.tree.refresh_from_db()
+        self.assertEqual(self.tree.operations.count(), 0)
+        self.assertEqual(self.tree.snapshot_version, 5)
+        self.assertEqual(self.tree.structure["keys"][0], 40) # Preorden: la raíz va primero
+
+    def test_logged_operations_skip_the_compact_serialization(self):
+        with mock.patch.object(splay, 'tree_to_compact', wraps=splay.tree_to_compact) as to_compact:
+            for value in (10, 20, 30, 40):
+                self._operate("insert", value)
+            self.assertEqual(to_compact.call_count, 0) # Solo se registran: O(1) por operación
+            highlighted = self._operate("search", 20).data["structure"] # Quinta: se compacta
+            self.assertEqual(to_compact.call_count, 1)
+        self.assertEqual(_highlighted_names(highlighted), ["20"])
+        compact = self.client.get(f'/api/trees/{self.tree.pk}/?structure=compact').data["structure"]
+        self.assertEqual(compact["highlight"], [20])
+
+    def test_replay_matches_live_tree(self):
+        for operation, value in [("insert", 5), ("insert", 1), ("insert", 9), ("search", 1)]:
+            live = self._operate(operation, value).data["structure"]
+        tree_cache.clear() # Otro proceso: debe reconstruir instantánea + registro
+        response = self.client.get(f'/api/trees/{self.tree.pk}/')
+        self.assertEqual(response.data["structure"], splay.tree_to_dict(splay.dict_to_tree(live)))
+        self.assertEqual(response.data["structure"]["name"], "1")
+
+
+class TraceTests(SimpleTestCase):
+    def test_avl_reports_rotation_case(self):
+        root = None
+        for key in (1, 2):
+            root = avl.insert(root, key)
+        trace = []
+        avl.insert(root, 3, trace=trace)
+        self.assertEqual([e["key"] for e in trace if e["type"] == "visit"], [1, 2])
+        self.assertIn({"type": "rotation", "case": "RR", "key": 1}, trace)
+
+    def test_splay_reports_steps(self):
+        root = None
+        for key in (3, 2, 1):
+            root = splay.insert(root, key) # Queda una cadena 1 -> 2 -> 3
+        trace = []
+        root = splay.search(root, 3, trace=trace)
+        self.assertEqual([e["step"] for e in trace if e["type"] == "splay"], ["zig-zig"])
+        self.assertEqual(trace[-1], {"type": "root", "key": 3})
+
+    def test_btree_reports_split(self):
+        root = btree.dict_to_tree({})
+        for key in (1, 2, 3):
+            root = btree.insert(root, key)
+        trace = []
+        btree.insert(root, 4, trace=trace)
+        self.assertEqual(trace[0], {"type": "split", "keys": [1, 2, 3], "median": 2})
+        self.assertEqual(trace[-1], {"type": "insert", "key": 4, "keys": [3, 4]})
+
+    def test_trace_is_opt_in(self):
+        root = bst.insert(None, 5)
+        self.assertIs(bst.insert(root, 3), root) # Sin 'trace' la API no cambia
+
+
+class BTreeDegreeTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='ana', password='clave-segura-123')
+        self.client.force_authenticate(self.user)
+
+    def test_operations_use_the_tree_degree(self):
+        response = self.client.post('/api/trees/', {"name": "b32", "tree_type": "B_TREE", "degree": 32}, format='json')
+        self.assertEqual(response.status_code, 201)
+        url = f'/api/trees/{response.data["id"]}/operate-batch/'
+        operations = [{"operation": "insert", "value": v} for v in range(200)]
+        structure = self.client.post(url, {"operations": operations}, format='json').data["tree"]["structure"]
+
+        root = btree.dict_to_tree(structure)
+        # Con t=32 basta un nivel de hojas bajo la raíz; con t=2 harían falta varios
+        self.assertTrue(all(child.leaf for child in root.children))
+        self.assertTrue(all(31 <= len(child.keys) <= 63 for child in root.children))
+
+    def test_tree_type_cannot_change(self):
+        tree = Tree.objects.create(user=self.user, name='splay', tree_type=Tree.TreeTypes.SPLAY)
+        self.client.post(f'/api/trees/{tree.pk}/bulk-load/', {"values": list(range(20))}, format='json')
+        response = self.client.patch(f'/api/trees/{tree.pk}/', {"tree_type": "B_TREE"}, format='json')
+        self.assertEqual(response.status_code, 400)
+        tree.refresh_from_db()
+        self.assertEqual(tree.tree_type, Tree.TreeTypes.SPLAY)
+        response = self.client.post(f'/api/trees/{tree.pk}/operate/', {"operation": "insert", "value": 99}, format='json')
+        self.assertEqual(response.status_code, 200)
+        # Enviar el mismo tipo (como hace un PUT completo) sí se acepta
+        self.assertEqual(self.client.patch(f'/api/trees/{tree.pk}/', {"tree_type": "SPLAY"}, format='json').status_code, 200)
+
+    def test_degree_cannot_change(self):
+        tree = Tree.objects.create(user=self.user, name='b', tree_type=Tree.TreeTypes.B_TREE, degree=4)
+        response = self.client.patch(f'/api/trees/{tree.pk}/', {"degree": 8}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_duplicate_keys_are_ignored(self):
+        root = btree.dict_to_tree({})
+        for key in (5, 1, 9, 5, 1, 9):
+            root = btree.insert(root, key, t=3)
+        self.assertEqual(root.keys, [1, 5, 9])
+
+
+class BPlusTreeTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='ana', password='clave-segura-123')
+        self.client.force_authenticate(self.user)
+
+    def _leaf_keys(self, root):
+        # Recorre la cadena de hojas desde la más a la izquierda
+        node = root
+        while not node.leaf:
+            node = node.children[0]
+        keys = []
+        while node is not None:
+            keys.extend(node.keys)
+            node = node.next
+        return keys
+
+    def test_leaves_stay_linked_after_random_operations(self):
+        rng = random.Random(3)
+        root, expected = bplustree.dict_to_tree({}), set()
+        for _ in range(500):
+            key = rng.randint(0, 150)
+            if rng.random() < 0.6:
+                root = bplustree.insert(root, key, t=2)
+                expected.add(key)
+            else:
+                root = bplustree.delete(root, key, t=2)
+                expected.discard(key)
+        self.assertEqual(self._leaf_keys(root), sorted(expected))
+        loaded = bplustree.dict_to_tree(bplustree.tree_to_dict(root))
+        self.assertEqual(self._leaf_keys(loaded), sorted(expected))
+        self.assertEqual(bplustree.range_keys(loaded, 40, 90), [k for k in sorted(expected) if 40 <= k <= 90])
+
+    def test_range_operation(self):
+        response = self.client.post('/api/trees/', {"name": "bp", "tree_type": "B_PLUS_TREE", "degree": 3}, format='json')
+        tree_id = response.data["id"]
+        self.client.post(f'/api/trees/{tree_id}/bulk-load/', {"values": list(range(0, 100, 2))}, format='json')
+        response = self.client.post(f'/api/trees/{tree_id}/operate/', {"operation": "range", "value": 15, "high": 25}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["keys"], [16, 18, 20, 22, 24])
+        # Se resaltan las hojas que contienen claves del rango
+        self.assertTrue(_highlighted_names(response.data["structure"]))
+
+    def test_range_requires_support_and_high(self):
+        btree_tree = Tree.objects.create(user=self.user, name='b', tree_type=Tree.TreeTypes.B_TREE)
+        response = self.client.post(f'/api/trees/{btree_tree.pk}/operate/', {"operation": "range", "value": 1, "high": 5}, format='json')
+        self.assertEqual(response.status_code, 400)
+        bp_tree = Tree.objects.create(user=self.user, name='bp', tree_type=Tree.TreeTypes.B_PLUS_TREE)
+        response = self.client.post(f'/api/trees/{bp_tree.pk}/operate/', {"operation": "range", "value": 1}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class OrderQueryTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='ana', password='clave-segura-123')
+        self.client.force_authenticate(self.user)
+
+    def test_queries_match_sorted_keys(self):
+        # Los tamaños de los subárboles siguen bien tras rotaciones y splays
+        for logic in (bst, avl, splay):
+            rng = random.Random(11)
+            root, expected = None, set()
+            for _ in range(400):
+                key = rng.randint(0, 120)
+                if rng.random() < 0.6:
+                    root = logic.insert(root, key)
+                    expected.add(key)
+                else:
+                    root = logic.delete(root, key)
+                    expected.discard(key)
+            ordered = sorted(expected)
+            self.assertEqual([logic.select(root, i) for i in range(len(ordered))], ordered)
+            self.assertEqual([logic.rank(root, k) for k in ordered], list(range(len(ordered))))
+            self.assertEqual(logic.range_keys(root, 30, 70), [k for k in ordered if 30 <= k <= 70])
+            self.assertEqual((logic.minimum(root), logic.maximum(root)), (ordered[0], ordered[-1]))
+            self.assertEqual(logic.successor(root, ordered[0]), ordered[1])
+            self.assertEqual(logic.predecessor(root, ordered[1]), ordered[0])
+
+    def test_query_operations(self):
+        tree = Tree.objects.create(user=self.user, name='avl', tree_type=Tree.TreeTypes.AVL)
+        self.client.post(f'/api/trees/{tree.pk}/bulk-load/', {"values": list(range(10, 110, 10))}, format='json')
+        url = f'/api/trees/{tree.pk}/operate-batch/'
+        operations = [
+            {"operation": "min"},
+            {"operation": "successor", "value": 35},
+            {"operation": "rank", "value": 55},
+            {"operation": "select", "value": 7},
+            {"operation": "range", "value": 20, "high": 40},
+        ]
+        results = self.client.post(url, {"operations": operations}, format='json').data["results"]
+        self.assertEqual([r.get("result", r.get("keys")) for r in results], [10, 40, 5, 80, [20, 30, 40]])
+
+        response = self.client.post(f'/api/trees/{tree.pk}/operate/', {"operation": "max"}, format='json')
+        self.assertEqual(response.data["result"], 100)
+        self.assertEqual(_highlighted_names(response.data["structure"]), ["100"])
+
+        response = self.client.post(f'/api/trees/{tree.pk}/operate/', {"operation": "range", "value": 25, "high": 55}, format='json')
+        self.assertEqual(sorted(_highlighted_names(response.data["structure"]), key=int), ["30", "40", "50"])
+
+    def test_unsupported_query_is_rejected(self):
+        tree = Tree.objects.create(user=self.user, name='b', tree_type=Tree.TreeTypes.B_TREE)
+        response = self.client.post(f'/api/trees/{tree.pk}/operate/', {"operation": "rank", "value": 3}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class RedBlackTreapTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='ana', password='clave-segura-123')
+        self.client.force_authenticate(self.user)
+
+    def _black_height(self, node):
+        """Altura negra del subárbol, comprobando de paso las reglas del rojo-negro."""
+        if node is None:
+            return 1
+        if node.red:
+            self.assertFalse(redblack.is_red(node.left) or redblack.is_red(node.right))
+        left, right = self._black_height(node.left), self._black_height(node.right)
+        self.assertEqual(left, right)
+        return left + (0 if node.red else 1)
+
+    def _check_heap(self, node):
+        for child in (node.left, node.right) if node else ():
+            if child:
+                self.assertLessEqual(child.priority, node.priority)
+                self._check_heap(child)
+
+    def test_invariants_hold_after_random_operations(self):
+        rng = random.Random(5)
+        rb_root = tp_root = None
+        for _ in range(600):
+            key = rng.randint(0, 200)
+            if rng.random() < 0.6:
+                rb_root, tp_root = redblack.insert(rb_root, key), treap.insert(tp_root, key)
+            else:
+                rb_root, tp_root = redblack.delete(rb_root, key), treap.delete(tp_root, key)
+        self.assertFalse(rb_root.red)
+        self._black_height(rb_root)
+        self._check_heap(tp_root)
+        self.assertEqual(redblack.range_keys(rb_root, 0, 200), treap.range_keys(tp_root, 0, 200))
+
+    def test_new_types_through_the_api(self):
+        for tree_type in (Tree.TreeTypes.RED_BLACK, Tree.TreeTypes.TREAP):
+            tree = Tree.objects.create(user=self.user, name=tree_type, tree_type=tree_type)
+            url = f'/api/trees/{tree.pk}/operate-batch/'
+            operations = [{"operation": "insert", "value": v} for v in range(1, 64)]
+            operations.append({"operation": "select", "value": 9})
+            data = self.client.post(url, {"operations": operations}, format='json').data
+            self.assertEqual(data["results"][-1]["result"], 10)
+            logic = redblack if tree_type == Tree.TreeTypes.RED_BLACK else treap
+            root = logic.dict_to_tree(data["tree"]["structure"])
+            self.assertEqual(logic.range_keys(root, 0, 100), list(range(1, 64)))
+
+
+class SortedArrayTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='ana', password='clave-segura-123')
+        self.client.force_authenticate(self.user)
+
+    def test_vectorized_batch_matches_one_by_one(self):
+        rng = random.Random(2)
+        operations = [(rng.choice(('insert', 'insert', 'delete', 'search')), rng.randint(0, 300), None) for _ in range(2000)]
+        batched, batched_results = storage.apply_batch(sortedarray, Tree.TreeTypes.ARRAY, sortedarray.dict_to_tree({}), operations)
+        single, single_results = storage.apply_batch(sortedarray, Tree.TreeTypes.ARRAY, sortedarray.dict_to_tree({}), operations, with_trace=True)
+        self.assertEqual(batched.tolist(), single.tolist())
+        self.assertEqual([result for result, _ in batched_results], [result for result, _ in single_results])
+
+    def test_array_through_the_api(self):
+        tree = Tree.objects.create(user=self.user, name='arr', tree_type=Tree.TreeTypes.ARRAY)
+        self.client.post(f'/api/trees/{tree.pk}/bulk-load/', {"values": [9, 3, 7, 1, 5]}, format='json')
+        url = f'/api/trees/{tree.pk}/operate-batch/'
+        operations = [{"operation": "insert", "value": 4}, {"operation": "search", "value": 1},
+                      {"operation": "search", "value": 2}, {"operation": "rank", "value": 5}]
+        data = self.client.post(url, {"operations": operations}, format='json').data
+        self.assertEqual([r.get("found", r.get("result")) for r in data["results"][1:]], [True, False, 3])
+        # La vista es el BST balanceado sobre las claves ordenadas
+        structure = data["tree"]["structure"]
+        self.assertEqual(structure["name"], "4")
+        self.assertEqual(sortedarray.dict_to_tree(structure).tolist(), [1, 3, 4, 5, 7, 9])
+
+    def test_keys_outside_int64_are_rejected_before_numpy(self):
+        tree = Tree.objects.create(user=self.user, name='arr', tree_type=Tree.TreeTypes.ARRAY)
+        self.client.post(f'/api/trees/{tree.pk}/bulk-load/', {"values": [1, 2, 3]}, format='json')
+        for value in (2 ** 63, -2 ** 63 - 1):
+            response = self.client.post(f'/api/trees/{tree.pk}/operate/', {"operation": "insert", "value": value}, format='json')
+            self.assertEqual(response.status_code, 400)
+            response = self.client.post(f'/api/trees/{tree.pk}/operate-batch/',
+                                        {"operations": [{"operation": "delete", "value": value}]}, format='json')
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(self.client.get(f'/api/trees/{tree.pk}/subtree/?key={value}').status_code, 400)
+        tree.refresh_from_db()
+        self.assertEqual((tree.node_count, tree.max_key), (3, 3))
+
+
+class CompactFormatTests(APITestCase):
+    def setUp(self):
+        tree_cache.clear()
+        self.user = User.objects.create_user(username='ana', password='clave-segura-123')
+        self.client.force_authenticate(self.user)
+
+    def test_bplustree_compact_round_trip_relinks_leaves(self):
+        root = bplustree.build_from_sorted(list(range(0, 300, 3)), t=3, fill=0.7)
+        loaded = bplustree.compact_to_tree(bplustree.tree_to_compact(root))
+        self.assertTrue(_same_btree_shape(root, loaded))
+        self.assertEqual(bplustree.range_keys(loaded, 0, 300), list(range(0, 300, 3)))
+
+    def test_sizes_are_recomputed_from_the_preorder(self):
+        root = avl.build_from_sorted(list(range(100)))
+        loaded = avl.compact_to_tree(avl.tree_to_compact(root))
+        self.assertEqual(avl.select(loaded, 42), 42)
+        self.assertEqual(loaded.height, root.height)
+
+    def test_stored_compact_is_served_as_d3_or_compact(self):
+        tree = Tree.objects.create(user=self.user, name='rb', tree_type=Tree.TreeTypes.RED_BLACK)
+        self.client.post(f'/api/trees/{tree.pk}/bulk-load/', {"values": list(range(1, 1001))}, format='json')
+        response = self.client.post(f'/api/trees/{tree.pk}/operate/', {"operation": "search", "value": 7}, format='json')
+        d3 = response.data["structure"]
+        self.assertEqual(_highlighted_names(d3), ["7"])
+
+        tree.refresh_from_db()
+        self.assertEqual(tree.structure["highlight"], [7])
+        self.assertLess(len(json.dumps(tree.structure)), len(json.dumps(d3)) / 4)
+
+        tree_cache.clear() # Sin caché, la respuesta D3 sale de decodificar la estructura compacta
+        self.assertEqual(self.client.get(f'/api/trees/{tree.pk}/').data["structure"], d3)
+        compact = self.client.get(f'/api/trees/{tree.pk}/?structure=compact').data["structure"]
+        self.assertEqual(compact, tree.structure)
+
+    def test_metadata_patch_keeps_the_stored_structure_compact(self):
+        tree = Tree.objects.create(user=self.user, name='avl', tree_type=Tree.TreeTypes.AVL, storage_mode=Tree.StorageModes.LOG)
+        self.client.post(f'/api/trees/{tree.pk}/bulk-load/', {"values": list(range(100))}, format='json')
+        self.client.post(f'/api/trees/{tree.pk}/operate/', {"operation": "insert", "value": 500}, format='json')
+
+        response = self.client.patch(f'/api/trees/{tree.pk}/?layout=tidy', {"name": "renombrado"}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("x", response.data["structure"]) # La respuesta sí llega en D3 con coordenadas
+
+        tree.refresh_from_db()
+        self.assertEqual(tree.name, "renombrado")
+        self.assertEqual(tree.structure["format"], "compact")
+        self.assertIn(500, tree.structure["keys"]) # La operación pendiente pasa a la instantánea
+        self.assertEqual(tree.size_bytes, len(json.dumps(tree.structure)))
+
+    def test_msgpack_response(self):
+        import msgpack
+        tree = Tree.objects.create(user=self.user, name='b', tree_type=Tree.TreeTypes.B_TREE)
+        self.client.post(f'/api/trees/{tree.pk}/bulk-load/', {"values": list(range(50))}, format='json')
+        response = self.client.get(f'/api/trees/{tree.pk}/?structure=compact', HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        structure = msgpack.unpackb(response.content)["structure"]
+        self.assertEqual(btree.compact_to_tree(structure).keys, btree.build_from_sorted(list(range(50))).keys)
+
+
+class OptimisticVersionTests(APITestCase):
+    def setUp(self):
+        tree_cache.clear()
+        self.user = User.objects.create_user(username='ana', password='clave-segura-123')
+        self.client.force_authenticate(self.user)
+        self.tree = Tree.objects.create(user=self.user, name='bst', tree_type=Tree.TreeTypes.BST)
+
+    def _insert_from(self, tree, key):
+        root = bst.insert(storage.load_root(tree, bst), key)
+        storage.save_root(tree, bst, root, [("insert", key)])
+
+    def test_stale_save_is_rejected(self):
+        stale = Tree.objects.get(pk=self.tree.pk)
+        self.client.post(f'/api/trees/{self.tree.pk}/operate/', {"operation": "insert", "value": 5}, format='json')
+        with self.assertRaises(storage.VersionConflict):
+            self._insert_from(stale, 7)
+        self.tree.refresh_from_db()
+        self.assertEqual((self.tree.version, self.tree.structure["keys"]), (1, [5]))
+
+    def test_retry_reapplies_the_operation_on_the_new_version(self):
+        stale = Tree.objects.get(pk=self.tree.pk)
+        self.client.post(f'/api/trees/{self.tree.pk}/operate/', {"operation": "insert", "value": 5}, format='json')
+        attempts = []
+
+        def attempt():
+            attempts.append(stale.version)
+            self._insert_from(stale, 7)
+
+        storage.with_retries(stale, attempt)
+        self.assertEqual(attempts, [0, 1])
+        self.tree.refresh_from_db()
+        self.assertEqual((self.tree.version, self.tree.structure["keys"]), (2, [5, 7]))
+
+    @override_settings(TREE_SAVE_RETRIES=0)
+    def test_exhausted_retries_answer_409(self):
+        with mock.patch.object(storage, 'save_root', side_effect=storage.VersionConflict):
+            response = self.client.post(f'/api/trees/{self.tree.pk}/operate/', {"operation": "insert", "value": 5}, format='json')
+        self.assertEqual(response.status_code, 409)
+
+
+class AsyncOperateTests(APITestCase):
+    def setUp(self):
+        tree_cache.clear()
+        self.user = User.objects.create_user(username='ana', password='clave-segura-123')
+        self.client.force_authenticate(self.user)
+
+    def _tree(self, name, tree_type, keys, **kwargs):
+        tree = Tree.objects.create(user=self.user, name=name, tree_type=tree_type, **kwargs)
+        self.client.post(f'/api/trees/{tree.pk}/bulk-load/', {"values": keys}, format='json')
+        return tree
+
+    def test_matches_the_sync_endpoint(self):
+        sync_tree = self._tree('sync', Tree.TreeTypes.AVL, list(range(0, 100, 2)))
+        async_tree = self._tree('async', Tree.TreeTypes.AVL, list(range(0, 100, 2)), storage_mode=Tree.StorageModes.LOG)
+        for body in ({"operation": "insert", "value": 51}, {"operation": "range", "value": 40, "high": 55},
+                     {"operation": "search", "value": 51, "trace": True}):
+            expected = self.client.post(f'/api/trees/{sync_tree.pk}/operate/', body, format='json')
+            response = self.client.post(f'/api/trees/{async_tree.pk}/operate-async/', body, format='json')
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            for field in ("structure", "keys", "result", "trace", "version"):
+                self.assertEqual(data.get(field), expected.data.get(field))
+        self.assertIn("compute;dur=", response['Server-Timing'])
+
+    @override_settings(TREE_POOL_MIN_KEYS=0, TREE_WORKER_PROCESSES=1)
+    def test_large_trees_go_to_the_process_pool(self):
+        tree = self._tree('b', Tree.TreeTypes.B_TREE, list(range(200)))
+        before = workers.pool.stats()["pool_runs"]
+        try:
+            response = self.client.post(f'/api/trees/{tree.pk}/operate-async/?structure=compact',
+                                        {"operation": "delete", "value": 7}, format='json')
+        finally:
+            workers.pool.shutdown()
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(7, response.json()["structure"]["keys"])
+        self.assertEqual(workers.pool.stats()["pool_runs"], before + 1)
+
+    @override_settings(TREE_POOL_MIN_KEYS=0, TREE_WORKER_PROCESSES=2)
+    def test_falls_back_to_threads_when_the_pool_cannot_start(self):
+        tree = self._tree('b', Tree.TreeTypes.B_TREE, list(range(200)))
+        workers.pool.shutdown()
+        before = workers.pool.stats()
+        no_semaphores = OSError(38, "Function not implemented")
+        try:
+            with mock.patch.object(workers, 'ProcessPoolExecutor', side_effect=no_semaphores), self.assertLogs('api.workers', 'WARNING'):
+                for value in (7, 8):
+                    response = self.client.post(f'/api/trees/{tree.pk}/operate-async/', {"operation": "delete", "value": value}, format='json')
+                    self.assertEqual(response.status_code, 200)
+            stats = workers.pool.stats()
+        finally:
+            workers.pool.shutdown()
+        self.assertEqual((stats["processes"], stats["pool_runs"]), (0, before["pool_runs"]))
+        self.assertEqual(stats["inline_runs"], before["inline_runs"] + 2)
+
+    def test_other_users_trees_are_not_found(self):
+        other = User.objects.create_user(username='beto', password='clave-segura-123')
+        tree = Tree.objects.create(user=other, name='ajeno', tree_type=Tree.TreeTypes.BST)
+        response = self.client.post(f'/api/trees/{tree.pk}/operate-async/', {"operation": "insert", "value": 1}, format='json')
+        self.assertEqual(response.status_code, 404)
+
+
+class TreeSummaryTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='ana', password='clave-segura-123')
+        self.client.force_authenticate(self.user)
+
+    def _summary(self, tree):
+        tree.refresh_from_db()
+        return (tree.node_count, tree.height, tree.min_key, tree.max_key)
+
+    @override_settings(TREE_SNAPSHOT_INTERVAL=14)
+    def test_operations_keep_the_columns_up_to_date(self):
+        modules = {Tree.TreeTypes.SPLAY: splay, Tree.TreeTypes.AVL: avl, Tree.TreeTypes.B_PLUS_TREE: bplustree}
+        for tree_type, module in modules.items():
+            tree = Tree.objects.create(user=self.user, name=tree_type, tree_type=tree_type,
+                                       storage_mode=Tree.StorageModes.LOG)
+            url = f'/api/trees/{tree.pk}/operate/'
+            with mock.patch.object(module, 'summary', wraps=module.summary) as full_summary:
+                for value in (*range(1, 11), 5):
+                    self.client.post(url, {"operation": "insert", "value": value}, format='json')
+                self.client.post(url, {"operation": "delete", "value": 42}, format='json')
+                self.client.post(url, {"operation": "delete", "value": 10}, format='json')
+                # Solo registradas: el resumen sale sin recorrer el árbol
+                self.assertEqual(full_summary.call_count, 0)
+                count, _, low, high = self._summary(tree)
+                self.assertEqual((count, low, high), (9, 1, 9))
+                self.client.post(url, {"operation": "delete", "value": 1}, format='json') # Se compacta
+                self.assertEqual(full_summary.call_count, 1)
+            count, height, low, high = self._summary(tree)
+            self.assertEqual((count, low, high), (8, 2, 9))
+            tree.refresh_from_db()
+            root = storage.load_root(tree, storage.logic_for(tree.tree_type, tree.degree))
+            self.assertEqual(height, storage.logic_for(tree.tree_type, tree.degree).summary(root)["height"])
+
+        # La estructura enviada a mano (en D3) también se resume
+        response = self.client.post('/api/trees/', {"name": "manual", "tree_type": "BST",
+                                                    "structure": {"name": "5", "children": [{"name": "3"}]}}, format='json')
+        self.assertEqual(self._summary(Tree.objects.get(pk=response.data["id"])), (2, 2, 3, 5))
+
+    def test_summary_list_is_paginated_sorted_and_skips_structure(self):
+        for size in (30, 10, 20):
+            tree = Tree.objects.create(user=self.user, name=f"t{size}", tree_type=Tree.TreeTypes.AVL)
+            self.client.post(f'/api/trees/{tree.pk}/bulk-load/', {"values": list(range(size))}, format='json')
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/trees/summary/?ordering=-node_count&page_size=2&min_nodes=15')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 2)
+        self.assertEqual([tree["name"] for tree in response.data["results"]], ["t30", "t20"])
+        self.assertNotIn("structure", response.data["results"][0])
+        self.assertTrue(all('"structure"' not in query["sql"] for query in queries.captured_queries))
+        self.assertGreater(response.data["results"][0]["size_bytes"], 0)
+
+        self.assertEqual(self.client.get('/api/trees/summary/?ordering=password').status_code, 400)
+
+    def test_keys_outside_int64_are_rejected(self):
+        tree = Tree.objects.create(user=self.user, name="avl", tree_type=Tree.TreeTypes.AVL)
+        too_big = 2 ** 70
+        requests = (
+            ('operate/', {"operation": "insert", "value": too_big}),
+            ('operate/', {"operation": "range", "value": 0, "high": too_big}),
+            ('operate-batch/', {"operations": [{"operation": "insert", "value": 1}, {"operation": "insert", "value": -too_big}]}),
+            ('bulk-load/', {"values": [1, too_big]}),
+        )
+        for path, body in requests:
+            response = self.client.post(f'/api/trees/{tree.pk}/{path}', body, format='json')
+            self.assertEqual(response.status_code, 400, path)
+        response = self.client.post(f'/api/trees/{tree.pk}/import/', f"1 {too_big}", content_type='text/plain')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self._summary(tree), (0, 0, None, None))
+
+        # Los extremos del rango sí caben en las columnas
+        self.client.post(f'/api/trees/{tree.pk}/bulk-load/', {"values": [-2 ** 63, 2 ** 63 - 1]}, format='json')
+        self.assertEqual(self._summary(tree)[2:], (-2 ** 63, 2 ** 63 - 1))
+
+
+class SubtreeWindowTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='ana', password='clave-segura-123')
+        self.client.force_authenticate(self.user)
+
+    def _depth(self, node):
+        return 1 + max((self._depth(child) for child in node.get("children", [])), default=0)
+
+    def test_window_is_cut_at_depth_and_can_be_expanded(self):
+        tree = Tree.objects.create(user=self.user, name="grande", tree_type=Tree.TreeTypes.AVL)
+        self.client.post(f'/api/trees/{tree.pk}/bulk-load/', {"values": list(range(1, 1024))}, format='json')
+
+        response = self.client.get(f'/api/trees/{tree.pk}/subtree/?depth=2')
+        self.assertEqual(response.status_code, 200)
+        window = response.data["structure"]
+        self.assertEqual(self._depth(window), 3)
+        leaf = window["children"][0]["children"][1]
+        self.assertEqual((leaf["collapsed"], leaf["child_count"], leaf["descendants"]), (True, 2, 254))
+
+        # Se abre el nodo plegado por su clave y por su camino
+        by_key = self.client.get(f'/api/trees/{tree.pk}/subtree/?depth=1&key={leaf["original_name"]}')
+        by_path = self.client.get(f'/api/trees/{tree.pk}/subtree/?depth=1&path=0,1')
+        self.assertEqual(by_key.data["path"], [0, 1])
+        self.assertEqual(by_key.data["structure"], by_path.data["structure"])
+        self.assertEqual(by_key.data["structure"]["name"], leaf["name"])
+
+        self.assertEqual(self.client.get(f'/api/trees/{tree.pk}/subtree/?key=5000').status_code, 404)
+        self.assertEqual(self.client.get(f'/api/trees/{tree.pk}/subtree/?depth=99').status_code, 400)
+
+    def test_btree_window_uses_key_groups(self):
+        tree = Tree.objects.create(user=self.user, name="b", tree_type=Tree.TreeTypes.B_TREE, degree=3)
+        self.client.post(f'/api/trees/{tree.pk}/bulk-load/', {"values": list(range(1, 200))}, format='json')
+
+        window = self.client.get(f'/api/trees/{tree.pk}/subtree/?depth=0').data["structure"]
+        self.assertTrue(window["collapsed"])
+        self.assertNotIn("children", window)
+        response = self.client.get(f'/api/trees/{tree.pk}/subtree/?depth=0&key=100')
+        self.assertIn("100", response.data["structure"]["name"])
+
+
+class TidyLayoutTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='ana', password='clave-segura-123')
+        self.client.force_authenticate(self.user)
+        layout.layout_cache.clear()
+
+    def _levels(self, structure):
+        levels, stack = {}, [structure]
+        while stack:
+            node = stack.pop()
+            children = node.get("children", [])
+            if children:
+                self.assertAlmostEqual(node["x"], (children[0]["x"] + children[-1]["x"]) / 2, places=2)
+            levels.setdefault(node["y"], []).append(node)
+            stack.extend(children)
+        return levels
+
+    def test_nodes_do_not_overlap_and_parents_are_centered(self):
+        for logic in (bst, btree):
+            root = logic.dict_to_tree({})
+            rng = random.Random(7)
+            for _ in range(300):
+                root = logic.insert(root, rng.randint(0, 1000))
+            for nodes in self._levels(layout.annotate(logic.tree_to_dict(root))).values():
+                nodes.sort(key=lambda node: node["x"])
+                for left, right in zip(nodes, nodes[1:]):
+                    gap = (left.get("width", 1) + right.get("width", 1)) / 2 + layout.GAP
+                    self.assertGreaterEqual(right["x"] - left["x"], gap - 1e-2)
+
+    def test_layout_is_cached_per_version(self):
+        tree = Tree.objects.create(user=self.user, name="b", tree_type=Tree.TreeTypes.B_TREE, degree=2)
+        for value in range(1, 8):
+            self.client.post(f'/api/trees/{tree.pk}/operate/', {"operation": "insert", "value": value}, format='json')
+
+        first = self.client.get(f'/api/trees/{tree.pk}/?layout=tidy').data["structure"]
+        self.assertEqual((first["y"], first["width"]), (0, len(first["name"].split(','))))
+        self.client.get(f'/api/trees/{tree.pk}/?layout=tidy')
+        self.assertEqual(layout.layout_cache.stats()["hits"], 1)
+
+        response = self.client.post(f'/api/trees/{tree.pk}/operate/?layout=tidy', {"operation": "insert", "value": 8}, format='json')
+        self.assertIn("x", response.data["structure"])
+        self.assertEqual(layout.layout_cache.stats()["misses"], 2)
+        self.assertNotIn("x", self.client.get(f'/api/trees/{tree.pk}/').data["structure"])
+
+
+class StreamingExportImportTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='ana', password='clave-segura-123')
+        self.client.force_authenticate(self.user)
+
+    def _export(self, tree, kind):
+        response = self.client.get(f'/api/trees/{tree.pk}/export/?kind={kind}')
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_export_and_import_round_trip(self):
+        keys = random.Random(5).sample(range(-5000, 5000), 3000)
+        for tree_type in (Tree.TreeTypes.TREAP, Tree.TreeTypes.B_TREE, Tree.TreeTypes.B_PLUS_TREE, Tree.TreeTypes.ARRAY):
+            tree = Tree.objects.create(user=self.user, name=tree_type, tree_type=tree_type, degree=3)
+            response = self.client.post(f'/api/trees/{tree.pk}/import/', ' '.join(map(str, keys)), content_type='text/plain')
+            self.assertEqual((response.status_code, response.data["node_count"]), (200, 3000))
+            self.assertNotIn("structure", response.data)
+            self.assertEqual([int(line) for line in self._export(tree, 'keys').split()], sorted(keys))
+
+            # Tras borrar, los nodos internos del B+ conservan separadores que ya no son claves
+            deleted = keys[:1500]
+            self.client.post(f'/api/trees/{tree.pk}/operate-batch/',
+                             {"operations": [{"operation": "delete", "value": key} for key in deleted]}, format='json')
+
+            # Lo exportado como NDJSON se puede volver a importar
+            copy = Tree.objects.create(user=self.user, name=f"{tree_type}-copia", tree_type=tree_type, degree=3)
+            response = self.client.post(f'/api/trees/{copy.pk}/import/', self._export(tree, 'nodes'), content_type='application/x-ndjson')
+            self.assertEqual(response.data["node_count"], 1500)
+            self.assertEqual([int(line) for line in self._export(copy, 'keys').split()], sorted(keys[1500:]))
+
+    def test_import_reads_the_body_in_chunks(self):
+        with mock.patch.object(streaming, 'READ_BYTES', 4):
+            keys = streaming.read_keys(BytesIO(b"120, 7 33\n-4,5"))
+        self.assertEqual(list(keys), [120, 7, 33, -4, 5])
+        tree = Tree.objects.create(user=self.user, name="avl", tree_type=Tree.TreeTypes.AVL)
+        response = self.client.post(f'/api/trees/{tree.pk}/import/', '1, dos, 3', content_type='text/plain')
+        self.assertEqual(response.status_code, 400)
+        for fill in ("inf", "nan", "0"):
+            response = self.client.post(f'/api/trees/{tree.pk}/import/?fill={fill}', '1 2 3', content_type='text/plain')
+            self.assertEqual(response.status_code, 400)
+
+
+class SetOperationTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='ana', password='clave-segura-123')
+        self.client.force_authenticate(self.user)
+
+    def _tree(self, name, tree_type, keys):
+        tree = Tree.objects.create(user=self.user, name=name, tree_type=tree_type, degree=3)
+        self.client.post(f'/api/trees/{tree.pk}/bulk-load/', {"values": keys}, format='json')
+        return tree
+
+    def test_split_join_set_operations_match_python_sets(self):
+        rng = random.Random(11)
+        for logic in (avl, splay, btree.for_degree(3)):
+            for size_a, size_b in ((0, 5), (1, 300), (300, 40), (200, 200)):
+                a, b = set(rng.sample(range(1000), size_a)), set(rng.sample(range(1000), size_b))
+                for operation, expected in (('union', a | b), ('intersection', a & b), ('difference', a - b)):
+                    root = setops.combine(logic, logic.build_from_sorted(sorted(a)), logic.build_from_sorted(sorted(b)),
+                                          operation, size_a, size_b)
+                    tree_type = Tree.TreeTypes.B_TREE if logic not in (avl, splay) else Tree.TreeTypes.AVL
+                    self.assertEqual(list(streaming.iter_keys(tree_type, root)), sorted(expected))
+                    if logic is avl and root is not None:
+                        self.assertLessEqual(root.height, 1.45 * len(expected).bit_length() + 1)
+
+        left, found, right = avl.split(avl.build_from_sorted(list(range(10))), 4)
+        self.assertEqual((avl.maximum(left), found, avl.minimum(right)), (3, True, 5))
+        joined = btree.join(btree.build_from_sorted([1, 2, 3], 2), 10, btree.build_from_sorted(list(range(20, 90)), 2), 2)
+        self.assertEqual(list(streaming.iter_keys(Tree.TreeTypes.B_TREE, joined)), [1, 2, 3, 10] + list(range(20, 90)))
+
+    def test_combine_endpoint_creates_a_new_tree(self):
+        for tree_type in (Tree.TreeTypes.SPLAY, Tree.TreeTypes.TREAP):
+            left = self._tree(f"pares {tree_type}", tree_type, list(range(0, 100, 2)))
+            right = self._tree(f"tercios {tree_type}", tree_type, list(range(0, 100, 3)))
+            response = self.client.post('/api/trees/combine/', {"left": left.pk, "right": right.pk, "operation": "difference"}, format='json')
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(response.data["name"], f"pares {tree_type} − tercios {tree_type}")
+            expected = sorted(set(range(0, 100, 2)) - set(range(0, 100, 3)))
+            self.assertEqual((response.data["node_count"], response.data["min_key"]), (len(expected), expected[0]))
+            export = self.client.get(f'/api/trees/{response.data["id"]}/export/')
+            self.assertEqual([int(line) for line in b''.join(export.streaming_content).split()], expected)
+            # Los árboles de origen no cambian
+            left.refresh_from_db()
+            self.assertEqual(left.node_count, 50)
+
+        other = self._tree("avl", Tree.TreeTypes.AVL, [1, 2])
+        response = self.client.post('/api/trees/combine/', {"left": left.pk, "right": other.pk, "operation": "union"}, format='json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post('/api/trees/combine/', {"left": left.pk, "right": right.pk, "operation": "union", "name": "avl"}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+        # El nombre se ocupa entre la comprobación y la creación (otra petición a la vez)
+        real_create = Tree.objects.create
+        def create_after_a_concurrent_request(**fields):
+            real_create(**fields)
+            return real_create(**fields)
+        with mock.patch.object(Tree.objects, 'create', side_effect=create_after_a_concurrent_request):
+            response = self.client.post('/api/trees/combine/', {"left": left.pk, "right": right.pk, "operation": "union", "name": "a la vez"}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class BenchCommandTests(APITestCase):
+    def test_bench_writes_json(self):
+        out, err = StringIO(), StringIO()
+        call_command('bench', engines='avl,btree', workloads='random,sorted', sizes='50',
+                     endpoint_sizes='20', requests=3, stdout=out, stderr=err)
+        results = json.loads(out.getvalue())
+        self.assertEqual(len(results["logic"]), 4)
+        case = results["logic"][0]
+        self.assertEqual((case["engine"], case["workload"], case["size"]), ("avl", "random", 50))
+        self.assertEqual(case["insert"]["ops"], 50)
+        self.assertIn("peak_bytes", case["memory"])
+        self.assertEqual({(r["engine"], r["cache"]) for r in results["endpoint"]},
+                         {("avl", "warm"), ("avl", "cold"), ("btree", "warm"), ("btree", "cold")})
+        self.assertFalse(Tree.objects.exists()) # Lo creado por la medición se deshace
+
+
+class TimingTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='ana', password='clave-segura-123')
+        self.client.force_authenticate(self.user)
+        self.tree = Tree.objects.create(user=self.user, name='avl', tree_type=Tree.TreeTypes.AVL)
+
+    def test_server_timing_header(self):
+        with self.assertLogs('api.operate', level='INFO') as logs:
+            response = self.client.post(f'/api/trees/{self.tree.pk}/operate/', {"operation": "insert", "value": 5}, format='json')
+        phases = [part.split(';')[0] for part in response['Server-Timing'].split(', ')]
+        self.assertEqual(phases, ['load', 'operate', 'serialize', 'save', 'render', 'total'])
+        self.assertEqual(logs.records[0].timings_ms.keys(), set(phases))
+
+    @override_settings(TREE_METRICS=True)
+    def test_metrics_endpoint(self):
+        metrics.registry.clear()
+        for value in range(3):
+            self.client.post(f'/api/trees/{self.tree.pk}/operate/', {"operation": "insert", "value": value}, format='json')
+        series = self.client.get('/api/trees/metrics/').data["series"]
+        total = next(s for s in series if s["phase"] == "total")
+        self.assertEqual((total["tree_type"], total["operation"], total["count"]), ("AVL", "insert", 3))
+        self.assertEqual(sum(total["buckets"]), 3)
+
+    def test_metrics_endpoint_is_optional(self):
+        self.assertEqual(self.client.get('/api/trees/metrics/').status_code, 404)
@@ -1,15 +1,32 @@
+import logging
+import math
+import time
+
 #RECURSOS DE DJANGO
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib.auth.models import User
-from rest_framework import generics, viewsets, status
+from django.db import IntegrityError, transaction
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions, generics, viewsets, status
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.parsers import JSONParser
+from rest_framework.request import Request
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from rest_framework.settings import api_settings
 #RECURSOS DE api/
-from .models import Tree
-from .serializers import UserRegistrationSerializer, TreeSerializer
+from .models import Tree, TreeOperation
+from .serializers import UserRegistrationSerializer, TreeSerializer, TreeSummarySerializer
 from .permissions import IsOwner  # Crearemos este permiso personalizado
-#RECURSOS DE api/logic/
-from .logic import bst, avl, splay, btree
+from .cache import tree_cache
+from .renderers import MessagePackRenderer
+from . import delta, layout, metrics, storage, streaming, workers
+
+# Un registro por operación con los tiempos de cada fase
+operate_logger = logging.getLogger('api.operate')
 
 # --- Vistas de Autenticación ---
 
@@ -24,6 +41,12 @@ class UserRegistrationView(generics.CreateAPIView):
 
 # --- Vistas de la Lógica Principal ---
 
+class TreeSummaryPagination(PageNumberPagination):
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
 class TreeViewSet(viewsets.ModelViewSet):
     """
     Un ViewSet para ver, crear, editar y eliminar árboles.
@@ -33,9 +56,30 @@ class TreeViewSet(viewsets.ModelViewSet):
     - GET /api/trees/{id}/ (Obtener un árbol específico)
     - PUT /api/trees/{id}/ (Actualizar un árbol)
     - DELETE /api/trees/{id}/ (Eliminar un árbol)
+    Con '?structure=compact' la estructura se devuelve en formato compacto
+    (ver logic/compact.py) en lugar del diccionario D3, y con
+    'Accept: application/msgpack' (o '?format=msgpack') en MessagePack.
     """
     serializer_class = TreeSerializer
     permission_classes = [IsAuthenticated, IsOwner]
+    renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES + [MessagePackRenderer]
+
+    # Operaciones aceptadas por /operate/ y /operate-batch/
+    # (las consultas de orden solo existen en algunos tipos de árbol;
+    # 'range' necesita además 'high' y 'min'/'max' no llevan 'value')
+    OPERATIONS = ('insert', 'delete', 'search', 'range', 'min', 'max', 'predecessor', 'successor', 'rank', 'select')
+    NO_VALUE_OPERATIONS = ('min', 'max')
+    # Límite de operaciones por lote, para acotar el tamaño de una petición
+    MAX_BATCH_OPERATIONS = 100000
+    # Límite de claves por carga masiva
+    MAX_BULK_KEYS = 1000000
+    # Rango de las claves: enteros de 64 bits, como las columnas min_key/max_key
+    # y TreeOperation.value (y el arreglo de NumPy del tipo 'array')
+    KEY_MIN = -2 ** 63
+    KEY_MAX = 2 ** 63 - 1
+    # Niveles que devuelve /subtree/ por defecto y como máximo
+    SUBTREE_DEPTH = 4
+    MAX_SUBTREE_DEPTH = 10
 
     def get_queryset(self):
         """
@@ -48,24 +92,193 @@ class TreeViewSet(viewsets.ModelViewSet):
         """
         Asigna automáticamente el usuario autenticado al crear un nuevo árbol.
         No es necesario enviar el 'user_id' desde el frontend.
+        Si se envía una estructura, se calculan sus columnas de resumen.
+        """
+        data = serializer.validated_data
+        tree_type = data.get('tree_type', Tree.TreeTypes.BST)
+        summary = storage.summary_for(tree_type, data.get('degree', 2), data.get('structure', {}))
+        serializer.save(user=self.request.user, **summary)
+
+    def perform_update(self, serializer):
         """
-        serializer.save(user=self.request.user)
+        Una edición directa (PUT/PATCH) también cuenta como una nueva versión.
+        Se guarda como instantánea completa, así que el registro de operaciones
+        pendientes (modo LOG) se descarta.
+        La fila se bloquea para leer la versión actual: así una operación
+        guardada mientras tanto no comparte número de versión con la edición
+        (y las que lleguen después verán el conflicto y se repetirán).
+        """
+        tree = serializer.instance
+        data = serializer.validated_data
+        summary = storage.summary_for(data.get('tree_type', tree.tree_type), tree.degree, data.get('structure', tree.structure))
+        with transaction.atomic():
+            version = Tree.objects.select_for_update().values_list('version', flat=True).get(pk=tree.pk) + 1
+            serializer.save(version=version, snapshot_version=version, pending_operations=0, pending_bytes=0, **summary)
+            TreeOperation.objects.filter(tree=tree, version__lt=version).delete()
+        if 'structure' in data:
+            tree._root_node = None # La raíz en memoria ya no es la de la estructura nueva
     
-    def _get_logic_module(self, tree_type):
+    def _get_logic_module(self, tree):
         """
         Función auxiliar para seleccionar el módulo de lógica correcto
         basado en el 'tree_type' del objeto Tree.
         Esta es la pieza clave que hace que nuestro ViewSet sea genérico.
+        Para los árboles B y B+ devuelve la lógica con el grado 't' del árbol ya fijado
+        (ver storage.logic_for, que también usan los procesos de workers.py).
+        """
+        return storage.logic_for(tree.tree_type, tree.degree)
+
+    def get_serializer(self, *args, **kwargs):
+        """
+        Para responder con ?structure=compact o guardar una edición, los
+        árboles en modo registro con operaciones pendientes calculan su
+        estructura compacta actual (la de la BBDD es la última instantánea).
+        Los árboles en modo instantánea no se tocan.
+        La estructura del árbol sigue compacta: el paso a D3 se hace solo en
+        la respuesta (ver _response_structure, que usa el árbol en memoria),
+        así una edición que guarda esta misma instancia no escribe el D3 en la BBDD.
+        """
+        if args and args[0] is not None and (self._wants_compact() or kwargs.get('data') is not None):
+            trees = args[0] if kwargs.get('many') else [args[0]]
+            for tree in trees:
+                logic = self._get_logic_module(tree)
+                if logic:
+                    storage.materialize(tree, logic)
+        return super().get_serializer(*args, **kwargs)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if not self._wants_compact():
+            context['structure_for'] = self._response_structure
+        return context
+
+    def _response_structure(self, tree):
+        """
+        Estructura que ve el cliente: el formato D3 y, con ?layout=tidy, con
+        las coordenadas calculadas en el servidor (ver layout.py). Devuelve un
+        diccionario nuevo o el compartido de la caché de disposiciones, nunca
+        lo asigna al árbol.
+        """
+        logic = self._get_logic_module(tree)
+        if not logic:
+            return tree.structure
+        if self._wants_layout(self.request):
+            return layout.tree_layout(tree, logic)
+        return storage.d3_structure(tree, logic)
+
+    def _wants_compact(self):
+        # Solo en la query: en el cuerpo de un PUT 'structure' es el propio árbol
+        return self.request.query_params.get('structure') == 'compact'
+
+    @staticmethod
+    def _wants_layout(request):
+        return (request.data.get('layout') or request.query_params.get('layout')) == 'tidy'
+
+    def _wants_delta(self, request):
+        return (request.data.get('response') or request.query_params.get('response')) == 'delta'
+
+    def _previous_structure(self, request, tree, logic, root_node):
+        """
+        Estructura anterior a la operación, solo si se pidió una respuesta delta.
+        En modo registro la de la BBDD puede estar atrasada, así que se genera
+        desde el árbol en memoria antes de modificarlo.
+        """
+        if not self._wants_delta(request):
+            return None
+        if tree.storage_mode == Tree.StorageModes.LOG and tree.pending_operations:
+            return logic.tree_to_dict(root_node) or {}
+        return storage.d3_structure(tree, logic, root_node)
+
+    def _tree_response_data(self, request, tree, old_structure):
+        """
+        Datos del árbol para la respuesta. Por defecto es el árbol completo;
+        con "response": "delta" (en el cuerpo o en la query) solo se envía lo
+        que cambió respecto a la versión anterior ('base_version'). Si la copia
+        del cliente no está en 'base_version', debe pedir el árbol completo; si
+        el cliente envía su 'base_version' y no coincide, se le manda directamente.
         """
-        if tree_type == Tree.TreeTypes.BST:
-            return bst
-        elif tree_type == Tree.TreeTypes.AVL:
-            return avl
-        elif tree_type == Tree.TreeTypes.SPLAY:
-            return splay
-        elif tree_type == Tree.TreeTypes.B_TREE:
-            return btree
-        return None
+        client_version = request.data.get('base_version')
+        if not self._wants_delta(request) or (client_version is not None and str(client_version) != str(tree.version - 1)):
+            return self.get_serializer(tree).data
+        return {
+            "id": tree.id,
+            "version": tree.version,
+            "base_version": tree.version - 1,
+            "delta": delta.diff(old_structure, storage.d3_structure(tree, self._get_logic_module(tree))),
+        }
+
+    @classmethod
+    def parse_key(cls, value):
+        """Convierte 'value' en clave; lanza ValueError (o TypeError) si no es un entero de 64 bits."""
+        key = int(value)
+        if not cls.KEY_MIN <= key <= cls.KEY_MAX:
+            raise ValueError(f"Clave fuera de rango: {key}")
+        return key
+
+    @staticmethod
+    def parse_fill(value):
+        """Factor de llenado de los árboles B y B+; lanza ValueError (o TypeError) si no está en (0, 1]."""
+        fill = float(value)
+        if not (math.isfinite(fill) and 0 < fill <= 1):
+            raise ValueError(f"Factor de llenado fuera de rango: {fill}")
+        return fill
+
+    @classmethod
+    def _parse_high(cls, operation, data):
+        """Límite superior de un rango; None si la operación no lo usa o no es un entero de 64 bits."""
+        if operation != 'range':
+            return None
+        try:
+            return cls.parse_key(data.get('high'))
+        except (ValueError, TypeError):
+            return None
+
+    @staticmethod
+    def _finish_timing(response, tree, operation, timer):
+        """Añade la cabecera Server-Timing, escribe el registro de tiempos y los acumula si TREE_METRICS está activo."""
+        response['Server-Timing'] = timer.header()
+        timings = {name: round(duration, 3) for name, duration in timer.durations.items()}
+        timings["total"] = round(timer.total(), 3)
+        operate_logger.info(
+            "tree=%s type=%s operation=%s %s", tree.pk, tree.tree_type, operation,
+            " ".join(f"{name}={duration}ms" for name, duration in timings.items()),
+            extra={"tree_id": tree.pk, "tree_type": tree.tree_type, "operation": operation, "timings_ms": timings},
+        )
+        if metrics.enabled():
+            metrics.registry.record(tree.tree_type, operation, timer)
+        return response
+
+    @classmethod
+    def parse_operation(cls, data):
+        """
+        Valida el cuerpo de /operate/ (y de /operate-async/).
+        Devuelve ((operación, valor, high), None) o ((None, None, None), mensaje de error).
+        """
+        invalid = (None, None, None)
+        operation = data.get('operation')
+        value_str = data.get('value')
+        if not operation or (value_str is None and operation not in cls.NO_VALUE_OPERATIONS):
+            return invalid, "Se requieren 'operation' (insert/delete/search...) y 'value'."
+
+        try:
+            value = cls.parse_key(value_str) if operation not in cls.NO_VALUE_OPERATIONS else None
+        except (ValueError, TypeError):
+            return invalid, f"El 'value' debe ser un número entero entre {cls.KEY_MIN} y {cls.KEY_MAX}."
+
+        if operation not in cls.OPERATIONS:
+            return invalid, f"Operación no válida. Use una de: {', '.join(cls.OPERATIONS)}."
+
+        high = cls._parse_high(operation, data)
+        if operation == 'range' and high is None:
+            return invalid, "La operación 'range' requiere 'high' entero."
+        return (operation, value, high), None
+
+    def _conflict_response(self, tree):
+        """Otras peticiones siguieron guardando el árbol durante todos los reintentos."""
+        return Response(
+            {"error": f"El árbol {tree.pk} está recibiendo demasiadas escrituras a la vez; vuelva a intentarlo."},
+            status=status.HTTP_409_CONFLICT
+        )
 
     @action(detail=True, methods=['post'], url_path='operate')
     def operate_on_tree(self, request, pk=None):
@@ -73,63 +286,590 @@ class TreeViewSet(viewsets.ModelViewSet):
         Endpoint único para manejar inserción, eliminación y búsqueda.
         URL: POST /api/trees/{id}/operate/
         Espera un cuerpo de petición como: { "operation": "insert", "value": 50 }
+        Para un rango: { "operation": "range", "value": 10, "high": 20 }; la
+        respuesta incluye 'keys' con las claves en [value, high] en orden.
+        Consultas de orden: "min" y "max" (sin 'value'), "predecessor",
+        "successor", "rank" (cuántas claves son menores que 'value') y
+        "select" (la clave en la posición 'value', empezando en 0); su
+        respuesta incluye 'result'.
+        Con "trace": true la respuesta incluye 'trace', la lista de pasos de la
+        operación (visitas, rotaciones, divisiones...) para animarla.
+        La cabecera Server-Timing de la respuesta desglosa el tiempo por fases.
         """
+        timer = metrics.PhaseTimer()
         tree = self.get_object() # Obtiene el árbol por su pk y verifica permisos
-        operation = request.data.get('operation')
-        value_str = request.data.get('value')
-        
+
         # Validación de la entrada
-        if not operation or value_str is None:
+        (operation, value, high), error = self.parse_operation(request.data)
+        if error:
+            return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+
+        # 1. Seleccionar el módulo de lógica (bst, avl, etc.)
+        logic = self._get_logic_module(tree)
+        if not logic:
+            return Response(
+                {"error": f"Lógica para el tipo de árbol '{tree.tree_type}' no implementada."},
+                status=status.HTTP_501_NOT_IMPLEMENTED
+            )
+        if not storage.supports_operation(logic, operation):
+            return Response(
+                {"error": f"La operación '{operation}' no está disponible para '{tree.tree_type}'."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+            
+        def attempt():
+            # 2. Proceso: JSON -> Objeto Árbol en Memoria
+            # Reconstruimos el árbol desde su representación JSON en la BBDD,
+            # salvo que este proceso ya lo tenga en caché con la misma versión.
+            # En modo registro, además se re-aplican las operaciones pendientes.
+            with timer.phase('load'):
+                root_node = storage.load_root(tree, logic)
+                old_structure = self._previous_structure(request, tree, logic, root_node)
+
+            # 3. Ejecutar la operación lógica (registrando sus pasos si se pidió la traza)
+            trace = [] if request.data.get('trace') else None
+            with timer.phase('operate'):
+                root_node, result = storage.apply_operation(logic, tree.tree_type, root_node, operation, value, trace, high)
+            keys = result if operation == 'range' else None
+            highlight_key = storage.matched_key(operation, value, result) # Para la búsqueda y las consultas
+
+            # 4. Proceso: Objeto Árbol en Memoria -> JSON, y guardar
+            # Convertimos el árbol modificado de vuelta a un diccionario JSON
+            # (o, en modo registro, solo añadimos la operación al registro).
+            # Si otra petición guardó antes, se repite todo sobre la versión nueva.
+            storage.save_root(tree, logic, root_node, [(operation, value)], highlight_key, keys and set(keys), timer, [result])
+            return result, keys, old_structure, trace
+
+        try:
+            result, keys, old_structure, trace = storage.with_retries(tree, attempt)
+        except storage.VersionConflict:
+            return self._conflict_response(tree)
+
+        # 5. Responder (árbol completo o solo los cambios)
+        with timer.phase('render'):
+            data = self._tree_response_data(request, tree, old_structure)
+        if keys is not None:
+            data["keys"] = keys
+        elif operation in storage.QUERY_FUNCTIONS:
+            data["result"] = result
+        if trace is not None:
+            data["trace"] = trace
+        return self._finish_timing(Response(data, status=status.HTTP_200_OK), tree, operation, timer)
+
+    @action(detail=True, methods=['post'], url_path='operate-batch')
+    def operate_batch(self, request, pk=None):
+        """
+        Aplica una lista ordenada de operaciones sobre el mismo árbol en memoria,
+        reconstruyéndolo y guardándolo una sola vez.
+        URL: POST /api/trees/{id}/operate-batch/
+        Espera un cuerpo como:
+        { "operations": [{ "operation": "insert", "value": 50 }, { "operation": "search", "value": 7 }] }
+        Los rangos llevan también "high" y "min"/"max" no llevan "value", como en /operate/.
+        Responde con el árbol final y un resultado por operación.
+        """
+        timer = metrics.PhaseTimer()
+        tree = self.get_object()
+        operations = request.data.get('operations')
+
+        if not isinstance(operations, list) or not operations:
+            return Response(
+                {"error": "Se requiere 'operations': una lista de { 'operation', 'value' }."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(operations) > self.MAX_BATCH_OPERATIONS:
+            return Response(
+                {"error": f"Como máximo se permiten {self.MAX_BATCH_OPERATIONS} operaciones por lote."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Validamos el lote completo antes de tocar el árbol: o se aplica todo o nada.
+        parsed = []
+        for index, item in enumerate(operations):
+            operation = item.get('operation') if isinstance(item, dict) else None
+            try:
+                value = self.parse_key(item.get('value')) if operation not in self.NO_VALUE_OPERATIONS else None
+            except (AttributeError, ValueError, TypeError):
+                value = None
+            high = self._parse_high(operation, item) if operation in self.OPERATIONS else None
+            if (operation not in self.OPERATIONS or (value is None and operation not in self.NO_VALUE_OPERATIONS)
+                    or (operation == 'range' and high is None)):
+                return Response(
+                    {"error": f"Operación {index} no válida. Use una de: {', '.join(self.OPERATIONS)}, con un 'value' entero de 64 bits ('high' en los rangos)."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            parsed.append((operation, value, high))
+
+        logic = self._get_logic_module(tree)
+        if not logic:
+            return Response(
+                {"error": f"Lógica para el tipo de árbol '{tree.tree_type}' no implementada."},
+                status=status.HTTP_501_NOT_IMPLEMENTED
+            )
+        for index, (operation, _, _) in enumerate(parsed):
+            if not storage.supports_operation(logic, operation):
+                return Response(
+                    {"error": f"Operación {index}: '{operation}' no está disponible para '{tree.tree_type}'."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+        with_trace = bool(request.data.get('trace'))
+
+        def attempt():
+            with timer.phase('load'):
+                root_node = storage.load_root(tree, logic)
+                old_structure = self._previous_structure(request, tree, logic, root_node)
+            with timer.phase('operate'):
+                root_node, outcomes = storage.apply_batch(logic, tree.tree_type, root_node, parsed, with_trace)
+            # Se resalta la última clave encontrada del lote
+            highlight_key = None
+            for (operation, value, _), (outcome, _) in zip(parsed, outcomes):
+                matched = storage.matched_key(operation, value, outcome)
+                highlight_key = matched if matched is not None else highlight_key
+            storage.save_root(tree, logic, root_node, [(operation, value) for operation, value, _ in parsed], highlight_key,
+                              timer=timer, outcomes=[outcome for outcome, _ in outcomes])
+            return outcomes, old_structure
+
+        try:
+            outcomes, old_structure = storage.with_retries(tree, attempt)
+        except storage.VersionConflict:
+            return self._conflict_response(tree)
+
+        results = []
+        for (operation, value, high), (outcome, trace) in zip(parsed, outcomes):
+            result = {"operation": operation, "value": value}
+            if trace is not None:
+                result["trace"] = trace
+            if operation == 'search':
+                result["found"] = outcome
+            elif operation == 'range':
+                result["high"] = high
+                result["keys"] = outcome
+            elif operation in storage.QUERY_FUNCTIONS:
+                result["result"] = outcome
+            results.append(result)
+
+        with timer.phase('render'):
+            tree_data = self._tree_response_data(request, tree, old_structure)
+        response = Response({"results": results, "tree": tree_data}, status=status.HTTP_200_OK)
+        return self._finish_timing(response, tree, 'batch', timer)
+
+
+    @action(detail=True, methods=['post'], url_path='bulk-load')
+    def bulk_load(self, request, pk=None):
+        """
+        Reemplaza el contenido del árbol construyéndolo de una vez a partir de
+        una lista de claves, en lugar de insertarlas una a una.
+        URL: POST /api/trees/{id}/bulk-load/
+        Acepta JSON { "values": [5, 1, 9, ...] } o un archivo 'file' con enteros
+        separados por comas, espacios o saltos de línea. Para los árboles B y B+ se
+        puede indicar "fill" (factor de llenado de los nodos, por defecto 1.0).
+        """
+        tree = self.get_object()
+
+        try:
+            if 'file' in request.FILES:
+                text = request.FILES['file'].read().decode('utf-8')
+                keys = [self.parse_key(token) for token in text.replace(',', ' ').split()]
+            else:
+                keys = [self.parse_key(value) for value in request.data.get('values', [])]
+        except (ValueError, TypeError, UnicodeDecodeError):
             return Response(
-                {"error": "Se requieren 'operation' (insert/delete/search) y 'value'."},
+                {"error": "Se requiere 'values' (lista de enteros de 64 bits) o un archivo 'file' con enteros."},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        
         try:
-            value = int(value_str)
+            fill = self.parse_fill(request.data.get('fill', 1.0))
         except (ValueError, TypeError):
-            return Response({"error": "El 'value' debe ser un número entero."}, status=status.HTTP_400_BAD_REQUEST)
+            return Response({"error": "'fill' debe ser un número mayor que 0 y como mucho 1."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(keys) > self.MAX_BULK_KEYS:
+            return Response(
+                {"error": f"Como máximo se permiten {self.MAX_BULK_KEYS} claves por carga."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-        # 1. Seleccionar el módulo de lógica (bst, avl, etc.)
-        logic = self._get_logic_module(tree.tree_type)
+        logic = self._get_logic_module(tree)
         if not logic:
             return Response(
                 {"error": f"Lógica para el tipo de árbol '{tree.tree_type}' no implementada."},
                 status=status.HTTP_501_NOT_IMPLEMENTED
             )
-            
-        # 2. Proceso: JSON -> Objeto Árbol en Memoria
-        # Reconstruimos el árbol desde su representación JSON en la BBDD
-        root_node = logic.dict_to_tree(tree.structure)
-        
-        highlight_key = None # Para la operación de búsqueda
-
-        # 3. Ejecutar la operación lógica
-        if operation == 'insert':
-            root_node = logic.insert(root_node, value)
-        elif operation == 'delete':
-            root_node = logic.delete(root_node, value)
-        elif operation == 'search':
-            # La búsqueda en Splay modifica el árbol. Para otros, no.
-            # Nuestro diseño lo maneja de forma transparente.
-            search_result = logic.search(root_node, value)
-            
-            # En Splay, search devuelve la nueva raíz, así que la actualizamos.
-            if tree.tree_type == Tree.TreeTypes.SPLAY:
-                root_node = search_result
-
-            if search_result: # Si no es None, la clave fue encontrada
-                highlight_key = value
-        else:
-            return Response({"error": "Operación no válida. Use 'insert', 'delete' o 'search'."}, status=status.HTTP_400_BAD_REQUEST)
-            
-        # 4. Proceso: Objeto Árbol en Memoria -> JSON
-        # Convertimos el árbol modificado de vuelta a un diccionario JSON
-        new_structure = logic.tree_to_dict(root_node, highlight_key=highlight_key)
-        
-        # 5. Guardar y responder
-        tree.structure = new_structure
-        tree.save()
-        
+
+        root_node = storage.build_tree(logic, tree.tree_type, keys, fill)
+
+        # La carga masiva siempre reescribe la instantánea completa. No depende
+        # del contenido anterior: ante un conflicto basta con volver a guardar.
+        try:
+            storage.with_retries(tree, lambda: storage.save_root(tree, logic, root_node))
+        except storage.VersionConflict:
+            return self._conflict_response(tree)
+
         serializer = self.get_serializer(tree)
-        return Response(serializer.data, status=status.HTTP_200_OK)
\ No newline at end of file
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=['get'], url_path='subtree')
+    def subtree(self, request, pk=None):
+        """
+        Una ventana del árbol, para navegar árboles muy grandes sin descargarlos
+        enteros: el subárbol desde la raíz, desde el nodo con una clave o desde
+        un camino de índices de hijos, hasta 'depth' niveles por debajo.
+        URL: GET /api/trees/{id}/subtree/?depth=4&key=500 (o &path=0,1,1)
+        Los nodos del último nivel que tienen hijos llegan plegados
+        ("collapsed": true, "child_count" y, en los binarios, "descendants");
+        para abrirlos se pide su clave o el camino de la respuesta más el
+        índice del hijo. En los árboles B y B+ el nodo es el grupo de claves.
+        Con ?layout=tidy la ventana llega con sus propias coordenadas.
+        """
+        tree = self.get_object()
+        logic = self._get_logic_module(tree)
+        if not logic:
+            return Response(
+                {"error": f"Lógica para el tipo de árbol '{tree.tree_type}' no implementada."},
+                status=status.HTTP_501_NOT_IMPLEMENTED
+            )
+
+        params = request.query_params
+        if 'key' in params and 'path' in params:
+            return Response({"error": "Indica 'key' o 'path', no ambos."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            depth = int(params.get('depth', self.SUBTREE_DEPTH))
+            key = self.parse_key(params['key']) if 'key' in params else None
+            path = [int(step) for step in params['path'].split(',') if step.strip()] if 'path' in params else None
+        except ValueError:
+            return Response(
+                {"error": "'depth' y 'key' deben ser enteros ('key' de 64 bits) y 'path' una lista de enteros separados por comas."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not 0 <= depth <= self.MAX_SUBTREE_DEPTH:
+            return Response(
+                {"error": f"'depth' debe estar entre 0 y {self.MAX_SUBTREE_DEPTH}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Solo se lee: el árbol vuelve a la caché para la siguiente ventana
+        root_node = storage.load_root(tree, logic)
+        tree_cache.put(tree.pk, tree.updated_at, root_node)
+
+        node, taken = storage.find_subtree(tree.tree_type, root_node, key=key, path=(path or []) if key is None else None)
+        if node is None and (key is not None or path):
+            return Response({"error": "No existe ese nodo en el árbol."}, status=status.HTTP_404_NOT_FOUND)
+
+        highlight_keys = set(tree.structure.get('highlight', ())) if isinstance(tree.structure, dict) else set()
+        window = logic.tree_to_dict(node, highlight_keys=highlight_keys, max_depth=depth) if node is not None else None
+        if window and self._wants_layout(request):
+            layout.annotate(window)
+        return Response({
+            "id": tree.pk,
+            "version": tree.version,
+            "node_count": tree.node_count,
+            "path": taken or [],
+            "depth": depth,
+            "structure": window or {},
+        }, status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=['get'], url_path='export')
+    def export(self, request, pk=None):
+        """
+        Exporta el árbol en flujo, sin construir la estructura D3 completa.
+        URL: GET /api/trees/{id}/export/?kind=keys (o kind=nodes)
+        - keys: texto con una clave por línea, en orden.
+        - nodes: NDJSON con un registro por nodo en preorden (ver streaming.py).
+        """
+        kind = request.query_params.get('kind', 'keys')
+        if kind not in streaming.KINDS:
+            return Response(
+                {"error": f"'kind' debe ser una de: {', '.join(streaming.KINDS)}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        tree = self.get_object()
+        logic = self._get_logic_module(tree)
+        if not logic:
+            return Response(
+                {"error": f"Lógica para el tipo de árbol '{tree.tree_type}' no implementada."},
+                status=status.HTTP_501_NOT_IMPLEMENTED
+            )
+
+        root_node = storage.load_root(tree, logic)
+
+        def chunks():
+            yield from streaming.export_chunks(tree.tree_type, root_node, kind)
+            # Solo se leyó: si el envío terminó, el árbol vuelve a la caché
+            tree_cache.put(tree.pk, tree.updated_at, root_node)
+
+        response = StreamingHttpResponse(chunks(), content_type=streaming.KINDS[kind])
+        extension = 'txt' if kind == 'keys' else 'ndjson'
+        response['Content-Disposition'] = f'attachment; filename="arbol-{tree.pk}.{extension}"'
+        return response
+
+    @action(detail=True, methods=['post'], url_path='import')
+    def import_keys(self, request, pk=None):
+        """
+        Carga masiva en flujo: el cuerpo se lee por trozos en lugar de
+        parsearse entero, y las claves van directas al constructor masivo.
+        URL: POST /api/trees/{id}/import/?fill=0.8
+        Cuerpo: enteros separados por comas, espacios o saltos de línea, o
+        (con Content-Type: application/x-ndjson) lo que produce /export/.
+        Responde con el resumen del árbol, no con la estructura.
+        """
+        tree = self.get_object()
+        logic = self._get_logic_module(tree)
+        if not logic:
+            return Response(
+                {"error": f"Lógica para el tipo de árbol '{tree.tree_type}' no implementada."},
+                status=status.HTTP_501_NOT_IMPLEMENTED
+            )
+        try:
+            fill = self.parse_fill(request.query_params.get('fill', 1.0))
+        except (ValueError, TypeError):
+            return Response({"error": "'fill' debe ser un número mayor que 0 y como mucho 1."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            ndjson = (request.content_type or '').startswith('application/x-ndjson')
+            keys = streaming.read_keys(request.stream, ndjson, self.MAX_BULK_KEYS)
+        except streaming.TooManyKeys:
+            return Response(
+                {"error": f"Como máximo se permiten {self.MAX_BULK_KEYS} claves por carga."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except (ValueError, OverflowError, KeyError, TypeError):
+            return Response(
+                {"error": "El cuerpo debe contener enteros de 64 bits (o registros NDJSON con 'key' o 'keys')."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        root_node = storage.build_tree(logic, tree.tree_type, streaming.sorted_unique(keys), fill)
+        try:
+            storage.with_retries(tree, lambda: storage.save_root(tree, logic, root_node))
+        except storage.VersionConflict:
+            return self._conflict_response(tree)
+        return Response(TreeSummarySerializer(tree).data, status=status.HTTP_200_OK)
+
+    # Símbolo de cada operación de conjuntos para el nombre por defecto del árbol nuevo
+    SET_OPERATIONS = {'union': '∪', 'intersection': '∩', 'difference': '−'}
+
+    @action(detail=False, methods=['post'], url_path='combine')
+    def combine(self, request):
+        """
+        Crea un árbol nuevo con la unión, la intersección o la diferencia de
+        dos árboles del usuario (del mismo tipo y grado), sin modificarlos.
+        URL: POST /api/trees/combine/
+        Cuerpo: { "left": 3, "right": 7, "operation": "union", "name": "opcional" }
+        ("difference" es left - right). En AVL, Splay y Árbol B se usa
+        split/join (ver logic/setops.py); en los demás, una mezcla lineal.
+        Responde con el resumen del árbol nuevo.
+        """
+        operation = request.data.get('operation')
+        if operation not in self.SET_OPERATIONS:
+            return Response(
+                {"error": f"'operation' debe ser una de: {', '.join(self.SET_OPERATIONS)}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            left_id, right_id = int(request.data['left']), int(request.data['right'])
+        except (KeyError, ValueError, TypeError):
+            return Response({"error": "Se requieren 'left' y 'right' (ids de árboles)."}, status=status.HTTP_400_BAD_REQUEST)
+
+        trees = self.get_queryset().in_bulk([left_id, right_id])
+        if left_id not in trees or right_id not in trees:
+            return Response({"detail": "No encontrado."}, status=status.HTTP_404_NOT_FOUND)
+        left, right = trees[left_id], trees[right_id]
+        if left.tree_type != right.tree_type or (left.tree_type in (Tree.TreeTypes.B_TREE, Tree.TreeTypes.B_PLUS_TREE)
+                                                 and left.degree != right.degree):
+            return Response(
+                {"error": "Solo se pueden combinar árboles del mismo tipo (y, en los árboles B y B+, del mismo grado)."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        logic = self._get_logic_module(left)
+        if not logic:
+            return Response(
+                {"error": f"Lógica para el tipo de árbol '{left.tree_type}' no implementada."},
+                status=status.HTTP_501_NOT_IMPLEMENTED
+            )
+
+        name = request.data.get('name') or f"{left.name} {self.SET_OPERATIONS[operation]} {right.name}"
+        name = name[:Tree._meta.get_field('name').max_length]
+        name_taken = Response({"error": f"Ya tienes un árbol llamado '{name}'."}, status=status.HTTP_400_BAD_REQUEST)
+        if self.get_queryset().filter(name=name).exists():
+            return name_taken
+
+        # Las operaciones consumen los árboles en memoria: no vuelven a la caché.
+        # Si es el mismo árbol dos veces, la segunda carga es otra copia.
+        left_root = storage.load_root(left, logic)
+        right_root = storage.load_root(right, logic)
+        root_node = storage.combine_roots(logic, left.tree_type, left_root, right_root, operation,
+                                          left.node_count, right.node_count)
+
+        # Otra petición puede haber creado un árbol con ese nombre mientras tanto
+        try:
+            with transaction.atomic():
+                tree = Tree.objects.create(user=request.user, name=name, tree_type=left.tree_type, degree=left.degree)
+        except IntegrityError:
+            return name_taken
+        storage.save_root(tree, logic, root_node)
+        return Response(TreeSummarySerializer(tree).data, status=status.HTTP_201_CREATED)
+
+    # Columnas por las que se puede ordenar y filtrar la lista resumida
+    SUMMARY_ORDERING = ('name', 'updated_at', 'created_at', 'node_count', 'height', 'min_key', 'max_key', 'size_bytes')
+    SUMMARY_FILTERS = {
+        'tree_type': 'tree_type',
+        'min_nodes': 'node_count__gte', 'max_nodes': 'node_count__lte',
+        'min_height': 'height__gte', 'max_height': 'height__lte',
+        'min_size': 'size_bytes__gte', 'max_size': 'size_bytes__lte',
+    }
+
+    @action(detail=False, methods=['get'], url_path='summary')
+    def summary(self, request):
+        """
+        Lista paginada de los árboles del usuario sin 'structure' (que no se
+        lee de la BBDD), con sus columnas de resumen.
+        URL: GET /api/trees/summary/?ordering=-node_count&min_nodes=1000&page=2
+        - ordering: una de SUMMARY_ORDERING, con '-' para orden descendente.
+        - Filtros: tree_type, min_nodes/max_nodes, min_height/max_height, min_size/max_size.
+        - page y page_size (por defecto 50, como mucho 500).
+        """
+        queryset = self.get_queryset().defer('structure')
+        filters = {}
+        for param, lookup in self.SUMMARY_FILTERS.items():
+            value = request.query_params.get(param)
+            if value is None:
+                continue
+            if param != 'tree_type':
+                try:
+                    value = int(value)
+                except ValueError:
+                    return Response({"error": f"'{param}' debe ser un número entero."}, status=status.HTTP_400_BAD_REQUEST)
+            filters[lookup] = value
+        queryset = queryset.filter(**filters)
+
+        ordering = request.query_params.get('ordering')
+        if ordering:
+            if ordering.lstrip('-') not in self.SUMMARY_ORDERING:
+                return Response(
+                    {"error": f"'ordering' debe ser una de: {', '.join(self.SUMMARY_ORDERING)} (con '-' para descendente)."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            queryset = queryset.order_by(ordering, 'pk')
+
+        paginator = TreeSummaryPagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        return paginator.get_paginated_response(TreeSummarySerializer(page, many=True).data)
+
+    @action(detail=False, methods=['get'], url_path='cache-stats')
+    def cache_stats(self, request):
+        """
+        Contadores de la caché de árboles en memoria de este proceso.
+        URL: GET /api/trees/cache-stats/
+        """
+        return Response(tree_cache.stats(), status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'], url_path='worker-stats')
+    def worker_stats(self, request):
+        """
+        Estado del pool de procesos de /operate-async/ en este proceso: tareas
+        en vuelo, en cola (más que procesos), máximo visto y cuántas fueron al
+        pool o se resolvieron en un hilo.
+        URL: GET /api/trees/worker-stats/
+        """
+        return Response(workers.pool.stats(), status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'], url_path='metrics')
+    def metrics_summary(self, request):
+        """
+        Histogramas de tiempos por tipo de árbol, operación y fase, de este proceso.
+        URL: GET /api/trees/metrics/
+        Solo existe si TREE_METRICS está activo en la configuración.
+        """
+        if not metrics.enabled():
+            return Response({"error": "Las métricas están desactivadas (TREE_METRICS)."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(metrics.registry.snapshot(), status=status.HTTP_200_OK)
+
+
+# --- Operación asíncrona ---
+
+def _authenticate(request):
+    """
+    Autentica como las vistas de DRF (token o sesión, con CSRF) y devuelve
+    la petición de DRF ya con 'user' y 'data'. Es síncrona: usa la BBDD.
+    """
+    drf_request = Request(
+        request,
+        parsers=[JSONParser()],
+        authenticators=[authenticator() for authenticator in api_settings.DEFAULT_AUTHENTICATION_CLASSES],
+    )
+    if not drf_request.user.is_authenticated:
+        raise exceptions.NotAuthenticated()
+    drf_request.data # Parsea el cuerpo aquí (puede lanzar ParseError)
+    return drf_request
+
+
+@csrf_exempt # Como en las vistas de DRF: el CSRF solo se exige con sesión (en _authenticate)
+async def operate_async(request, pk):
+    """
+    Variante asíncrona de /operate/, con el mismo cuerpo y la misma respuesta
+    (salvo "response": "delta", que aquí no existe).
+    URL: POST /api/trees/{id}/operate-async/
+    Solo espera a la BBDD; el trabajo de CPU (reconstruir el árbol, operar y
+    codificarlo) va al pool de procesos de workers.py si está activo
+    (TREE_WORKER_PROCESSES > 0 y los procesos arrancan), así un árbol grande
+    no bloquea las peticiones de los demás; si no, a un hilo. Los tiempos de la cabecera
+    Server-Timing separan la espera en la cola ('queue') del cálculo ('compute').
+    """
+    if request.method != 'POST':
+        return JsonResponse({"detail": f"Método \"{request.method}\" no permitido."}, status=405)
+    timer = metrics.PhaseTimer()
+    try:
+        drf_request = await sync_to_async(_authenticate)(request)
+    except exceptions.APIException as exc:
+        return JsonResponse({"detail": exc.detail}, status=exc.status_code)
+
+    with timer.phase('load'):
+        tree = await Tree.objects.select_related('user').filter(pk=pk, user=drf_request.user).afirst()
+    if tree is None:
+        return JsonResponse({"detail": "No encontrado."}, status=404)
+
+    (operation, value, high), error = TreeViewSet.parse_operation(drf_request.data)
+    if error:
+        return JsonResponse({"error": error}, status=400)
+    logic = storage.logic_for(tree.tree_type, tree.degree)
+    if not logic:
+        return JsonResponse({"error": f"Lógica para el tipo de árbol '{tree.tree_type}' no implementada."}, status=501)
+    if not storage.supports_operation(logic, operation):
+        return JsonResponse({"error": f"La operación '{operation}' no está disponible para '{tree.tree_type}'."}, status=400)
+
+    with_trace = bool(drf_request.data.get('trace'))
+    want_d3 = drf_request.query_params.get('structure') != 'compact'
+    want_layout = want_d3 and TreeViewSet._wants_layout(drf_request)
+    retries = getattr(settings, 'TREE_SAVE_RETRIES', 5)
+    for attempt_number in range(retries + 1):
+        with timer.phase('load'):
+            pending = await sync_to_async(storage.pending_operations)(tree)
+        start = time.perf_counter()
+        outcome = await workers.pool.run(
+            workers.is_large(tree.structure), workers.run_operation, tree.tree_type, tree.degree,
+            tree.structure, pending, operation, value, high, with_trace, want_d3, want_layout,
+        )
+        waited = (time.perf_counter() - start) * 1000
+        timer.durations['queue'] = timer.durations.get('queue', 0.0) + max(0.0, waited - outcome["compute_ms"])
+        timer.durations['compute'] = timer.durations.get('compute', 0.0) + outcome["compute_ms"]
+        try:
+            await sync_to_async(storage.save_structure)(tree, outcome["structure"], [(operation, value)], timer, outcome["summary"])
+            break
+        except storage.VersionConflict:
+            if attempt_number == retries:
+                return JsonResponse({"error": f"El árbol {tree.pk} está recibiendo demasiadas escrituras a la vez; vuelva a intentarlo."}, status=409)
+            await tree.arefresh_from_db()
+    # El árbol en memoria de este proceso (si lo había) ya no es el actual
+    tree_cache.discard(tree.pk)
+
+    with timer.phase('render'):
+        if want_d3:
+            tree.structure = outcome["d3"]
+        if want_layout:
+            layout.layout_cache.put(tree.pk, tree.updated_at, tree.structure)
+        data = TreeSerializer(tree).data
+        if operation == 'range':
+            data["keys"] = outcome["result"]
+        elif operation in storage.QUERY_FUNCTIONS:
+            data["result"] = outcome["result"]
+        if outcome["trace"] is not None:
+            data["trace"] = outcome["trace"]
+        response = JsonResponse(data)
+    return TreeViewSet._finish_timing(response, tree, operation, timer)
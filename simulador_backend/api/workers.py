@@ -0,0 +1,176 @@
+"""
+Pool de procesos para el trabajo de CPU de /operate-async/.
+
+Reconstruir un árbol grande, operar sobre él y volver a codificarlo puede
+tardar cientos de milisegundos; hecho en el proceso del servidor bloquea al
+resto de peticiones. Con el pool, la vista asíncrona solo espera la BBDD y
+el resultado del proceso de trabajo. Los árboles pequeños (menos de
+TREE_POOL_MIN_KEYS claves) no compensan el coste de enviar la estructura a
+otro proceso y se resuelven en un hilo, así no hacen cola detrás de los grandes.
+
+El pool tiene TREE_WORKER_PROCESSES procesos y se crea la primera vez que
+se usa. Por defecto es 0 (todo en hilos): el despliegue de vercel.json es
+una función WSGI sin servidor, donde un pool de procesos de larga vida no
+está garantizado. Si el pool no se puede crear o sus procesos mueren, se
+avisa en el registro y desde entonces todo se resuelve en hilos. Cuenta
+cuántas tareas hay en vuelo (en cola o ejecutándose) para medir la
+profundidad de la cola (ver stats() y /api/trees/worker-stats/).
+"""
+import asyncio
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import django
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from . import layout, storage
+from .logic import compact
+
+logger = logging.getLogger('api.workers')
+
+
+def run_operation(tree_type, degree, structure, pending, operation, value, high, with_trace, want_d3, want_layout=False):
+    """
+    Todo el trabajo de CPU de una operación, sin tocar la BBDD (se ejecuta
+    en otro proceso): decodificar la estructura, re-aplicar el registro
+    pendiente (modo LOG), operar y codificar el resultado en formato compacto
+    y, si hace falta para la respuesta, en D3 (con su disposición si se pidió).
+    """
+    start = time.perf_counter()
+    logic = storage.logic_for(tree_type, degree)
+    root_node = storage.decode_structure(logic, structure)
+    if pending:
+        root_node, _ = storage.apply_batch(logic, tree_type, root_node, pending)
+    trace = [] if with_trace else None
+    root_node, result = storage.apply_operation(logic, tree_type, root_node, operation, value, trace, high)
+
+    highlighted = set(result) if operation == 'range' else set()
+    matched = storage.matched_key(operation, value, result)
+    if matched is not None:
+        highlighted.add(matched)
+    d3 = (logic.tree_to_dict(root_node, highlight_keys=highlighted) or {}) if want_d3 else None
+    if want_layout:
+        layout.annotate(d3)
+    return {
+        "structure": logic.tree_to_compact(root_node, highlighted),
+        "summary": logic.summary(root_node),
+        "d3": d3,
+        "result": result,
+        "trace": trace,
+        "compute_ms": (time.perf_counter() - start) * 1000,
+    }
+
+
+def is_large(structure):
+    """Si el árbol merece ir al pool. Las estructuras D3 antiguas no se cuentan: se tratan como grandes."""
+    if not compact.is_compact(structure):
+        return bool(structure)
+    return len(structure['keys']) >= getattr(settings, 'TREE_POOL_MIN_KEYS', 5000)
+
+
+class WorkerPool:
+    def __init__(self):
+        self._executor = None
+        self._unavailable = False # El pool no arrancó: no se vuelve a intentar
+        self._lock = threading.Lock()
+        self.processes = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.pool_runs = 0
+        self.inline_runs = 0
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None and not self._unavailable:
+                self.processes = getattr(settings, 'TREE_WORKER_PROCESSES', 0)
+                if self.processes > 0:
+                    # 'spawn': no se copia el estado (hilos, conexiones) del servidor;
+                    # cada proceso arranca Django una vez al crearse
+                    try:
+                        self._executor = ProcessPoolExecutor(
+                            max_workers=self.processes,
+                            mp_context=multiprocessing.get_context('spawn'),
+                            initializer=django.setup,
+                        )
+                    except (OSError, ImportError, NotImplementedError, ValueError) as exc:
+                        self._disable(exc)
+            return self._executor
+
+    def _disable(self, exc):
+        # Sin semáforos de multiprocessing (p. ej. en una función sin servidor)
+        # crear el pool falla; se sigue en hilos. Se llama con el cerrojo tomado.
+        logger.warning("Pool de procesos no disponible, se usan hilos: %r", exc)
+        self._executor = None
+        self._unavailable = True
+        self.processes = 0
+
+    async def _run_inline(self, fn, *args):
+        with self._lock:
+            self.inline_runs += 1
+        return await sync_to_async(fn, thread_sensitive=False)(*args)
+
+    async def run(self, large, fn, *args):
+        """
+        Ejecuta fn(*args) en el pool si 'large', si no (o sin pool) en un hilo.
+        Si el pool no puede arrancar sus procesos, esta tarea y las siguientes
+        van a un hilo.
+        """
+        executor = self._get_executor() if large else None
+        if executor is None:
+            return await self._run_inline(fn, *args)
+
+        with self._lock:
+            self.pool_runs += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            # Los procesos se lanzan al enviar la tarea: si no pueden arrancar
+            # falla submit, y si mueren por el camino, la tarea (BrokenProcessPool).
+            # Las excepciones de la propia fn llegan tal cual.
+            try:
+                future = executor.submit(fn, *args)
+            except (OSError, RuntimeError) as exc:
+                failure = exc
+            else:
+                try:
+                    return await asyncio.wrap_future(future)
+                except BrokenProcessPool as exc:
+                    failure = exc
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+        # fn no tiene efectos fuera de su proceso: repetirla en un hilo es seguro
+        with self._lock:
+            self.pool_runs -= 1
+            if self._executor is executor:
+                self._disable(failure)
+        executor.shutdown(wait=False)
+        return await self._run_inline(fn, *args)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "processes": self.processes,
+                "in_flight": self.in_flight,
+                "queued": max(0, self.in_flight - self.processes),
+                "max_in_flight": self.max_in_flight,
+                "pool_runs": self.pool_runs,
+                "inline_runs": self.inline_runs,
+            }
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+            self._unavailable = False
+
+
+# Instancia única por proceso del servidor
+pool = WorkerPool()
@@ -143,6 +143,35 @@ USE_TZ = True
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Número máximo de árboles reconstruidos que cada proceso mantiene en memoria
+# (caché LRU de api/cache.py). 0 la desactiva.
+TREE_CACHE_SIZE = config('TREE_CACHE_SIZE', default=64, cast=int)
+
+# Disposiciones ya calculadas (?layout=tidy, api/layout.py) que guarda cada
+# proceso, una por árbol y versión. 0 la desactiva.
+TREE_LAYOUT_CACHE_SIZE = config('TREE_LAYOUT_CACHE_SIZE', default=16, cast=int)
+
+# Árboles en modo registro (storage_mode=LOG): el JSON completo se reescribe
+# cada N operaciones o cuando el registro pendiente supera estos bytes.
+TREE_SNAPSHOT_INTERVAL = config('TREE_SNAPSHOT_INTERVAL', default=100, cast=int)
+TREE_SNAPSHOT_BYTES = config('TREE_SNAPSHOT_BYTES', default=64 * 1024, cast=int)
+
+# Guardado optimista (api/storage.py): si otra petición guardó el mismo árbol
+# entre la carga y el guardado, la operación se repite sobre la versión nueva
+# hasta este número de veces antes de responder 409.
+TREE_SAVE_RETRIES = config('TREE_SAVE_RETRIES', default=5, cast=int)
+
+# /operate-async/ (api/workers.py): procesos del pool que reconstruyen y operan
+# los árboles (0 = sin pool, todo en hilos) y tamaño mínimo, en claves, para
+# mandar un árbol al pool en lugar de resolverlo en un hilo.
+TREE_WORKER_PROCESSES = config('TREE_WORKER_PROCESSES', default=0, cast=int)
+TREE_POOL_MIN_KEYS = config('TREE_POOL_MIN_KEYS', default=5000, cast=int)
+
+# Histogramas de tiempos por fase de /operate/ (api/metrics.py) y el endpoint
+# /api/trees/metrics/ que los muestra. La cabecera Server-Timing y los registros
+# del logger 'api.operate' están siempre activos.
+TREE_METRICS = config('TREE_METRICS', default=False, cast=bool)
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.SessionAuthentication', 